@@ -0,0 +1,156 @@
+"""
+ ASTRI_cache.py  -  description
+ ---------------------------------------------------------------------------------
+ Persistent on-disk cache of the quicklook results for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_cache
+ result_cache = ASTRI_cache.from_options(options)
+ cache_key = ASTRI_cache.result_key(filename, 'histo', selPDM, param, subfield_id, nbins, minval, maxval, maxevt)
+ arrays = result_cache.get(cache_key)
+ if (arrays is None):
+     result_cache.put(cache_key, {'N_counts': N_counts, ...})
+ ---------------------------------------------------------------------------------
+ Functions:
+ - ResultCache: directory of cached results (.npz), size bounded with LRU eviction
+ - file_identity: identity of a file (path, size, mtime)
+ - result_key: cache key of a file and of the analysis parameters
+ - from_options: cache set-up from the --no-cache, --clear-cache and --cache-size options
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The cache directory is $ASTRI_CACHE_DIR, or ~/.astri_cache if not set.
+ The key depends on the path, size and modification time of the input file, so
+ a result is recomputed when the file changes. Only os.stat is needed to look up
+ a result, the FITS file is not opened on a cache hit.
+ When the cache exceeds its size (--cache-size in MB) the least recently used
+ results are removed. A result larger than MAX_ENTRY_FRACTION of the size (e.g. the full
+ [channels, events] series of the whole camera) is not cached: it is not written to disk,
+ and does not evict the other results.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Results larger than MAX_ENTRY_FRACTION of the cache not cached.
+
+"""
+
+import numpy as np
+import hashlib
+import tempfile
+import os
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.astri_cache')
+# default maximum size of the cache in MB
+DEFAULT_CACHE_SIZE = 512
+
+CACHE_EXT = '.npz'
+
+# largest result cached, as a fraction of the size of the cache
+MAX_ENTRY_FRACTION = 0.25
+
+
+class ResultCache(object):
+	"""Directory of cached results, each one a dictionary of arrays saved as .npz"""
+
+	def __init__(self, cache_dir = None, max_size = DEFAULT_CACHE_SIZE):
+		if (cache_dir is None):
+			cache_dir = os.environ.get('ASTRI_CACHE_DIR', DEFAULT_CACHE_DIR)
+		self.cache_dir = os.path.expanduser(cache_dir)
+		self.max_bytes = int(max_size*1024*1024)
+		if (not os.path.isdir(self.cache_dir)):
+			os.makedirs(self.cache_dir)
+
+	def path(self, key):
+		return os.path.join(self.cache_dir, key + CACHE_EXT)
+
+	def get(self, key):
+		"""Dictionary of the arrays cached for key, None if not cached"""
+		path = self.path(key)
+		if (not os.path.exists(path)):
+			return None
+		try:
+			cache_file = np.load(path)
+			arrays = {}
+			for name in cache_file.files:
+				arrays[name] = cache_file[name]
+			cache_file.close()
+		except Exception:
+			# broken entry (e.g. interrupted write): drop it
+			self.remove(path)
+			return None
+		# the modification time marks the last use for the LRU eviction
+		os.utime(path, None)
+		return arrays
+
+	def put(self, key, arrays):
+		"""Cache the dictionary of arrays for key. Return False (nothing written) if the arrays
+		are larger than MAX_ENTRY_FRACTION of the cache."""
+		if (sum([np.asarray(array).nbytes for array in arrays.values()]) > self.max_bytes*MAX_ENTRY_FRACTION):
+			return False
+		fd, temp_path = tempfile.mkstemp(suffix=CACHE_EXT, dir=self.cache_dir)
+		temp_file = os.fdopen(fd, 'wb')
+		try:
+			np.savez(temp_file, **arrays)
+		finally:
+			temp_file.close()
+		os.rename(temp_path, self.path(key))
+		self.evict()
+		return True
+
+	def entries(self):
+		"""List of (last use, size, path) of the cached results"""
+		entries = []
+		for name in os.listdir(self.cache_dir):
+			if (name.endswith(CACHE_EXT)):
+				path = os.path.join(self.cache_dir, name)
+				try:
+					path_stat = os.stat(path)
+				except OSError:
+					continue
+				entries.append((path_stat.st_mtime, path_stat.st_size, path))
+		return entries
+
+	def evict(self):
+		"""Remove the least recently used results until the cache fits in its size"""
+		entries = sorted(self.entries())
+		tot_bytes = sum([entry[1] for entry in entries])
+		for last_use, size, path in entries:
+			if (tot_bytes <= self.max_bytes):
+				break
+			self.remove(path)
+			tot_bytes -= size
+
+	def clear(self):
+		"""Remove all the cached results"""
+		for last_use, size, path in self.entries():
+			self.remove(path)
+
+	def remove(self, path):
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+
+
+def file_identity(filename):
+	"""Identity of the file filename: (absolute path, size, modification time)"""
+	file_stat = os.stat(filename)
+	return (os.path.abspath(filename), file_stat.st_size, file_stat.st_mtime)
+
+
+def result_key(filename, *params):
+	"""Cache key of the analysis of filename with the parameters params"""
+	return hashlib.sha1(repr((file_identity(filename), params))).hexdigest()
+
+
+def from_options(options):
+	"""ResultCache set-up from the command line options:
+	--no-cache (None is returned), --clear-cache, --cache-size=MB"""
+	if ('no-cache' in options):
+		return None
+	result_cache = ResultCache(max_size = float(options.get('cache-size', DEFAULT_CACHE_SIZE)))
+	if ('clear-cache' in options):
+		result_cache.clear()
+	return result_cache
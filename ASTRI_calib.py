@@ -0,0 +1,244 @@
+"""
+ ASTRI_calib.py  -  description
+ ---------------------------------------------------------------------------------
+ Per-pixel pedestal and gain calibration tables of the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_calib
+ calib_table = ASTRI_calib.derive_table(dl0_astri, ('HI', 'LO'), 0, 4096)
+ calib_table.save('pedestal_run.calib.npz')
+ calib_table = ASTRI_calib.load_table('pedestal_run.calib.npz')
+ for row_start, block in calib_table.blocks(dl0_astri.iter_blocks(['PDM01HI'])):
+     block['PDM01HI']   # (ADC - pedestal)*gain
+ ---------------------------------------------------------------------------------
+ Functions:
+ - CalibTable: pedestal, width and gain of each pixel of the calibrated parameters
+ - derive_table: table of a pedestal run, from the per-pixel histograms filled in a single pass
+ - load_table: read a table written by CalibTable.save
+ - from_options: table of the --calib=file option (None if not given)
+ - calibrate_blocks: row blocks calibrated with a table, if given
+ - table_id: id of a table for the keys of the result cache
+ - histogram_median: median of each histogram of a [..., nbins] cube of counts
+ - histogram_mad: median absolute deviation from a value of each histogram
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The pedestal is the median and the width 1.4826 times the median absolute deviation (MAD)
+ of the values of each pixel, i.e. the sigma of a Gaussian pedestal, not biased by the
+ signal or the noise tails. They are computed from histograms with bins of 1 ADC count over
+ the window minval, maxval (ASTRI_cube), so a single pass over the run is enough and the
+ memory is 8 bytes per pixel and ADC count (about 78 MB per parameter for 0-4096).
+ The calibrated value is (ADC - pedestal)*gain. The gain is 1 unless set in the table,
+ a pedestal run does not measure it. Pixels without values in the window have NaN pedestal
+ and width: their calibrated values are NaN and are left out of the histogram windows.
+ The table is a compressed .npz file of some tens of kB with the format version, the
+ identity (path, size, modification time) and the rows of the run it was derived from, and
+ an id computed from its content, used in the keys of the result cache (ASTRI_cache).
+ The row selection of the run (start, stop, maxevt, tstart, tstop) is saved with the table;
+ it is None for the tables written before it was saved.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Row selection (start, stop, maxevt, tstart, tstop) of the run saved with the table.
+
+"""
+
+import numpy as np
+import hashlib
+import time
+
+import ASTRI_cache
+import ASTRI_cube
+import ASTRI_histo
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+# format of the table files
+CALIB_VERSION = 1
+
+CALIB_EXT = '.calib.npz'
+
+# sigma of a Gaussian / MAD
+MAD_TO_SIGMA = 1.4826
+
+DEFAULT_PARAMS = ('HI', 'LO')
+
+
+def histogram_median(counts, bin_values):
+	"""[...] median of the values bin_values [nbins] weighted by the counts [..., nbins] (the lower
+	median for an even number of entries), NaN where there are no counts"""
+	cumulative = np.cumsum(counts, axis=-1)
+	total = cumulative[..., -1]
+	median_index = np.minimum((cumulative < ((total + 1)//2)[..., np.newaxis]).sum(axis=-1), counts.shape[-1] - 1)
+	return np.where(total > 0, bin_values[median_index], np.nan)
+
+
+def histogram_mad(counts, bin_values, center):
+	"""[...] median of |bin_values - center| weighted by the counts [..., nbins]"""
+	nbins = counts.shape[-1]
+	deviation = np.abs(bin_values - np.where(np.isnan(center), 0., center)[..., np.newaxis])
+	order = np.argsort(deviation, axis=-1, kind='mergesort').reshape(-1, nbins)
+	rows = np.arange(order.shape[0])[:, np.newaxis]
+	sorted_deviation = deviation.reshape(-1, nbins)[rows, order]
+	sorted_counts = counts.reshape(-1, nbins)[rows, order]
+	cumulative = np.cumsum(sorted_counts, axis=-1)
+	total = cumulative[:, -1]
+	mad_index = np.minimum((cumulative < ((total + 1)//2)[:, np.newaxis]).sum(axis=-1), nbins - 1)
+	mad = np.where(total > 0, sorted_deviation[rows[:, 0], mad_index], np.nan)
+	return mad.reshape(counts.shape[:-1])
+
+
+class CalibTable(object):
+	"""Pedestal, width and gain [nPDM, elements] of the parameters (e.g. HI, LO)"""
+
+	def __init__(self, pedestal, width, gain = None, entries = None, source = None, nrows = 0, window = (0, 0), created = '', rows = None):
+		self.pedestal = pedestal
+		self.width = width
+		if (gain is None):
+			gain = dict((param, np.ones_like(pedestal[param])) for param in pedestal)
+		self.gain = gain
+		if (entries is None):
+			entries = dict((param, np.zeros(pedestal[param].shape, dtype=np.int64)) for param in pedestal)
+		self.entries = entries
+		self.source = source
+		self.nrows = nrows
+		self.window = window
+		self.created = created
+		# (start, stop, maxevt, tstart, tstop) of the rows read, None if not known
+		self.rows = rows
+		# FITS field -> (param, PDM index)
+		self.field_index = {}
+		for param in self.pedestal:
+			for pdm_index in range(self.pedestal[param].shape[0]):
+				self.field_index[ASTRI_histo.pdm_field(pdm_index+1, param)] = (param, pdm_index)
+		self.table_id = self.content_id()
+
+	def params(self):
+		return sorted(self.pedestal)
+
+	def content_id(self):
+		"""Id of the values of the table"""
+		content_hash = hashlib.sha1(str(CALIB_VERSION))
+		for param in self.params():
+			for table_array in (self.pedestal[param], self.width[param], self.gain[param]):
+				content_hash.update(np.ascontiguousarray(table_array).tostring())
+		return content_hash.hexdigest()[:16]
+
+	def apply(self, field, column):
+		"""Calibrated [events, elements] values of the column of the FITS field, the column if field is not calibrated"""
+		if (field not in self.field_index):
+			return column
+		param, pdm_index = self.field_index[field]
+		values = ASTRI_histo.select_subfield(column, 0)
+		return (values - self.pedestal[param][pdm_index])*self.gain[param][pdm_index]
+
+	def blocks(self, blocks):
+		"""Row blocks (row_start, block) of ASTRI_reader with the calibrated fields"""
+		for row_start, block in blocks:
+			for field in block:
+				if (field in self.field_index):
+					block[field] = self.apply(field, block[field])
+			yield row_start, block
+
+	def save(self, filename):
+		"""Write the table to a compressed .npz file"""
+		arrays = {}
+		for param in self.params():
+			arrays['pedestal_'+param] = self.pedestal[param]
+			arrays['width_'+param] = self.width[param]
+			arrays['gain_'+param] = self.gain[param]
+			arrays['entries_'+param] = self.entries[param]
+		source = self.source
+		if (source is None):
+			source = ('', 0, 0)
+		if (self.rows is not None):
+			# tstart, tstop None -> NaN
+			arrays['rows'] = np.array([np.nan if (value is None) else value for value in self.rows], dtype=np.float64)
+		np.savez_compressed(filename, version=CALIB_VERSION, params=np.array(self.params()), source_path=source[0],
+			source_size=source[1], source_mtime=source[2], nrows=self.nrows, window=np.array(self.window), created=self.created, **arrays)
+
+
+def derive_table(dl0_astri, params = DEFAULT_PARAMS, minval = 0, maxval = 4096, start = 0, stop = 0, maxevt = 0, block_size = None,
+	nPDM = ASTRI_nPDM, tstart = None, tstop = None):
+	"""Pedestal table of the parameters params of the DL0File dl0_astri (pedestal run), from the values
+	inside the window minval, maxval, in a single pass over the rows"""
+	cubes = [ASTRI_cube.new_cube(dl0_astri, param, maxval - minval, minval, maxval, nPDM = nPDM) for param in params]
+	fields = []
+	for histo_cube in cubes:
+		fields += histo_cube.fields
+	if (block_size is None):
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, fields, tstart, tstop, start, stop, maxevt)
+	else:
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, fields, tstart, tstop, start, stop, maxevt, block_size)
+	nrows = 0
+	for row_start, block in blocks:
+		nrows += len(block[ASTRI_timeindex.sTIME])
+		for histo_cube in cubes:
+			histo_cube.fill(block)
+
+	pedestal = {}
+	width = {}
+	entries = {}
+	for param, histo_cube in zip(params, cubes):
+		# bins of 1 ADC count: the value of a bin is its left edge
+		bin_values = histo_cube.bin_array[:-1].astype(np.float64)
+		pedestal[param] = histogram_median(histo_cube.counts, bin_values).astype(np.float32)
+		width[param] = np.zeros(pedestal[param].shape, dtype=np.float32)
+		# one PDM at a time, the MAD sorts the bins of each pixel
+		for pdm_index in range(nPDM):
+			width[param][pdm_index] = MAD_TO_SIGMA*histogram_mad(histo_cube.counts[pdm_index], bin_values, pedestal[param][pdm_index])
+		entries[param] = histo_cube.counts.sum(axis=-1)
+	return CalibTable(pedestal, width, entries = entries, source = ASTRI_cache.file_identity(dl0_astri.filename), nrows = nrows,
+		window = (minval, maxval), created = time.strftime('%Y-%m-%dT%H:%M:%S'), rows = (start, stop, maxevt, tstart, tstop))
+
+
+def load_table(filename):
+	"""Read a table written by CalibTable.save"""
+	table_file = np.load(filename)
+	try:
+		version = int(table_file['version'])
+		if (version != CALIB_VERSION):
+			raise ValueError('Calibration table '+filename+' has format version '+str(version)+', expected '+str(CALIB_VERSION))
+		pedestal = {}
+		width = {}
+		gain = {}
+		entries = {}
+		for param in table_file['params']:
+			param = str(param)
+			pedestal[param] = table_file['pedestal_'+param]
+			width[param] = table_file['width_'+param]
+			gain[param] = table_file['gain_'+param]
+			entries[param] = table_file['entries_'+param]
+		source = (str(table_file['source_path']), int(table_file['source_size']), float(table_file['source_mtime']))
+		rows = None
+		if ('rows' in table_file.files):
+			start, stop, maxevt, tstart, tstop = table_file['rows'].tolist()
+			rows = (int(start), int(stop), int(maxevt), None if np.isnan(tstart) else tstart, None if np.isnan(tstop) else tstop)
+		return CalibTable(pedestal, width, gain, entries, source, int(table_file['nrows']), tuple(table_file['window']), str(table_file['created']), rows)
+	finally:
+		table_file.close()
+
+
+def from_options(options):
+	"""CalibTable of the --calib=file option, None if not given"""
+	if ('calib' not in options):
+		return None
+	return load_table(options['calib'])
+
+
+def calibrate_blocks(blocks, calib_table):
+	"""Row blocks calibrated with calib_table, the blocks themselves if calib_table is None"""
+	if (calib_table is None):
+		return blocks
+	return calib_table.blocks(blocks)
+
+
+def table_id(calib_table):
+	"""Id of calib_table for the cache keys, None without calibration"""
+	if (calib_table is None):
+		return None
+	return calib_table.table_id
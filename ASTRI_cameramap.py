@@ -0,0 +1,127 @@
+"""
+ ASTRI_cameramap.py  -  description
+ ---------------------------------------------------------------------------------
+ Per-pixel statistics of the ASTRI camera on the focal plane layout
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_cameramap
+ pixel_stats = ASTRI_cameramap.camera_stats(dl0_astri, 'HI', minval, maxval)
+ mean_map = ASTRI_cameramap.map_values(pixel_stats, 'mean')
+ image = ASTRI_cameramap.focal_plane_image(mean_map)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - pdm_positions: (row, column) of each PDM on the 7 x 7 grid of the camera
+ - pdm_side: pixels on a side of a PDM (8 for the 64 pixels of HI/LO)
+ - pixel_positions: (row, column) of each pixel of each PDM on the focal plane
+ - camera_stats: per-pixel statistics of a parameter in a single pass over the rows
+ - map_values: [nPDM, elements] map of a quantity (mean, rms, entries, out)
+ - focal_plane_image: 2-D image of a map, NaN where there is no PDM
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The 37 PDMs fill a 7 x 7 grid without the 3 positions of each corner. They are numbered
+ row by row from the top left, the 64 pixels of a PDM row by row on its 8 x 8 grid.
+ Row 0 is the top row of the camera image.
+ The statistics are those of ASTRI_stats, with the window convention of ASTRI_histo:
+ mean and rms of the values inside the window, entries of all the values read, out the
+ fraction of the values read outside the window (e.g. saturated or dead pixels).
+ A histogram cube (ASTRI_cube) holds the same statistics, so a map can be made from a
+ cube file without reading the FITS file again.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Event selection of camera_stats (ASTRI_expr).
+ - 2026/10/18: Selection columns and rows through ASTRI_expr.selection_columns and select_blocks.
+
+"""
+
+import numpy as np
+
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_stats
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+# PDMs on a side of the camera grid
+CAMERA_SIDE = 7
+
+QUANTITIES = ('mean', 'rms', 'entries', 'out')
+
+
+def pdm_positions(nPDM = ASTRI_nPDM):
+	"""(row, column) on the camera grid of the PDMs 1 to nPDM"""
+	positions = []
+	last = CAMERA_SIDE - 1
+	for row in range(CAMERA_SIDE):
+		for column in range(CAMERA_SIDE):
+			# the corner and its two neighbours are empty
+			if (min(row, last - row) + min(column, last - column) >= 2):
+				positions.append((row, column))
+	return positions[:nPDM]
+
+
+def pdm_side(nelem):
+	"""Pixels on a side of a PDM of nelem pixels"""
+	side = int(round(np.sqrt(nelem)))
+	if (side*side != nelem):
+		raise ValueError('The '+str(nelem)+' elements of a PDM are not a square grid')
+	return side
+
+
+def pixel_positions(nPDM, nelem):
+	"""Return (rows, columns), the [nPDM, nelem] focal plane positions of the pixels"""
+	side = pdm_side(nelem)
+	pixel_row, pixel_column = np.divmod(np.arange(nelem), side)
+	positions = np.array(pdm_positions(nPDM))
+	rows = positions[:, 0:1]*side + pixel_row
+	columns = positions[:, 1:2]*side + pixel_column
+	return rows, columns
+
+
+def camera_stats(dl0_astri, param, minval, maxval, start = 0, stop = 0, maxevt = 0, block_size = None, nPDM = ASTRI_nPDM,
+	tstart = None, tstop = None, selection = None):
+	"""[nPDM, elements] StatsAccumulator of the parameter param of the DL0File dl0_astri,
+	the values inside the window minval, maxval being selected, only the rows of the Selection
+	selection if given (ASTRI_expr)"""
+	fields = ASTRI_histo.pdm_fields(0, param, nPDM = nPDM)
+	pixel_stats = ASTRI_stats.StatsAccumulator((nPDM, dl0_astri.element_count(fields[0])))
+	read_fields = fields + ASTRI_expr.selection_columns(selection)
+	if (block_size is None):
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt)
+	else:
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt, block_size)
+	blocks = ASTRI_expr.select_blocks(blocks, selection)
+	for row_start, block in blocks:
+		for pdm_index, field in enumerate(fields):
+			values = ASTRI_histo.select_subfield(block[field], 0)
+			pixel_stats.add(values, ASTRI_histo.window_mask(values, minval, maxval), pdm_index)
+	return pixel_stats
+
+
+def map_values(pixel_stats, quantity):
+	"""[nPDM, elements] values of quantity (mean, rms, entries, out) of the StatsAccumulator pixel_stats"""
+	if (quantity == 'mean'):
+		return pixel_stats.mean_value()
+	if (quantity == 'rms'):
+		return pixel_stats.rms()
+	if (quantity == 'entries'):
+		return pixel_stats.entries().astype(np.float64)
+	if (quantity == 'out'):
+		entries = pixel_stats.entries()
+		return np.where(entries > 0, pixel_stats.n_out/np.maximum(entries, 1).astype(np.float64), np.nan)
+	raise ValueError('Unknown quantity '+quantity+' (quantities: '+', '.join(QUANTITIES)+')')
+
+
+def focal_plane_image(values):
+	"""[rows, columns] image of the [nPDM, elements] values on the focal plane, NaN outside the PDMs"""
+	nPDM, nelem = values.shape
+	side = pdm_side(nelem)
+	image = np.zeros((CAMERA_SIDE*side, CAMERA_SIDE*side)) + np.nan
+	rows, columns = pixel_positions(nPDM, nelem)
+	image[rows, columns] = values
+	return image
@@ -0,0 +1,71 @@
+"""
+ ASTRI_cli.py  -  description
+ ---------------------------------------------------------------------------------
+ Command line helpers for the ASTRI quicklook scripts
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_cli
+ arg_list, options = ASTRI_cli.split_options(sys.argv)
+ start = ASTRI_cli.int_option(options, 'start', 0)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - split_options: split the command line into positional arguments and --options
+ - int_option: integer value of an option
+ - float_option: float value of an option
+ - file_list: FITS files of a glob pattern or of a list file (@listfile)
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The options have the form --key=value or --key (flag) and can be placed anywhere
+ in the command line, the positional arguments keep their order.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: file_list (from batchASTRI_histo.py).
+
+"""
+
+import glob
+
+
+def split_options(arg_list):
+	"""Return (positional arguments, dictionary of the --key[=value] options).
+	A flag given without value is stored as True."""
+	args = []
+	options = {}
+	for arg in arg_list:
+		if (arg[:2] == '--'):
+			key, sep, value = arg[2:].partition('=')
+			if (sep):
+				options[key] = value
+			else:
+				options[key] = True
+		else:
+			args.append(arg)
+	return args, options
+
+
+def int_option(options, key, default):
+	"""Integer value of the option key, default if not given (or given as flag)"""
+	if ((key in options) and (options[key] is not True)):
+		return int(options[key])
+	return default
+
+
+def float_option(options, key, default):
+	"""Float value of the option key, default if not given (or given as flag)"""
+	if ((key in options) and (options[key] is not True)):
+		return float(options[key])
+	return default
+
+
+def file_list(files):
+	"""FITS files of the glob pattern files, or listed in the file files[1:] if files starts with @"""
+	if (files[0] == '@'):
+		list_file = open(files[1:])
+		filenames = [line.strip() for line in list_file if line.strip() != '']
+		list_file.close()
+		return filenames
+	return sorted(glob.glob(files))
@@ -0,0 +1,84 @@
+"""
+ ASTRI_columnar.py  -  description
+ ---------------------------------------------------------------------------------
+ Conversion of the ASTRI DL0 data to a columnar store
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_columnar
+ store_dir = ASTRI_columnar.convert(filename)
+ dl0 = ASTRI_reader.open_dl0(filename)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - convert: write the columnar store of a DL0 file
+ - column_file: name of the .npy file of a column
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The store (see ASTRI_reader.ColumnStore) is written in a single pass over the row
+ blocks of the DL0 file, each column being filled through a memory-mapped .npy file,
+ so the memory does not depend on the file size. The store is written in a temporary
+ directory, renamed to filename.col when complete: an interrupted conversion does not
+ leave a store that looks valid.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import numpy as np
+import tempfile
+import shutil
+import json
+import os
+
+import ASTRI_reader
+
+
+def column_file(name):
+	"""Name of the .npy file of the column name"""
+	return name + '.npy'
+
+
+def convert(filename, hdu = 1, block_size = ASTRI_reader.DEFAULT_BLOCK_SIZE):
+	"""Write the columnar store of the DL0 file filename (all the columns of the extension hdu),
+	return its directory"""
+	dl0_astri = ASTRI_reader.DL0File(filename, hdu)
+	file_stat = os.stat(filename)
+	store_dir = ASTRI_reader.store_path(filename)
+	temp_dir = tempfile.mkdtemp(suffix=ASTRI_reader.STORE_EXT, dir=os.path.dirname(os.path.abspath(store_dir)))
+	try:
+		columns = []
+		arrays = {}
+		for name in dl0_astri.names:
+			# native byte order, with the TSCALE/TZERO of the file
+			dtype = dl0_astri.field_dtype(name).newbyteorder('=')
+			shape = dl0_astri.raw_dtype[name].shape
+			arrays[name] = np.lib.format.open_memmap(os.path.join(temp_dir, column_file(name)), mode='w+',
+				dtype=dtype, shape=(dl0_astri.nrows,) + shape)
+			columns.append({'name': name, 'file': column_file(name), 'dtype': dtype.str, 'shape': list(shape)})
+
+		for row_start, block in dl0_astri.iter_blocks(dl0_astri.names, 0, 0, 0, block_size):
+			for name in dl0_astri.names:
+				arrays[name][row_start:row_start + len(block[name])] = block[name]
+		for name in dl0_astri.names:
+			arrays[name].flush()
+		del arrays
+
+		manifest = {'source': os.path.abspath(filename), 'size': file_stat.st_size, 'mtime': file_stat.st_mtime,
+			'hdu': hdu, 'nrows': dl0_astri.nrows, 'columns': columns}
+		manifest_file = open(os.path.join(temp_dir, ASTRI_reader.STORE_MANIFEST), 'w')
+		try:
+			json.dump(manifest, manifest_file, indent=1)
+		finally:
+			manifest_file.close()
+
+		# replace an old store
+		if (os.path.isdir(store_dir)):
+			shutil.rmtree(store_dir)
+		os.rename(temp_dir, store_dir)
+	except:
+		shutil.rmtree(temp_dir, ignore_errors=True)
+		raise
+	return store_dir
@@ -0,0 +1,155 @@
+"""
+ ASTRI_cube.py  -  description
+ ---------------------------------------------------------------------------------
+ Per-pixel histogram cube of the whole ASTRI camera for the DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_cube
+ histo_cube = ASTRI_cube.build_cube(dl0_astri, param, nbins, minval, maxval)
+ histo_cube.save('run.cube.npz')
+ histo_cube = ASTRI_cube.load_cube('run.cube.npz')
+ N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - HistoCube: [nPDM, elements, nbins] counts cube with shared bin edges
+ - new_cube: empty cube of a parameter of a DL0 file
+ - build_cube: fill a cube in a single pass over the row blocks of a DL0 file
+ - load_cube: read a cube saved with HistoCube.save
+ - is_cube_file: True if the file name is a cube file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The cube holds one histogram per PDM and element (pixel for HI/LO, sensor for T),
+ e.g. [37, 64, nbins] for HI or [37, 16, nbins] for T, with the window convention
+ of ASTRI_histo. A camera or PDM histogram is a sum over the cube.
+ Entries, Mean and RMS are kept per element in a StatsAccumulator (ASTRI_stats).
+ The cube is saved as a compressed numpy .npz file.
+ With a memory budget (ASTRI_memory) a cube larger than the budget allows is kept on disk.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Per-element statistics with ASTRI_stats.
+ - 2026/10/18: new_cube, empty cube to be filled block by block (live displays).
+ - 2026/10/18: TIME_S window of build_cube (ASTRI_timeindex).
+ - 2026/10/18: Calibration of the values of build_cube (ASTRI_calib).
+ - 2026/10/18: Event selection of build_cube (ASTRI_expr).
+ - 2026/10/18: Counts allocated within the memory budget (ASTRI_memory).
+ - 2026/10/18: Selection columns and rows through ASTRI_expr.selection_columns and select_blocks.
+ - 2026/10/18: load_cube without allocating empty counts first.
+
+"""
+
+import numpy as np
+
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_stats
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+CUBE_EXT = '.npz'
+
+
+class HistoCube(object):
+	"""[nPDM, nelem, nbins] histograms of the element (pixel) values of the parameter param. counts, if given,
+	are the histograms (load_cube), else they are allocated empty."""
+
+	def __init__(self, param, nbins, minval, maxval, nelem, dtype = np.float64, nPDM = ASTRI_nPDM, counts = None):
+		self.param = param
+		self.nbins = nbins
+		self.minval = minval
+		self.maxval = maxval
+		self.fields = ASTRI_histo.pdm_fields(0, param, nPDM = nPDM)
+		self.bin_array = ASTRI_histo.bin_edges(nbins, minval, maxval, dtype)
+		if (counts is None):
+			counts = ASTRI_memory.zeros((nPDM, nelem, nbins), np.int64, 'histogram cube')
+		elif (counts.shape != (nPDM, nelem, nbins)):
+			raise ValueError('Histogram cube of '+param+': counts of shape '+str(counts.shape)+', expected '+str((nPDM, nelem, nbins)))
+		self.counts = counts
+		self.stats = ASTRI_stats.StatsAccumulator((nPDM, nelem))
+
+	def fill(self, block):
+		"""Add a row block (dictionary field name -> array) of ASTRI_reader"""
+		for pdm_index, field in enumerate(self.fields):
+			values = ASTRI_histo.select_subfield(block[field], 0)
+			mask = ASTRI_histo.window_mask(values, self.minval, self.maxval)
+			self.stats.add(values, mask, pdm_index)
+			self.counts[pdm_index] += ASTRI_histo.histogram_elements(values, self.bin_array, mask)
+
+	def fill_blocks(self, blocks):
+		"""Add the row blocks (row_start, block) of ASTRI_reader"""
+		for row_start, block in blocks:
+			self.fill(block)
+
+	def selection(self, selPDM, subfield_id):
+		"""Index of the cube for the PDM selPDM (0 = all) and the element subfield_id (0 = all)"""
+		if (selPDM > 0):
+			pdm_slice = slice(selPDM-1, selPDM)
+		else:
+			pdm_slice = slice(None)
+		if (subfield_id > 0):
+			elem_slice = slice(subfield_id-1, subfield_id)
+		else:
+			elem_slice = slice(None)
+		return pdm_slice, elem_slice
+
+	def histogram(self, selPDM, subfield_id):
+		"""Return (N_counts, bin_array, N_entries, mean_out, sd_out) for the PDM selPDM (0 = all)
+		and the element subfield_id (0 = all), as ASTRI_histo does on the FITS file"""
+		pdm_slice, elem_slice = self.selection(selPDM, subfield_id)
+		N_counts = self.counts[pdm_slice, elem_slice].sum(axis=(0, 1))
+		N_entries, mean_out, sd_out = self.stats.total((pdm_slice, elem_slice)).summary()
+		return N_counts, self.bin_array, N_entries, mean_out, sd_out
+
+	def save(self, filename):
+		"""Write the cube to a compressed .npz file"""
+		np.savez_compressed(filename, param=self.param, nbins=self.nbins, minval=self.minval, maxval=self.maxval,
+			bin_array=self.bin_array, counts=self.counts, **self.stats.to_arrays())
+
+
+def new_cube(dl0_astri, param, nbins, minval, maxval, nPDM = ASTRI_nPDM, calib_table = None):
+	"""Empty cube of the parameter param, with the elements and the type of the DL0File dl0_astri
+	(calibrated with the CalibTable calib_table if given)"""
+	first_field = ASTRI_histo.pdm_field(1, param)
+	return HistoCube(param, nbins, minval, maxval, dl0_astri.element_count(first_field), ASTRI_histo.field_dtype(dl0_astri, first_field, calib_table), nPDM = nPDM)
+
+
+def build_cube(dl0_astri, param, nbins, minval, maxval, start = 0, stop = 0, maxevt = 0, block_size = None, nPDM = ASTRI_nPDM,
+	tstart = None, tstop = None, calib_table = None, selection = None):
+	"""Fill the cube of the parameter param in a single pass over the rows of the DL0File dl0_astri,
+	only the rows with tstart <= TIME_S < tstop if given, the values being calibrated with the
+	CalibTable calib_table if given, only the rows of the Selection selection if given (ASTRI_expr)"""
+	histo_cube = new_cube(dl0_astri, param, nbins, minval, maxval, nPDM = nPDM, calib_table = calib_table)
+	read_fields = histo_cube.fields + ASTRI_expr.selection_columns(selection)
+	if (block_size is None):
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt)
+	else:
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt, block_size)
+	if (calib_table is not None):
+		blocks = calib_table.blocks(blocks)
+	blocks = ASTRI_expr.select_blocks(blocks, selection)
+	histo_cube.fill_blocks(blocks)
+	return histo_cube
+
+
+def load_cube(filename):
+	"""Read a cube written by HistoCube.save"""
+	cube_file = np.load(filename)
+	counts = cube_file['counts']
+	nPDM, nelem, nbins = counts.shape
+	histo_cube = HistoCube(str(cube_file['param']), nbins, cube_file['minval'].item(), cube_file['maxval'].item(), nelem, cube_file['bin_array'].dtype,
+		nPDM = nPDM, counts = counts)
+	histo_cube.bin_array = cube_file['bin_array']
+	histo_cube.stats = ASTRI_stats.StatsAccumulator.from_arrays(cube_file)
+	cube_file.close()
+	return histo_cube
+
+
+def is_cube_file(filename):
+	"""True if filename is a histogram cube (and not a FITS file)"""
+	return filename.endswith(CUBE_EXT)
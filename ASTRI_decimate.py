@@ -0,0 +1,165 @@
+"""
+ ASTRI_decimate.py  -  description
+ ---------------------------------------------------------------------------------
+ Min/max envelope decimation of the time series of the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_decimate
+ envelope = ASTRI_decimate.MinMaxEnvelope(npoints)
+ envelope.add(data_column)
+ plot_index = ASTRI_decimate.with_points(envelope.index(), [xvalue_temp-1, xvalue_graph-1], len(data_column))
+ plt.plot(time_column[plot_index], data_column[plot_index])
+ ---------------------------------------------------------------------------------
+ Functions:
+ - MinMaxEnvelope: streaming min/max envelope of a series in a bounded number of points
+ - envelope_index: indices of the envelope of a series
+ - window_index: row range of the points of a series inside an x-axis window
+ - with_points: add the indices of points that must be plotted exactly
+ - bucket_means: [channels, events] values averaged over groups of events (heatmaps)
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The series is divided in buckets of consecutive rows (stride rows each), and for each
+ bucket the rows of the minimum and of the maximum are kept, so the plot of the decimated
+ series has the same extremes as the full one. When the number of buckets exceeds npoints/2
+ the stride is doubled and the buckets are merged by pairs: the values can be added block
+ by block (e.g. the rows of a growing file) and the memory does not depend on the length
+ of the series. The returned indices are rows of the series, so the decimated points are
+ real points of the series (no interpolation). NaN values are ignored.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: bucket_means for the heatmap of the multi-channel series.
+ - 2026/10/18: bucket_means without a float64 copy of the series.
+
+"""
+
+import numpy as np
+
+
+class MinMaxEnvelope(object):
+	"""Rows of the minimum and maximum of each bucket of a series, at most npoints rows"""
+
+	def __init__(self, npoints):
+		self.nbuckets = max(npoints//2, 1)
+		self.stride = 1
+		self.count = 0
+		self.imin = np.zeros(0, dtype=np.int64)
+		self.vmin = np.zeros(0, dtype=np.float64)
+		self.imax = np.zeros(0, dtype=np.int64)
+		self.vmax = np.zeros(0, dtype=np.float64)
+
+	def add(self, values):
+		"""Add the values following the ones already added"""
+		values = np.asarray(values, dtype=np.float64).ravel()
+		if (len(values) == 0):
+			return
+		first = self.count
+		self.count += len(values)
+		# the buckets of the whole series must fit in the budget
+		while ((self.count - 1)//self.stride + 1 > self.nbuckets):
+			self._merge_pairs()
+
+		bucket_id = np.arange(first, self.count)//self.stride
+		starts = np.flatnonzero(np.r_[True, bucket_id[1:] != bucket_id[:-1]])
+		imin, imax = bucket_extremes(values, starts)
+		new_imin = imin + first
+		new_imax = imax + first
+		new_vmin = values[imin]
+		new_vmax = values[imax]
+		# the first bucket of the block can continue the last one already filled
+		if ((len(self.imin) > 0) and (bucket_id[0] == len(self.imin) - 1)):
+			self.imin[-1:], self.vmin[-1:] = combine(self.imin[-1:], self.vmin[-1:], new_imin[:1], new_vmin[:1], np.less)
+			self.imax[-1:], self.vmax[-1:] = combine(self.imax[-1:], self.vmax[-1:], new_imax[:1], new_vmax[:1], np.greater)
+			new_imin, new_vmin, new_imax, new_vmax = new_imin[1:], new_vmin[1:], new_imax[1:], new_vmax[1:]
+		self.imin = np.concatenate((self.imin, new_imin))
+		self.vmin = np.concatenate((self.vmin, new_vmin))
+		self.imax = np.concatenate((self.imax, new_imax))
+		self.vmax = np.concatenate((self.vmax, new_vmax))
+
+	def _merge_pairs(self):
+		"""Double the stride, merging the buckets by pairs"""
+		self.stride *= 2
+		npairs = len(self.imin)//2
+		if (npairs == 0):
+			return
+		imin, vmin = combine(self.imin[0:2*npairs:2], self.vmin[0:2*npairs:2], self.imin[1:2*npairs:2], self.vmin[1:2*npairs:2], np.less)
+		imax, vmax = combine(self.imax[0:2*npairs:2], self.vmax[0:2*npairs:2], self.imax[1:2*npairs:2], self.vmax[1:2*npairs:2], np.greater)
+		self.imin = np.concatenate((imin, self.imin[2*npairs:]))
+		self.vmin = np.concatenate((vmin, self.vmin[2*npairs:]))
+		self.imax = np.concatenate((imax, self.imax[2*npairs:]))
+		self.vmax = np.concatenate((vmax, self.vmax[2*npairs:]))
+
+	def index(self):
+		"""Sorted rows of the envelope"""
+		return np.union1d(self.imin, self.imax)
+
+
+def bucket_extremes(values, starts):
+	"""Return (imin, imax): row of the minimum and of the maximum of each bucket of values,
+	the buckets starting at the rows starts. The first row is taken for ties and all-NaN buckets."""
+	sizes = np.diff(np.r_[starts, len(values)])
+	bucket = np.repeat(np.arange(len(starts)), sizes)
+	imin = starts.copy()
+	imax = starts.copy()
+	for extremes, reduce_func in ((imin, np.fmin), (imax, np.fmax)):
+		matches = np.flatnonzero(values == np.repeat(reduce_func.reduceat(values, starts), sizes))
+		found, first_match = np.unique(bucket[matches], return_index=True)
+		extremes[found] = matches[first_match]
+	return imin, imax
+
+
+def combine(index_a, value_a, index_b, value_b, better):
+	"""Element-wise choice between the extremes a and b (a earlier in the series):
+	b is taken where better(value_b, value_a) or value_a is NaN"""
+	take_b = better(value_b, value_a) | (np.isnan(value_a) & ~np.isnan(value_b))
+	return np.where(take_b, index_b, index_a), np.where(take_b, value_b, value_a)
+
+
+def envelope_index(data_column, npoints):
+	"""Sorted rows of the min/max envelope of data_column in at most npoints points"""
+	envelope = MinMaxEnvelope(npoints)
+	envelope.add(data_column)
+	return envelope.index()
+
+
+def window_index(x_column, xmin, xmax):
+	"""Return (first, last): rows [first, last) of the points with xmin <= x <= xmax, plus one
+	point on each side so that the line reaches the edges of the window"""
+	x_column = np.asarray(x_column)
+	if (len(x_column) == 0):
+		return 0, 0
+	if (np.all(x_column[1:] >= x_column[:-1])):
+		first = np.searchsorted(x_column, xmin, side='left')
+		last = np.searchsorted(x_column, xmax, side='right')
+	else:
+		# not monotonic (e.g. TIME_S resets): first and last row inside the window
+		inside = np.flatnonzero((x_column >= xmin) & (x_column <= xmax))
+		if (len(inside) == 0):
+			return 0, 0
+		first = inside[0]
+		last = inside[-1] + 1
+	return max(first - 1, 0), min(last + 1, len(x_column))
+
+
+def with_points(index, points, length):
+	"""Sorted rows index plus the rows points (if inside the series of the given length)"""
+	points = np.asarray(points, dtype=np.int64)
+	points = points[(points >= 0) & (points < length)]
+	return np.union1d(np.asarray(index, dtype=np.int64), points)
+
+
+def bucket_means(channel_data, npoints):
+	"""Return (mean_data, starts): the [channels, events] values averaged over at most npoints
+	groups of consecutive events, starts being the first event of each group"""
+	# summed as float64 without a float64 copy of the data (e.g. a series on disk, ASTRI_memory)
+	channel_data = np.asarray(channel_data)
+	nevents = channel_data.shape[-1]
+	if (nevents == 0):
+		return channel_data.astype(np.float64), np.zeros(0, dtype=np.int64)
+	stride = (nevents - 1)//max(npoints, 1) + 1
+	starts = np.arange(0, nevents, stride)
+	sizes = np.diff(np.r_[starts, nevents])
+	return np.add.reduceat(channel_data, starts, axis=-1, dtype=np.float64)/sizes, starts
@@ -0,0 +1,229 @@
+"""
+ ASTRI_expr.py  -  description
+ ---------------------------------------------------------------------------------
+ Event selection expressions over the columns of the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_expr
+ selection = ASTRI_expr.Selection('PDM05HI[12] > 900 and 100 <= TIME_S < 200 and max(PDM05T) < 30', dl0_astri)
+ fields = ASTRI_histo.pdm_fields(selPDM, param) + selection.columns
+ blocks = selection.blocks(dl0_astri.iter_blocks(fields))
+ ---------------------------------------------------------------------------------
+ Functions:
+ - Selection: expression compiled once into numpy mask operations on the row blocks
+ - from_options: Selection of the --where=expression option (None if not given)
+ - select_blocks: row blocks with only the selected rows, if a selection is given
+ - selection_columns: columns read by a selection ([] without selection)
+ - selection_key: text of a selection for the keys of the result cache
+ ---------------------------------------------------------------------------------
+ Caveats:
+ An expression selects rows (events). It is made of:
+ - column names of the DL0 file (e.g. TIME_S, PDM05HI), an element being selected with
+   [i], starting from 1 as subfield_id (e.g. PDM05HI[12] is pixel 12 of PDM05)
+ - numbers, + - * / (computed as float), comparisons < <= > >= == != (chained as in
+   Python, e.g. 100 <= TIME_S < 200), and, or, not (or & | ~) and parentheses
+ - functions of the elements of a column in a row: any, all (of a comparison, e.g.
+   any(PDM05HI > 3000)), min, max, mean, sum, and abs
+ A column of several elements without [i] must be reduced by one of these functions:
+ the expression has one value per row.
+ The expression is parsed once (Python syntax, only the elements above are accepted) and
+ each row block is evaluated with numpy operations on the whole block. Only the columns
+ of the expression are read in addition to the ones of the analysis.
+ The rows not selected are removed from the blocks: they are not read values (Entries).
+ The selected rows keep their row numbers in the block field sROW of ASTRI_reader.
+ The selection is applied after the calibration (ASTRI_calib), if any: the thresholds on
+ the calibrated parameters are in calibrated units.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import numpy as np
+import ast
+
+import ASTRI_reader
+
+# kinds of the values of an expression node
+CONST = 'constant'
+ROW = 'row'
+ELEMENTS = 'elements'
+
+COMPARISONS = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+	ast.Eq: np.equal, ast.NotEq: np.not_equal}
+
+ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide}
+
+LOGICAL = {ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or, ast.And: np.logical_and, ast.Or: np.logical_or}
+
+# functions of the elements of a column in a row
+REDUCTIONS = {'any': np.any, 'all': np.all, 'min': np.min, 'max': np.max, 'mean': np.mean, 'sum': np.sum}
+
+
+class Selection(object):
+	"""Row selection expression compiled for the columns of the DL0File dl0_astri"""
+
+	def __init__(self, expression, dl0_astri):
+		self.expression = expression.strip()
+		self.dl0_astri = dl0_astri
+		self.columns = []
+		try:
+			tree = ast.parse(self.expression, mode='eval')
+		except SyntaxError as error:
+			raise ValueError('Invalid selection expression '+repr(self.expression)+': '+str(error))
+		self.evaluate, kind = self._compile(tree.body)
+		if (kind == ELEMENTS):
+			self._error('one value per row is needed, reduce the columns with any(), all(), min(), max(), mean() or sum()')
+
+	def _error(self, message):
+		raise ValueError('Invalid selection expression '+repr(self.expression)+': '+message)
+
+	def _column(self, name):
+		if (name not in self.dl0_astri.names):
+			self._error('column '+name+' not found in '+self.dl0_astri.filename)
+		if (name not in self.columns):
+			self.columns.append(name)
+		return self.dl0_astri.element_count(name)
+
+	def _compile(self, node):
+		"""Return (function of a row block, kind of its values) of the node of the syntax tree"""
+		if (isinstance(node, ast.Num)):
+			value = node.n
+			return (lambda block: value), CONST
+
+		if (isinstance(node, ast.Name)):
+			name = node.id
+			if (self._column(name) == 1):
+				return (lambda block: block[name].reshape(len(block[name]))), ROW
+			return (lambda block: block[name].reshape(len(block[name]), -1)), ELEMENTS
+
+		if (isinstance(node, ast.Subscript)):
+			if ((not isinstance(node.value, ast.Name)) or (not isinstance(node.slice, ast.Index)) or (not isinstance(node.slice.value, ast.Num))):
+				self._error('only column[element] is allowed, e.g. PDM05HI[12]')
+			name = node.value.id
+			elem_id = node.slice.value.n
+			nelem = self._column(name)
+			if ((elem_id != int(elem_id)) or (elem_id < 1) or (elem_id > nelem)):
+				self._error('element '+str(elem_id)+' of '+name+' out of range (1 to '+str(nelem)+')')
+			elem_index = int(elem_id) - 1
+			return (lambda block: block[name].reshape(len(block[name]), -1)[:, elem_index]), ROW
+
+		if (isinstance(node, ast.Call)):
+			if ((not isinstance(node.func, ast.Name)) or (len(node.args) != 1) or node.keywords or node.starargs or node.kwargs):
+				self._error('functions take one argument, e.g. max(PDM05T)')
+			function_name = node.func.id
+			argument, kind = self._compile(node.args[0])
+			if (function_name == 'abs'):
+				return (lambda block: np.abs(argument(block))), kind
+			if (function_name not in REDUCTIONS):
+				self._error('unknown function '+function_name+' (functions: abs, '+', '.join(sorted(REDUCTIONS))+')')
+			if (kind != ELEMENTS):
+				return argument, kind
+			reduction = REDUCTIONS[function_name]
+			return (lambda block: reduction(argument(block), axis=1)), ROW
+
+		if (isinstance(node, ast.UnaryOp)):
+			operand, kind = self._compile(node.operand)
+			if (isinstance(node.op, (ast.Not, ast.Invert))):
+				return (lambda block: np.logical_not(operand(block))), kind
+			if (isinstance(node.op, ast.USub)):
+				return (lambda block: np.negative(operand(block), dtype=np.float64)), kind
+			if (isinstance(node.op, ast.UAdd)):
+				return operand, kind
+
+		if (isinstance(node, ast.BinOp)):
+			if (type(node.op) in ARITHMETIC):
+				# float, so that unsigned ADC counts do not wrap around
+				ufunc = ARITHMETIC[type(node.op)]
+				return self._combine(lambda left, right: ufunc(left, right, dtype=np.float64), [node.left, node.right])
+			if (type(node.op) in LOGICAL):
+				return self._combine(LOGICAL[type(node.op)], [node.left, node.right])
+
+		if (isinstance(node, ast.BoolOp)):
+			ufunc = LOGICAL[type(node.op)]
+			return self._combine(lambda *values: reduce(ufunc, values), node.values)
+
+		if (isinstance(node, ast.Compare)):
+			# a < b < c is (a < b) and (b < c)
+			operands = [node.left] + node.comparators
+			parts = []
+			for op, left, right in zip(node.ops, operands[:-1], operands[1:]):
+				if (type(op) not in COMPARISONS):
+					self._error('unknown comparison '+type(op).__name__)
+				parts.append(self._combine(COMPARISONS[type(op)], [left, right]))
+			if (len(parts) == 1):
+				return parts[0]
+			kinds = [kind for function, kind in parts]
+			functions = [function for function, kind in parts]
+			return self._combine_compiled(lambda *values: reduce(np.logical_and, values), functions, kinds)
+
+		self._error('unsupported element '+type(node).__name__)
+
+	def _combine(self, ufunc, nodes):
+		"""(function, kind) of ufunc applied to the values of the nodes"""
+		compiled = [self._compile(node) for node in nodes]
+		return self._combine_compiled(ufunc, [function for function, kind in compiled], [kind for function, kind in compiled])
+
+	def _combine_compiled(self, ufunc, functions, kinds):
+		if (ELEMENTS in kinds):
+			# one value per row against the elements of the row
+			functions = [function if (kind != ROW) else (lambda block, function = function: function(block)[:, np.newaxis])
+				for function, kind in zip(functions, kinds)]
+			kind = ELEMENTS
+		elif (ROW in kinds):
+			kind = ROW
+		else:
+			kind = CONST
+		return (lambda block: ufunc(*[function(block) for function in functions])), kind
+
+	def mask(self, block):
+		"""[rows] boolean mask of the selected rows of a row block"""
+		nrows = len(block[ASTRI_reader.sTIME])
+		return np.broadcast_to(np.asarray(self.evaluate(block), dtype=bool), (nrows,))
+
+	def blocks(self, blocks):
+		"""Row blocks (row_start, block) with only the selected rows, the row numbers in block[sROW]"""
+		for row_start, block in blocks:
+			mask = self.mask(block)
+			if (mask.all()):
+				yield row_start, block
+				continue
+			if (not mask.any()):
+				continue
+			if (ASTRI_reader.sROW not in block):
+				block[ASTRI_reader.sROW] = np.arange(row_start, row_start + len(mask))
+			selected = {}
+			for name in block:
+				selected[name] = block[name][mask]
+			yield row_start, selected
+
+
+def from_options(options, dl0_astri):
+	"""Selection of the --where=expression option for the DL0File dl0_astri, None if not given"""
+	if ('where' not in options):
+		return None
+	return Selection(options['where'], dl0_astri)
+
+
+def select_blocks(blocks, selection):
+	"""Row blocks with only the rows of selection, the blocks themselves if selection is None"""
+	if (selection is None):
+		return blocks
+	return selection.blocks(blocks)
+
+
+def selection_columns(selection):
+	"""Columns read by selection, [] if selection is None"""
+	if (selection is None):
+		return []
+	return list(selection.columns)
+
+
+def selection_key(selection):
+	"""Text of selection for the cache keys, None without selection"""
+	if (selection is None):
+		return None
+	return selection.expression
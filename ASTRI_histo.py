@@ -0,0 +1,262 @@
+"""
+ ASTRI_histo.py  -  description
+ ---------------------------------------------------------------------------------
+ Vectorized event selection and histogram engine for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_histo
+ fields = ASTRI_histo.pdm_fields(selPDM, param)
+ blocks = ASTRI_reader.iter_blocks(filename, fields, start, stop, maxevt)
+ bin_array = ASTRI_histo.bin_edges(nbins, minval, maxval)
+ N_counts, pixel_stats = ASTRI_histo.accumulate(blocks, fields, subfield_id, bin_array, minval, maxval)
+ N_entries, mean_out, sd_out = pixel_stats.total().summary()
+ ---------------------------------------------------------------------------------
+ Functions:
+ - pdm_field: name of the FITS field of a PDM (e.g. PDM01HI)
+ - select_subfield: 2-D [events, elements] view of a FITS field
+ - window_mask: selection mask of the histogram window
+ - select_values: number of read values and values inside the window for one field
+ - pdm_fields: FITS fields of the selected PDM or of all the PDMs
+ - element_count: number of elements selected by subfield_id
+ - field_dtype: type of the values of a field, calibrated or not
+ - accumulate: histogram and streaming statistics over the row blocks of ASTRI_reader
+ - histo_file: accumulate over a DL0 file
+ - histo_dl0: accumulate over an open DL0File or ColumnStore
+ - histogram: histogram of the selected values
+ - bin_edges: bin edges of np.histogram
+ - bin_index: bin index of the values, with the edge convention of np.histogram
+ - integer_bins: first edge and width of bins of integer width, for integer values
+ - integer_bin_index: bin index of integer values by offset and division
+ - histogram_elements: histograms of each element (pixel) of a 2-D field
+ - bin_geometry: left edges and half widths of the bins
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The selection follows the convention of the visASTRI scripts:
+ minval < x < maxval, or x < maxval if minval = 0.
+ Entries counts all the read values, Mean and RMS only the ones inside the window.
+ The histogram and the statistics are accumulated block by block (ASTRI_stats),
+ so the memory does not depend on the number of events.
+ Integer values (the ADC counts of HI/LO) on bins of integer width starting at an integer
+ edge, e.g. nbins dividing maxval - minval, are binned by (x - first edge)//width and counted
+ with np.bincount, without comparing them with the edges and without converting the big-endian
+ FITS integers to float. The counts are the same as the ones of np.histogram. Any other case
+ uses the general path (bin_index).
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: collect_values works on the row blocks of ASTRI_reader.
+ - 2026/10/18: accumulate (streaming statistics) replaces collect_values and histo_stats.
+ - 2026/10/18: TIME_S window of histo_file (ASTRI_timeindex).
+ - 2026/10/18: histo_file reads the columnar store if present.
+ - 2026/10/18: Calibration of the values of histo_file (ASTRI_calib).
+ - 2026/10/18: Integer fast path of bin_index, histogram uses the bin_index kernel.
+ - 2026/10/18: Event selection of histo_file (ASTRI_expr).
+ - 2026/10/18: histo_dl0, histo_file of an open DL0 file (job files).
+ - 2026/10/18: Selection columns and rows through ASTRI_expr.selection_columns and select_blocks.
+
+"""
+
+import numpy as np
+
+import ASTRI_expr
+import ASTRI_reader
+import ASTRI_stats
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+
+def pdm_field(pdm_id, param):
+	"""Name of the FITS field for the PDM pdm_id (starting from 1), e.g. PDM01HI"""
+	if (pdm_id < 10):
+		return 'PDM0'+str(pdm_id)+param
+	else:
+		return 'PDM'+str(pdm_id)+param
+
+
+def select_subfield(column, subfield_id):
+	"""2-D [events, elements] view of a FITS field.
+	If subfield_id > 0 only the element subfield_id (starting from 1) is kept."""
+	column = np.asarray(column)
+	if (column.ndim == 1):
+		column = column.reshape(-1, 1)
+	elif (column.ndim > 2):
+		column = column.reshape(column.shape[0], -1)
+	if (subfield_id > 0):
+		column = column[:, subfield_id-1:subfield_id]
+	return column
+
+
+def window_mask(values, minval, maxval):
+	"""Selection mask of the histogram window: minval < x < maxval, or x < maxval if minval = 0"""
+	if (minval == 0):
+		return values < maxval
+	else:
+		return (values > minval) & (values < maxval)
+
+
+def select_values(column, subfield_id, minval, maxval):
+	"""Return (N_entries, data_column) for one FITS field: the number of read values and
+	the 1-D array of the values inside the window"""
+	values = select_subfield(column, subfield_id)
+	return values.size, values[window_mask(values, minval, maxval)]
+
+
+def pdm_fields(selPDM, param, nPDM = ASTRI_nPDM):
+	"""FITS fields of the PDM selPDM, or of all the PDMs if selPDM = 0"""
+	if (selPDM > 0):
+		return [pdm_field(selPDM, param)]
+	return [pdm_field(pdm_id, param) for pdm_id in range(1, nPDM+1)]
+
+
+def element_count(dl0_astri, field, subfield_id):
+	"""Number of elements of field selected by subfield_id in the DL0File dl0_astri"""
+	if (subfield_id > 0):
+		return 1
+	return dl0_astri.element_count(field)
+
+
+def field_dtype(dl0_astri, field, calib_table = None):
+	"""Type of the values of field in the DL0File dl0_astri, once calibrated with the CalibTable calib_table if given"""
+	dtype = dl0_astri.field_dtype(field)
+	if (calib_table is None):
+		return dtype
+	return calib_table.apply(field, np.zeros((0, dl0_astri.element_count(field)), dtype=dtype)).dtype
+
+
+def accumulate(blocks, fields, subfield_id, bin_array, minval, maxval, N_counts = None, pixel_stats = None):
+	"""Histogram and streaming statistics of the selection over the row blocks (row_start, block)
+	of ASTRI_reader. Return (N_counts, pixel_stats), pixel_stats being the StatsAccumulator
+	[fields, elements] of the selected values.
+	If N_counts and pixel_stats are given the blocks are added to them."""
+	if (N_counts is None):
+		N_counts = np.zeros(len(bin_array) - 1, dtype=np.int64)
+	for row_start, block in blocks:
+		for field_index, field in enumerate(fields):
+			values = select_subfield(block[field], subfield_id)
+			mask = window_mask(values, minval, maxval)
+			if (pixel_stats is None):
+				pixel_stats = ASTRI_stats.StatsAccumulator((len(fields), values.shape[1]))
+			pixel_stats.add(values, mask, field_index)
+			N_counts += histogram_elements(values, bin_array, mask).sum(axis=0)
+
+	if (pixel_stats is None):
+		pixel_stats = ASTRI_stats.StatsAccumulator((len(fields), 0))
+	return N_counts, pixel_stats
+
+
+def histo_file(filename, selPDM, param, subfield_id, nbins, minval, maxval, start = 0, stop = 0, maxevt = 0,
+	block_size = ASTRI_reader.DEFAULT_BLOCK_SIZE, nPDM = ASTRI_nPDM, tstart = None, tstop = None, calib_table = None, selection = None):
+	"""Histogram of the DL0 file filename in a single streaming pass, only the rows with
+	tstart <= TIME_S < tstop if given (ASTRI_timeindex), the values being calibrated with the
+	CalibTable calib_table if given (ASTRI_calib), only the rows of the Selection selection if
+	given (ASTRI_expr). Return (N_counts, bin_array, pixel_stats) as accumulate."""
+	return histo_dl0(ASTRI_reader.open_dl0(filename), selPDM, param, subfield_id, nbins, minval, maxval, start, stop, maxevt,
+		block_size, nPDM, tstart, tstop, calib_table, selection)
+
+
+def histo_dl0(dl0_astri, selPDM, param, subfield_id, nbins, minval, maxval, start = 0, stop = 0, maxevt = 0,
+	block_size = ASTRI_reader.DEFAULT_BLOCK_SIZE, nPDM = ASTRI_nPDM, tstart = None, tstop = None, calib_table = None, selection = None):
+	"""histo_file of the DL0File (or ColumnStore) dl0_astri already open"""
+	fields = pdm_fields(selPDM, param, nPDM = nPDM)
+	bin_array = bin_edges(nbins, minval, maxval, field_dtype(dl0_astri, fields[0], calib_table))
+	pixel_stats = ASTRI_stats.StatsAccumulator((len(fields), element_count(dl0_astri, fields[0], subfield_id)))
+	read_fields = fields + ASTRI_expr.selection_columns(selection)
+	blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt, block_size)
+	if (calib_table is not None):
+		blocks = calib_table.blocks(blocks)
+	blocks = ASTRI_expr.select_blocks(blocks, selection)
+	N_counts, pixel_stats = accumulate(blocks, fields, subfield_id, bin_array, minval, maxval, pixel_stats = pixel_stats)
+	return N_counts, bin_array, pixel_stats
+
+
+def histogram(data_column, nbins, minval, maxval):
+	"""Return (N_counts, bin_array) of the selected values, as np.histogram"""
+	data_column = np.asarray(data_column)
+	bin_array = bin_edges(nbins, minval, maxval, data_column.dtype)
+	index = bin_index(data_column, bin_array)
+	return np.bincount(index[index >= 0], minlength=nbins).astype(np.int64), bin_array
+
+
+def bin_edges(nbins, minval, maxval, dtype = np.float64):
+	"""Bin edges of np.histogram over (minval, maxval) for data of type dtype"""
+	return np.histogram(np.zeros(0, dtype=dtype), bins = nbins, range=(minval, maxval))[1]
+
+
+def bin_index(values, bin_array):
+	"""Bin index (starting from 0) of the values for the uniform bins bin_array, -1 outside the bins.
+	The edges follow np.histogram: [bin_array[i], bin_array[i+1]), with the last bin closed."""
+	nbins = len(bin_array) - 1
+	values = np.asarray(values)
+	integer_edges = integer_bins(bin_array, values.dtype)
+	if (integer_edges is not None):
+		return integer_bin_index(values, integer_edges[0], integer_edges[1], nbins)
+	values = values.astype(bin_array.dtype)
+	index = np.zeros(values.shape, dtype=np.intp) - 1
+	keep = (values >= bin_array[0]) & (values <= bin_array[-1])
+	inside = values[keep]
+
+	# first guess, then corrected against the edges as np.histogram does
+	norm = nbins/(float(bin_array[-1]) - float(bin_array[0]))
+	jbin = ((inside.astype(np.float64) - float(bin_array[0]))*norm).astype(np.intp)
+	jbin[jbin == nbins] -= 1
+	jbin[inside < bin_array[jbin]] -= 1
+	jbin[(inside >= bin_array[jbin + 1]) & (jbin != nbins - 1)] += 1
+
+	index[keep] = jbin
+	return index
+
+
+def integer_bins(bin_array, dtype):
+	"""Return (first_edge, width) if the values of type dtype are integers and the bins bin_array
+	have the same integer width starting from an integer edge, else None"""
+	if (np.dtype(dtype).kind not in 'iu'):
+		return None
+	nbins = len(bin_array) - 1
+	first_edge = float(bin_array[0])
+	span = float(bin_array[-1]) - first_edge
+	if ((first_edge != np.floor(first_edge)) or (span % nbins != 0)):
+		return None
+	width = int(span)//nbins
+	if ((width < 1) or (not np.array_equal(bin_array, first_edge + width*np.arange(nbins + 1)))):
+		return None
+	return int(first_edge), width
+
+
+def integer_bin_index(values, first_edge, width, nbins):
+	"""Bin index (starting from 0) of the integer values for nbins bins of integer width
+	from first_edge, -1 outside the bins, the last bin being closed as in bin_index"""
+	# 16-bit ADC counts fit in int32 after the offset
+	if ((values.dtype.itemsize <= 2) and (abs(first_edge) < 2**30)):
+		index = np.subtract(values, first_edge, dtype=np.int32)
+	else:
+		index = np.subtract(values, first_edge, dtype=np.int64)
+	outside = (index < 0) | (index > nbins*width)
+	if (width > 1):
+		index //= width
+	# the upper edge belongs to the last bin
+	np.minimum(index, nbins - 1, out=index)
+	index[outside] = -1
+	return index
+
+
+def histogram_elements(values, bin_array, mask = None):
+	"""[elements, nbins] histograms of each column of the 2-D values [events, elements].
+	If mask is given only the values where mask is True are counted."""
+	nbins = len(bin_array) - 1
+	nelem = values.shape[1]
+	index = bin_index(values, bin_array)
+	valid = index >= 0
+	if (mask is not None):
+		valid &= mask
+	flat_index = (index + nbins*np.arange(nelem))[valid]
+	return np.bincount(flat_index, minlength=nelem*nbins).reshape(nelem, nbins)
+
+
+def bin_geometry(bin_array):
+	"""Return (x_array, err_x_array): left edges and half widths of the bins"""
+	return bin_array[:-1].copy(), np.diff(bin_array)/2.
@@ -0,0 +1,132 @@
+"""
+ ASTRI_jobs.py  -  description
+ ---------------------------------------------------------------------------------
+ Job files of the ASTRI quicklook plots: many plots of one DL0 file in one process
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_jobs
+ jobs = ASTRI_jobs.read_jobs(jobfile, options)
+ for cube_jobs in ASTRI_jobs.cube_groups(jobs):
+     ...
+ ---------------------------------------------------------------------------------
+ Functions:
+ - Job: one plot of a job file (kind, parameters, labels, options, image file)
+ - parse_job: Job of a line of a job file
+ - read_jobs: Jobs of a job file
+ - cube_groups: histogram Jobs filled by the same pass over the file (ASTRI_cube)
+ ---------------------------------------------------------------------------------
+ Caveats:
+ One plot per line, with the parameters of visASTRI_histo.py or visASTRI_temporal.py after
+ the file name, prefixed by the kind of plot:
+   histo selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel --options
+   temporal selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel --options
+ The lines are split as a shell command line (quote the titles with spaces). Empty lines
+ and lines starting with # are skipped. The --options of a line are added to the ones of
+ the command line, and replace them if given in both.
+ The image of a job is --out=name in the output directory, by default
+ <line>_<kind>_<field>_<element>.png (e.g. 003_histo_PDM01HI_05.png, PDM00 and element 00
+ meaning all the PDMs and all the elements).
+ The histogram jobs with the same param, bins and reading options (rows, TIME_S window,
+ calibration, selection) are filled by a single pass over all the PDMs and elements of
+ the file (cube_groups), each of them being a slice of the cube.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import shlex
+
+import ASTRI_cli
+
+# positional parameters of each kind of plot, after the kind
+JOB_PARAMETERS = {
+	'histo': ('selPDM', 'param', 'subfield_id', 'nbins', 'minval', 'maxval', 'maxevt', 'binx'),
+	'temporal': ('selPDM', 'param', 'subfield_id', 'maxevt', 'xvalue_temp', 'xvalue_graph'),
+}
+
+# options selecting the rows read for a plot: the jobs of a cube share them
+READ_OPTIONS = ('start', 'stop', 'tstart', 'tstop', 'calib', 'where')
+
+
+class Job(object):
+	"""Plot of the line line_number of a job file"""
+
+	def __init__(self, line_number, kind, parameters, labels, options):
+		self.line_number = line_number
+		self.kind = kind
+		self.title = labels.get('t', '')
+		self.xlabel = labels.get('x', '')
+		self.ylabel = labels.get('y', '')
+		self.options = options
+		for name, value in zip(JOB_PARAMETERS[kind], parameters):
+			if (name != 'param'):
+				value = int(value)
+			setattr(self, name, value)
+		self.start = ASTRI_cli.int_option(options, 'start', 0)
+		self.stop = ASTRI_cli.int_option(options, 'stop', 0)
+		self.tstart = ASTRI_cli.float_option(options, 'tstart', None)
+		self.tstop = ASTRI_cli.float_option(options, 'tstop', None)
+		self.image = options.get('out', str(line_number).zfill(3)+'_'+kind+'_PDM'+str(self.selPDM).zfill(2)+self.param+'_'+str(self.subfield_id).zfill(2)+'.png')
+
+	def cube_key(self):
+		"""Jobs with the same key are slices of the same histogram cube"""
+		if (self.kind != 'histo'):
+			return None
+		return (self.param, self.nbins, self.minval, self.maxval, self.maxevt) + tuple([self.options.get(key) for key in READ_OPTIONS])
+
+
+def parse_job(line, line_number, options = {}):
+	"""Job of the line line_number of a job file, None for an empty line or a comment.
+	options are the --options of the command line."""
+	words = shlex.split(line, comments=True)
+	if (len(words) == 0):
+		return None
+	job_args, job_options = ASTRI_cli.split_options(words)
+	kind = job_args[0]
+	if (kind not in JOB_PARAMETERS):
+		raise ValueError('line '+str(line_number)+': unknown plot '+kind+' (plots: '+', '.join(sorted(JOB_PARAMETERS))+')')
+	nparameters = len(JOB_PARAMETERS[kind])
+	if (len(job_args) < nparameters + 1):
+		raise ValueError('line '+str(line_number)+': '+kind+' needs '+' '.join(JOB_PARAMETERS[kind]))
+	labels = {}
+	for temp_string in job_args[nparameters+1:]:
+		labels[temp_string[0]] = temp_string[2:]
+	merged_options = dict(options)
+	merged_options.update(job_options)
+	try:
+		return Job(line_number, kind, job_args[1:nparameters+1], labels, merged_options)
+	except ValueError as error:
+		raise ValueError('line '+str(line_number)+': '+str(error))
+
+
+def read_jobs(jobfile, options = {}):
+	"""Jobs of the job file jobfile, in order. options are the --options of the command line."""
+	jobs = []
+	job_file = open(jobfile)
+	try:
+		for line_number, line in enumerate(job_file, 1):
+			job = parse_job(line, line_number, options)
+			if (job is not None):
+				jobs.append(job)
+	finally:
+		job_file.close()
+	return jobs
+
+
+def cube_groups(jobs):
+	"""Lists of the histogram jobs with the same cube_key, in the order of their first job"""
+	groups = {}
+	keys = []
+	for job in jobs:
+		key = job.cube_key()
+		if (key is None):
+			continue
+		if (key not in groups):
+			groups[key] = []
+			keys.append(key)
+		groups[key].append(job)
+	return [groups[key] for key in keys]
@@ -0,0 +1,261 @@
+"""
+ ASTRI_memory.py  -  description
+ ---------------------------------------------------------------------------------
+ Memory budget of the ASTRI quicklook analyses (--max-memory)
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_memory
+ memory_budget = ASTRI_memory.from_options(options)
+ block_size = ASTRI_memory.block_size(dl0_astri, read_fields, block_size)
+ channel_data = ASTRI_memory.zeros((nchannels, nevents), np.float32, 'time series')
+ ASTRI_memory.report()
+ ---------------------------------------------------------------------------------
+ Functions:
+ - MemoryBudget: memory used, reserved and spilled to disk within a budget in MB
+ - current_rss: resident set size of the process in MB
+ - from_options: budget of the --max-memory=MB option (None if not given), made active
+ - active: budget of the running script (None without --max-memory)
+ - block_size: rows per block within the budget, block_size without budget
+ - zeros: array of zeros, on disk (temporary memory-mapped file) if it does not fit the budget
+ - flush: write the pages of an array on disk to its file
+ - release_arrays: the arrays of zeros are no longer used (e.g. the next plot of a job file)
+ - check: fail if a temporary memory does not fit the budget
+ - report: print the peak memory and the budget
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The budget starts from the memory of the interpreter and the modules already loaded when
+ --max-memory is read, and reserves PLOT_MB for the plotting backend of the scripts that plot.
+ The rows per block are picked so that the blocks take at most BLOCK_FRACTION of the free budget:
+ per row, the copied columns of the (readahead + 2) blocks in flight (ASTRI_readahead), the mapped
+ FITS row and WORK_BYTES_PER_VALUE of temporaries of the analysis (float copies, bin indexes,
+ masks) for each value. An explicit --block is checked against the same estimate.
+ An array larger than SPILL_FRACTION of the free budget (histogram cube or pyramid, time series,
+ rolling statistics) is spilled to a temporary file in $ASTRI_SPILL_DIR (default the temporary
+ directory of the system), removed at the end of the process. The pages of a spilled array that
+ are used are part of the resident set size, but once written to the file (flush) they are dropped
+ by the system when the memory is short instead of exhausting it: the peak printed by report
+ says how much of it may be such pages, and the budget is exceeded only beyond them.
+ The plotting backend is PLOT_MB plus CURVE_KB for each curve of decimated points or BAR_KB for
+ each bar of a histogram, reserved by the scripts before the file is read.
+ When the row blocks, the plot, the arrays kept in memory or the disk space of a spilled array do
+ not fit, a ValueError with the estimate is raised before the rows are analysed (the series of
+ ASTRI_temporal are allocated with the first block): the scripts print it and exit.
+ The estimates are approximate: the peak resident set size (ASTRI_profile.peak_rss) printed by
+ report is the measured one.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import numpy as np
+import tempfile
+import os
+
+import ASTRI_profile
+import ASTRI_readahead
+import ASTRI_reader
+
+MB = 1024*1024
+
+# memory of the plotting backend (pyplot and one figure), of one curve of decimated points and of one bar
+PLOT_MB = 48.
+CURVE_KB = 32
+BAR_KB = 24
+# temporaries of the analysis for each value of a block
+WORK_BYTES_PER_VALUE = 32
+# fraction of the free budget taken by the row blocks
+BLOCK_FRACTION = 0.5
+# rows per block picked from the budget
+MIN_BLOCK_SIZE = 256
+MAX_BLOCK_SIZE = 65536
+# fraction of the free budget an array can take before it is spilled to disk
+SPILL_FRACTION = 0.25
+
+sTIME = 'TIME_S'
+sBLOCKS = 'row blocks'
+
+
+def current_rss():
+	"""Resident set size of the process in MB (the peak if /proc is not available)"""
+	try:
+		statm_file = open('/proc/self/statm')
+		try:
+			resident_pages = int(statm_file.read().split()[1])
+		finally:
+			statm_file.close()
+	except (IOError, IndexError, ValueError):
+		return ASTRI_profile.peak_rss()
+	return resident_pages*os.sysconf('SC_PAGE_SIZE')/float(MB)
+
+
+def mb_text(nbytes):
+	"""nbytes in MB, as text"""
+	return str(round(nbytes/float(MB), 1))+' MB'
+
+
+class MemoryBudget(object):
+	"""Memory budget of max_mb MB of the running script"""
+
+	def __init__(self, max_mb, spill_dir = None):
+		if (spill_dir is None):
+			spill_dir = os.environ.get('ASTRI_SPILL_DIR', tempfile.gettempdir())
+		self.max_mb = max_mb
+		self.max_bytes = int(max_mb*MB)
+		self.spill_dir = spill_dir
+		# interpreter and modules already loaded
+		self.base_bytes = int(current_rss()*MB)
+		# what -> bytes kept in memory / written to disk, reservations of the arrays of zeros
+		self.reserved = {}
+		self.spilled = {}
+		self.arrays = set()
+		if (self.available() <= 0):
+			self._fail('The interpreter and the modules', self.base_bytes)
+
+	def available(self, ignore = None):
+		"""Bytes of the budget not used nor reserved, the reservation ignore excluded"""
+		reserved = sum([nbytes for what, nbytes in self.reserved.items() if what != ignore])
+		return self.max_bytes - self.base_bytes - reserved
+
+	def estimate(self):
+		"""Text of the memory used and reserved"""
+		parts = ['interpreter and modules '+mb_text(self.base_bytes)]
+		for what in sorted(self.reserved):
+			parts.append(what+' '+mb_text(self.reserved[what]))
+		return ', '.join(parts)
+
+	def _fail(self, what, nbytes, ignore = None):
+		raise ValueError(what+': '+mb_text(nbytes)+' needed, '+mb_text(max(self.available(ignore), 0))+' left of --max-memory='+
+			str(self.max_mb)+' MB ('+self.estimate()+')')
+
+	def check(self, nbytes, what):
+		"""Fail if nbytes of temporary memory for what do not fit"""
+		if (nbytes > self.available()):
+			self._fail(what, nbytes)
+
+	def reserve(self, nbytes, what):
+		"""Keep nbytes of the budget for what, fail if they do not fit"""
+		self.check(nbytes, what)
+		self.reserved[what] = self.reserved.get(what, 0) + nbytes
+
+	def fits(self, nbytes):
+		"""True if an array of nbytes is kept in memory (zeros)"""
+		return (nbytes == 0) or (nbytes <= self.available()*SPILL_FRACTION)
+
+	def block_size(self, dl0_astri, fields, block_size = None):
+		"""Rows per block of the fields of the DL0File dl0_astri: the largest that fits if block_size is
+		None, else block_size if it fits. The memory of the blocks is reserved (once for all the readings)."""
+		columns = dl0_astri.block_columns(fields)
+		column_bytes = sum([dl0_astri.field_dtype(name).itemsize*dl0_astri.element_count(name) for name in columns])
+		values = sum([dl0_astri.element_count(name) for name in columns if name != sTIME])
+		# the rows of a FITS block are memory mapped while its columns are copied
+		row_bytes = (ASTRI_readahead.depth() + 2)*column_bytes + getattr(dl0_astri, 'row_bytes', 0) + WORK_BYTES_PER_VALUE*values
+		if (block_size is None):
+			block_size = min(int(self.available(sBLOCKS)*BLOCK_FRACTION)//row_bytes, MAX_BLOCK_SIZE)
+			if (block_size < MIN_BLOCK_SIZE):
+				self._fail('Row blocks of '+str(MIN_BLOCK_SIZE)+' rows ('+str(row_bytes)+' bytes per row)', int(MIN_BLOCK_SIZE*row_bytes/BLOCK_FRACTION), sBLOCKS)
+		elif (block_size*row_bytes > self.available(sBLOCKS)):
+			self._fail('Row blocks of '+str(block_size)+' rows ('+str(row_bytes)+' bytes per row)', block_size*row_bytes, sBLOCKS)
+		self.reserved[sBLOCKS] = max(self.reserved.get(sBLOCKS, 0), block_size*row_bytes)
+		return block_size
+
+	def zeros(self, shape, dtype, what):
+		"""Array of zeros for what, in memory if it fits, else in a temporary file of spill_dir"""
+		nbytes = int(np.prod(shape))*np.dtype(dtype).itemsize
+		if (self.fits(nbytes)):
+			self.reserve(nbytes, what)
+			self.arrays.add(what)
+			return np.zeros(shape, dtype=dtype)
+		disk_stat = os.statvfs(self.spill_dir)
+		free_bytes = disk_stat.f_bavail*disk_stat.f_frsize
+		if (nbytes > free_bytes):
+			raise ValueError(what+': '+mb_text(nbytes)+' of disk needed in '+self.spill_dir+' (more than '+mb_text(self.available()*SPILL_FRACTION)+
+				' of --max-memory='+str(self.max_mb)+' MB), '+mb_text(free_bytes)+' free')
+		self.spilled[what] = self.spilled.get(what, 0) + nbytes
+		# the file is already unlinked: its space is freed with the array
+		return np.memmap(tempfile.TemporaryFile(dir=self.spill_dir), dtype=dtype, mode='w+', shape=shape)
+
+	def release_arrays(self):
+		"""Free the reservations of the arrays of zeros, no longer used"""
+		for what in self.arrays:
+			self.reserved.pop(what, None)
+		self.arrays = set()
+
+	def report(self):
+		"""Print the peak memory against the budget, and the arrays spilled to disk"""
+		peak = ASTRI_profile.peak_rss()
+		spilled_mb = sum(self.spilled.values())/float(MB)
+		text = 'Memory: peak RSS = '+str(round(peak, 1))+' MB'
+		if (spilled_mb > 0):
+			text += ' (up to '+str(round(min(spilled_mb, peak), 1))+' MB of pages of the arrays on disk)'
+		text += ', budget = '+str(self.max_mb)+' MB'
+		if (peak - spilled_mb > self.max_mb):
+			text += ' (exceeded)'
+		print text
+		if (spilled_mb > 0):
+			print 'Spilled to disk ('+self.spill_dir+'): '+', '.join([what+' '+mb_text(self.spilled[what]) for what in sorted(self.spilled)])
+
+
+_active_budget = None
+
+
+def active():
+	"""MemoryBudget of the running script, None without --max-memory"""
+	return _active_budget
+
+
+def from_options(options, plot = True):
+	"""MemoryBudget of the --max-memory=MB option, None if not given. It becomes the active budget.
+	If plot the memory of the plotting backend is reserved."""
+	global _active_budget
+	if (('max-memory' not in options) or (options['max-memory'] is True)):
+		return None
+	_active_budget = MemoryBudget(float(options['max-memory']))
+	if (plot):
+		_active_budget.reserve(int(PLOT_MB*MB), 'plot')
+	return _active_budget
+
+
+def block_size(dl0_astri, fields, block_size = None):
+	"""Rows per block of the fields of the DL0File dl0_astri within the active budget (MemoryBudget.block_size),
+	without budget block_size, or the default of ASTRI_reader if None"""
+	if (_active_budget is None):
+		if (block_size is None):
+			return ASTRI_reader.DEFAULT_BLOCK_SIZE
+		return block_size
+	return _active_budget.block_size(dl0_astri, fields, block_size)
+
+
+def zeros(shape, dtype, what):
+	"""Array of zeros of the active budget (MemoryBudget.zeros), in memory without budget"""
+	if (_active_budget is None):
+		return np.zeros(shape, dtype=dtype)
+	return _active_budget.zeros(shape, dtype, what)
+
+
+def flush(array):
+	"""Write the pages of an array of zeros on disk to its file, so that they can be dropped
+	from the memory without being written (nothing for an array in memory)"""
+	if (isinstance(array, np.memmap)):
+		array.flush()
+
+
+def check(nbytes, what):
+	"""Fail if nbytes of temporary memory for what do not fit the active budget"""
+	if (_active_budget is not None):
+		_active_budget.check(nbytes, what)
+
+
+def release_arrays():
+	"""Free the reservations of the arrays of zeros of the active budget, no longer used"""
+	if (_active_budget is not None):
+		_active_budget.release_arrays()
+
+
+def report():
+	"""Print the peak memory and the budget, if a budget is active"""
+	if (_active_budget is not None):
+		_active_budget.report()
@@ -0,0 +1,209 @@
+"""
+ ASTRI_profile.py  -  description
+ ---------------------------------------------------------------------------------
+ Per-stage timing and memory instrumentation of the ASTRI quicklook scripts
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_profile
+ profiler = ASTRI_profile.from_options(options, 'visASTRI_histo.py')
+ profiler.begin('analysis')
+ ...
+ profiler.end('analysis')
+ profiler.finish()
+ ---------------------------------------------------------------------------------
+ Functions:
+ - Profiler: wall time, CPU time and peak memory of the stages, counters of the data read
+ - NullProfiler: profiler that records nothing (profiling disabled)
+ - active: profiler of the running script, used by the reader to count the rows read
+ - from_options: profiler set-up from the --profile[=file] option
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The time of a stage excludes the time of the stages nested inside it, e.g. the reading of
+ the row blocks (stage read, recorded by ASTRI_reader) is not part of the analysis stage
+ around it. A stage entered more than once is summed (calls).
+ The memory is the peak resident set size of the process (ru_maxrss) at the end of the
+ stage, and its increase during the stage. It is 0 where the resource module is missing.
+ The counters are the row blocks, rows, bytes and pixels (elements of the fields, TIME_S
+ excluded) read.
+ When --profile is not given the NullProfiler is used: the stages are empty calls and the
+ row blocks are not wrapped, so the reading loop is unchanged.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import contextlib
+import json
+import time
+import sys
+import os
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+DEFAULT_REPORT = 'ASTRI_profile.json'
+
+sTIME = 'TIME_S'
+
+
+def cpu_time():
+	"""User + system CPU time of the process"""
+	process_times = os.times()
+	return process_times[0] + process_times[1]
+
+
+def peak_rss():
+	"""Peak resident set size of the process in MB"""
+	if (resource is None):
+		return 0.
+	# kB on Linux, bytes on Mac OS
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if (sys.platform == 'darwin'):
+		return peak/1024./1024.
+	return peak/1024.
+
+
+class NullProfiler(object):
+	"""Profiler that records nothing"""
+
+	enabled = False
+
+	def begin(self, stage):
+		pass
+
+	def end(self, stage):
+		pass
+
+	@contextlib.contextmanager
+	def stage(self, stage):
+		yield
+
+	def count(self, name, value):
+		pass
+
+	def blocks(self, blocks):
+		return blocks
+
+	def finish(self):
+		pass
+
+
+class Profiler(NullProfiler):
+	"""Wall time, CPU time and peak memory of the stages of the script name"""
+
+	enabled = True
+
+	def __init__(self, name, report_file = DEFAULT_REPORT):
+		self.name = name
+		self.report_file = report_file
+		self.stages = []
+		self.records = {}
+		self.counts = {'blocks': 0, 'rows': 0, 'bytes': 0, 'pixels': 0}
+		# open stages: [name, wall start, cpu start, peak start, nested wall, nested cpu]
+		self.open_stages = []
+		self.wall_start = time.time()
+		self.cpu_start = cpu_time()
+
+	def begin(self, stage):
+		self.open_stages.append([stage, time.time(), cpu_time(), peak_rss(), 0., 0.])
+
+	def end(self, stage):
+		name, wall_start, cpu_start, peak_start, nested_wall, nested_cpu = self.open_stages.pop()
+		if (name != stage):
+			raise ValueError('Stage '+stage+' ended inside stage '+name)
+		wall = time.time() - wall_start
+		cpu = cpu_time() - cpu_start
+		peak = peak_rss()
+		if (name not in self.records):
+			self.stages.append(name)
+			self.records[name] = {'stage': name, 'wall_s': 0., 'cpu_s': 0., 'peak_rss_mb': 0., 'rss_increase_mb': 0., 'calls': 0}
+		record = self.records[name]
+		record['wall_s'] += wall - nested_wall
+		record['cpu_s'] += cpu - nested_cpu
+		record['peak_rss_mb'] = max(record['peak_rss_mb'], peak)
+		record['rss_increase_mb'] += peak - peak_start
+		record['calls'] += 1
+		if (len(self.open_stages) > 0):
+			self.open_stages[-1][4] += wall
+			self.open_stages[-1][5] += cpu
+
+	@contextlib.contextmanager
+	def stage(self, stage):
+		self.begin(stage)
+		try:
+			yield
+		finally:
+			self.end(stage)
+
+	def count(self, name, value):
+		self.counts[name] = self.counts.get(name, 0) + value
+
+	def blocks(self, blocks):
+		"""Row blocks (row_start, block) of ASTRI_reader, the reading being timed as stage read"""
+		blocks = iter(blocks)
+		while True:
+			self.begin('read')
+			try:
+				row_start, block = next(blocks)
+			except StopIteration:
+				self.end('read')
+				return
+			self.end('read')
+			self.counts['blocks'] += 1
+			self.counts['rows'] += len(block[sTIME])
+			for name in block:
+				self.counts['bytes'] += block[name].nbytes
+				if (name != sTIME):
+					self.counts['pixels'] += block[name].size
+			yield row_start, block
+
+	def report(self):
+		"""Dictionary of the results"""
+		return {'script': self.name, 'argv': sys.argv[1:], 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'total': {'wall_s': time.time() - self.wall_start, 'cpu_s': cpu_time() - self.cpu_start, 'peak_rss_mb': peak_rss()},
+			'stages': [self.records[name] for name in self.stages], 'counts': self.counts}
+
+	def finish(self):
+		"""Print the results and write them to the JSON report file"""
+		report = self.report()
+		print '-------------------------------------------------'
+		print 'Profile of '+self.name
+		print 'STAGE  WALL[s]  CPU[s]  PEAK_RSS[MB]  CALLS'
+		for record in report['stages']:
+			print record['stage']+'  '+str(round(record['wall_s'], 3))+'  '+str(round(record['cpu_s'], 3))+'  '+str(round(record['peak_rss_mb'], 1))+'  '+str(record['calls'])
+		total = report['total']
+		print 'total  '+str(round(total['wall_s'], 3))+'  '+str(round(total['cpu_s'], 3))+'  '+str(round(total['peak_rss_mb'], 1))
+		print 'Blocks = '+str(self.counts['blocks'])+', Rows = '+str(self.counts['rows'])+', Pixels = '+str(self.counts['pixels'])+', Bytes = '+str(self.counts['bytes'])
+		out_file = open(self.report_file, 'w')
+		try:
+			json.dump(report, out_file, indent=1, sort_keys=True)
+		finally:
+			out_file.close()
+		print 'Profile report: '+self.report_file
+		print '-------------------------------------------------'
+
+
+_active_profiler = NullProfiler()
+
+
+def active():
+	"""Profiler of the running script (NullProfiler if not profiling)"""
+	return _active_profiler
+
+
+def from_options(options, name):
+	"""Profiler of the script name from the --profile[=file] option, made the active one"""
+	global _active_profiler
+	if ('profile' not in options):
+		_active_profiler = NullProfiler()
+	elif (options['profile'] is True):
+		_active_profiler = Profiler(name)
+	else:
+		_active_profiler = Profiler(name, options['profile'])
+	return _active_profiler
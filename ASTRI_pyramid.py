@@ -0,0 +1,227 @@
+"""
+ ASTRI_pyramid.py  -  description
+ ---------------------------------------------------------------------------------
+ Multi-resolution histograms of the ASTRI camera, rebinned without reading the DL0 data again
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_pyramid
+ histo_pyramid = ASTRI_pyramid.build_pyramid(dl0_astri, 'HI', 0, 4095)
+ histo_pyramid.save('run_HI.pyr')
+ histo_pyramid = ASTRI_pyramid.load_pyramid('run_HI.pyr')
+ N_counts, bin_array, N_entries, mean_out, sd_out = histo_pyramid.histogram(selPDM, subfield_id, nbins, minval, maxval)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - HistoPyramid: histograms of one ADC count per element, PDM and camera
+ - rebin: sums of the base bins by bin index
+ - value_range: integer values covered by the bins of a window
+ - new_pyramid: empty pyramid of a parameter of a DL0 file
+ - build_pyramid: fill a pyramid in a single pass over the row blocks of a DL0 file
+ - load_pyramid: read a pyramid saved with HistoPyramid.save
+ - is_pyramid_file: True if the file name is a pyramid file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The base of the pyramid is the histogram of each PDM and element (pixel) with one bin per
+ integer value vmin <= x <= vmax, e.g. [37, 64, vmax - vmin + 1] for HI. Its levels are the
+ sums per PDM and for the camera, computed once after the filling, so that a PDM or camera
+ histogram is not a sum over the pixels. The values outside [vmin, vmax] are counted per element.
+ Any histogram whose bins lie inside [vmin, vmax] (nbins, minval, maxval) is made by summing the
+ base bins of the values falling in each bin (ASTRI_histo.bin_index on the integer values) and
+ inside the window: the counts are the same as the ones of the DL0 file.
+ Entries, Mean and RMS of the window (minval < x < maxval, or x < maxval if minval = 0) are
+ computed from the base bins, exactly for integer values. A window with minval = 0 needs the
+ values below vmin, so it cannot be served if some were found.
+ Only the integer parameters (the ADC counts of HI/LO) have a pyramid, not calibrated values.
+ The base bins need 8 bytes per PDM, element and value: 37 x 64 x 4096 values of a 12 bit ADC
+ are 78 MB.
+ The pyramid is saved as a compressed numpy .npz archive, with the extension .pyr.
+ With a memory budget (ASTRI_memory) base bins larger than the budget allows are kept on disk.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Base bins allocated within the memory budget (ASTRI_memory).
+ - 2026/10/18: Selection columns and rows through ASTRI_expr.selection_columns and select_blocks.
+ - 2026/10/18: load_pyramid without allocating empty base bins first.
+
+"""
+
+import numpy as np
+
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_stats
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+PYRAMID_EXT = '.pyr'
+
+
+class HistoPyramid(object):
+	"""Histograms of one bin per integer value vmin <= x <= vmax of each PDM and element of the
+	parameter param, with their sums per PDM and for the camera. base, if given, are the [nPDM, nelem, values]
+	counts of the base bins (load_pyramid), else they are allocated empty."""
+
+	def __init__(self, param, vmin, vmax, nelem, dtype = np.int16, nPDM = ASTRI_nPDM, base = None):
+		if (np.dtype(dtype).kind not in 'iu'):
+			raise ValueError('Histogram pyramid of '+param+': integer values only (e.g. HI, LO), not '+np.dtype(dtype).name)
+		if (vmax < vmin):
+			raise ValueError('Histogram pyramid of '+param+': empty range of values ['+str(vmin)+', '+str(vmax)+']')
+		self.param = param
+		self.vmin = int(vmin)
+		self.vmax = int(vmax)
+		self.dtype = np.dtype(dtype)
+		self.fields = ASTRI_histo.pdm_fields(0, param, nPDM = nPDM)
+		# the integer values of the base bins, of the type of the data
+		self.values = np.arange(self.vmin, self.vmax + 1).astype(self.dtype)
+		if (base is None):
+			base = ASTRI_memory.zeros((nPDM, nelem, len(self.values)), np.int64, 'histogram pyramid')
+		elif (base.shape != (nPDM, nelem, len(self.values))):
+			raise ValueError('Histogram pyramid of '+param+': base bins of shape '+str(base.shape)+', expected '+str((nPDM, nelem, len(self.values))))
+		self.base = base
+		self.below = np.zeros((nPDM, nelem), dtype=np.int64)
+		self.above = np.zeros((nPDM, nelem), dtype=np.int64)
+		self.levels = None
+
+	def fill(self, block):
+		"""Add a row block (dictionary field name -> array) of ASTRI_reader"""
+		nelem, nvalues = self.base.shape[1:]
+		elem_offset = np.arange(nelem)*nvalues
+		for pdm_index, field in enumerate(self.fields):
+			values = ASTRI_histo.select_subfield(block[field], 0)
+			offset = np.subtract(values, self.vmin, dtype=np.int64)
+			self.below[pdm_index] += (offset < 0).sum(axis=0)
+			self.above[pdm_index] += (offset >= nvalues).sum(axis=0)
+			inside = (offset >= 0) & (offset < nvalues)
+			flat_index = (offset + elem_offset)[inside]
+			self.base[pdm_index] += np.bincount(flat_index, minlength=nelem*nvalues).reshape(nelem, nvalues)
+		self.levels = None
+
+	def fill_blocks(self, blocks):
+		"""Add the row blocks (row_start, block) of ASTRI_reader"""
+		for row_start, block in blocks:
+			self.fill(block)
+
+	def _levels(self):
+		"""(PDM level [nPDM, nvalues], camera level [nvalues]), summed after the last fill"""
+		if (self.levels is None):
+			pdm_level = self.base.sum(axis=1)
+			self.levels = (pdm_level, pdm_level.sum(axis=0))
+		return self.levels
+
+	def selection_counts(self, selPDM, subfield_id):
+		"""Return (counts [nvalues], below, above) of the PDM selPDM (0 = all) and the element
+		subfield_id (0 = all), from the coarsest level holding them"""
+		pdm_level, camera_level = self._levels()
+		if (selPDM > 0):
+			pdm_slice = slice(selPDM-1, selPDM)
+		else:
+			pdm_slice = slice(None)
+		if (subfield_id > 0):
+			elem_slice = slice(subfield_id-1, subfield_id)
+			counts = self.base[pdm_slice, elem_slice].sum(axis=(0, 1))
+		elif (selPDM > 0):
+			elem_slice = slice(None)
+			counts = pdm_level[selPDM-1]
+		else:
+			elem_slice = slice(None)
+			counts = camera_level
+		return counts, int(self.below[pdm_slice, elem_slice].sum()), int(self.above[pdm_slice, elem_slice].sum())
+
+	def covers(self, minval, maxval):
+		"""True if the bins of the window [minval, maxval] can be made from the base bins"""
+		first, last = value_range(minval, maxval)
+		return (first >= self.vmin) and (last <= self.vmax)
+
+	def histogram(self, selPDM, subfield_id, nbins, minval, maxval):
+		"""Return (N_counts, bin_array, N_entries, mean_out, sd_out) of nbins bins from minval to maxval
+		for the PDM selPDM (0 = all) and the element subfield_id (0 = all), as ASTRI_histo does on the FITS file"""
+		if (not self.covers(minval, maxval)):
+			raise ValueError('Histogram pyramid of '+self.param+': ['+str(minval)+', '+str(maxval)+'] outside the values ['+str(self.vmin)+', '+str(self.vmax)+']')
+		counts, below, above = self.selection_counts(selPDM, subfield_id)
+		if ((minval == 0) and (below > 0)):
+			raise ValueError('Histogram pyramid of '+self.param+': minval = 0 selects the values below '+str(self.vmin))
+		# as in ASTRI_histo, only the values inside the window are histogrammed
+		mask = ASTRI_histo.window_mask(self.values, minval, maxval)
+		bin_array = ASTRI_histo.bin_edges(nbins, minval, maxval, self.dtype)
+		index = ASTRI_histo.bin_index(self.values, bin_array)
+		index[~mask] = -1
+		N_counts = rebin(counts, index, nbins)
+
+		# statistics of the values inside the window
+		window_stats = ASTRI_stats.StatsAccumulator()
+		window_counts = counts[mask]
+		window_values = self.values[mask].astype(np.float64)
+		window_stats.count = np.int64(window_counts.sum())
+		window_stats.n_out = np.int64(counts.sum() + below + above - window_stats.count)
+		if (window_stats.count > 0):
+			window_stats.mean = np.float64((window_counts*window_values).sum()/float(window_stats.count))
+			window_stats.m2 = np.float64((window_counts*(window_values - window_stats.mean)**2).sum())
+			window_stats.min = window_values[window_counts > 0].min()
+			window_stats.max = window_values[window_counts > 0].max()
+		N_entries, mean_out, sd_out = window_stats.summary()
+		return N_counts, bin_array, N_entries, mean_out, sd_out
+
+	def save(self, filename):
+		"""Write the pyramid to a compressed .npz archive named filename (.pyr)"""
+		pyramid_file = open(filename, 'wb')
+		try:
+			np.savez_compressed(pyramid_file, param=self.param, vmin=self.vmin, vmax=self.vmax, dtype=self.dtype.str,
+				base=self.base, below=self.below, above=self.above)
+		finally:
+			pyramid_file.close()
+
+
+def rebin(counts, index, nbins):
+	"""[nbins] sums of the base counts by their bin index (-1 outside the bins)"""
+	valid = index >= 0
+	return np.bincount(index[valid], weights=counts[valid], minlength=nbins).astype(np.int64)
+
+
+def value_range(minval, maxval):
+	"""(first, last) integer values of the bins from minval to maxval (last edge included)"""
+	return int(np.ceil(minval)), int(np.floor(maxval))
+
+
+def new_pyramid(dl0_astri, param, vmin, vmax, nPDM = ASTRI_nPDM):
+	"""Empty pyramid of the integer values vmin <= x <= vmax of the parameter param, with the elements
+	and the type of the DL0File dl0_astri"""
+	first_field = ASTRI_histo.pdm_field(1, param)
+	return HistoPyramid(param, vmin, vmax, dl0_astri.element_count(first_field), dl0_astri.field_dtype(first_field), nPDM = nPDM)
+
+
+def build_pyramid(dl0_astri, param, vmin, vmax, start = 0, stop = 0, maxevt = 0, block_size = None, nPDM = ASTRI_nPDM,
+	tstart = None, tstop = None, selection = None):
+	"""Fill the pyramid of the parameter param in a single pass over the rows of the DL0File dl0_astri,
+	only the rows with tstart <= TIME_S < tstop if given, only the rows of the Selection selection if given (ASTRI_expr)"""
+	histo_pyramid = new_pyramid(dl0_astri, param, vmin, vmax, nPDM = nPDM)
+	read_fields = histo_pyramid.fields + ASTRI_expr.selection_columns(selection)
+	if (block_size is None):
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt)
+	else:
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt, block_size)
+	blocks = ASTRI_expr.select_blocks(blocks, selection)
+	histo_pyramid.fill_blocks(blocks)
+	return histo_pyramid
+
+
+def load_pyramid(filename):
+	"""Read a pyramid written by HistoPyramid.save"""
+	pyramid_file = np.load(filename)
+	base = pyramid_file['base']
+	nPDM, nelem, nvalues = base.shape
+	histo_pyramid = HistoPyramid(str(pyramid_file['param']), pyramid_file['vmin'].item(), pyramid_file['vmax'].item(), nelem,
+		np.dtype(str(pyramid_file['dtype'])), nPDM = nPDM, base = base)
+	histo_pyramid.below = pyramid_file['below']
+	histo_pyramid.above = pyramid_file['above']
+	pyramid_file.close()
+	return histo_pyramid
+
+
+def is_pyramid_file(filename):
+	"""True if filename is a histogram pyramid (and not a FITS file)"""
+	return filename.endswith(PYRAMID_EXT)
@@ -0,0 +1,191 @@
+"""
+ ASTRI_readahead.py  -  description
+ ---------------------------------------------------------------------------------
+ Asynchronous read-ahead of the row blocks of the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_readahead
+ ASTRI_readahead.from_options(options)
+ for row_start, block in dl0_astri.iter_blocks(['PDM01HI']):   # read ahead by ASTRI_reader
+     ...
+ ASTRI_readahead.report()
+ ---------------------------------------------------------------------------------
+ Functions:
+ - ReadAhead: row blocks read by a background thread, through a bounded queue
+ - set_depth: number of blocks read ahead (0 = no read-ahead)
+ - depth: number of blocks read ahead
+ - from_options: read-ahead set-up from the --readahead[=N] option
+ - wrap: row blocks read ahead, if enabled (used by ASTRI_reader)
+ - counters: blocks, read, I/O wait and compute time of all the blocks read ahead
+ - report: print the counters
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The next blocks are read and decoded (copy out of the memory-mapped rows, byte swap,
+ TZERO) by a background thread while the current one is histogrammed or accumulated.
+ The copies are done by numpy without the Python interpreter lock, so the reading of the
+ file (page faults, NFS) overlaps with the analysis of the previous block.
+ At most depth blocks wait in the queue: the memory is (depth + 2) blocks, one being
+ read and one being analysed. The blocks are read in order.
+ Counters:
+ - read: time of the thread reading the blocks
+ - I/O wait: time the analysis waited for a block (not read in time)
+ - compute: time spent analysing the blocks, between two requests of a block
+ read ~ compute and a small I/O wait mean that the reading is hidden behind the analysis.
+ The blocks of a columnar store are views of memory-mapped files, read when used: they
+ gain little from the read-ahead. An error of the reader is raised in the analysis thread.
+ With --profile the counters are added to the counts of the report (ASTRI_profile).
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: depth of the read-ahead for the memory budget (ASTRI_memory).
+
+"""
+
+import threading
+import Queue
+import time
+import sys
+
+import ASTRI_profile
+
+# blocks waiting in the queue with --readahead
+DEFAULT_DEPTH = 2
+
+# seconds between two checks of the stop request of the reading thread
+PUT_TIMEOUT = 0.1
+
+# end of the blocks
+_END = object()
+
+
+class _ReaderError(object):
+	"""Exception of the reading thread, raised again by the analysis"""
+
+	def __init__(self, exc_info):
+		self.exc_info = exc_info
+
+
+class ReadAhead(object):
+	"""Row blocks (row_start, block) of the iterator blocks, read by a background thread
+	at most depth blocks ahead of the analysis"""
+
+	def __init__(self, blocks, depth = DEFAULT_DEPTH):
+		self.blocks = iter(blocks)
+		self.queue = Queue.Queue(maxsize=max(depth, 1))
+		self.stop_request = threading.Event()
+		self.read_s = 0.
+		self.wait_s = 0.
+		self.compute_s = 0.
+		self.nblocks = 0
+		self.thread = threading.Thread(target=self._read)
+		self.thread.daemon = True
+
+	def _put(self, item):
+		"""Put item in the queue, False if the analysis stopped"""
+		while (not self.stop_request.is_set()):
+			try:
+				self.queue.put(item, timeout=PUT_TIMEOUT)
+				return True
+			except Queue.Full:
+				pass
+		return False
+
+	def _read(self):
+		try:
+			while True:
+				read_start = time.time()
+				try:
+					item = next(self.blocks)
+				except StopIteration:
+					break
+				self.read_s += time.time() - read_start
+				if (not self._put(item)):
+					return
+			self._put(_END)
+		except Exception:
+			self._put(_ReaderError(sys.exc_info()))
+
+	def __iter__(self):
+		# the thread starts with the first block requested, and is stopped if the analysis stops
+		self.thread.start()
+		try:
+			while True:
+				wait_start = time.time()
+				item = self.queue.get()
+				self.wait_s += time.time() - wait_start
+				if (item is _END):
+					return
+				if (isinstance(item, _ReaderError)):
+					raise item.exc_info[0], item.exc_info[1], item.exc_info[2]
+				self.nblocks += 1
+				compute_start = time.time()
+				yield item
+				self.compute_s += time.time() - compute_start
+		finally:
+			self.close()
+
+	def close(self):
+		"""Stop the reading thread and add the counters to the totals"""
+		if (self.stop_request.is_set()):
+			return
+		self.stop_request.set()
+		if (self.thread.is_alive()):
+			self.thread.join()
+		_totals['blocks'] += self.nblocks
+		_totals['read_s'] += self.read_s
+		_totals['io_wait_s'] += self.wait_s
+		_totals['compute_s'] += self.compute_s
+		profiler = ASTRI_profile.active()
+		profiler.count('readahead_read_s', self.read_s)
+		profiler.count('io_wait_s', self.wait_s)
+		profiler.count('compute_s', self.compute_s)
+
+
+# depth of the read-ahead of ASTRI_reader (0 = disabled) and counters of all the blocks read ahead
+_depth = 0
+_totals = {'blocks': 0, 'read_s': 0., 'io_wait_s': 0., 'compute_s': 0.}
+
+
+def set_depth(depth):
+	"""Read depth blocks ahead in ASTRI_reader, 0 to disable the read-ahead"""
+	global _depth
+	_depth = max(int(depth), 0)
+
+
+def depth():
+	"""Number of blocks read ahead by ASTRI_reader (0 = disabled)"""
+	return _depth
+
+
+def from_options(options, default = DEFAULT_DEPTH):
+	"""Read-ahead set-up from the --readahead=N option (N blocks, 0 = disabled), default if not given"""
+	if ('readahead' not in options):
+		set_depth(default)
+	elif (options['readahead'] is True):
+		set_depth(DEFAULT_DEPTH)
+	else:
+		set_depth(int(options['readahead']))
+	return _depth
+
+
+def wrap(blocks):
+	"""Row blocks read ahead if enabled, else blocks"""
+	if (_depth <= 0):
+		return blocks
+	return iter(ReadAhead(blocks, _depth))
+
+
+def counters():
+	"""Dictionary of the counters of all the blocks read ahead"""
+	return dict(_totals)
+
+
+def report():
+	"""Print the counters, if blocks were read ahead"""
+	if (_totals['blocks'] == 0):
+		return
+	print 'Read-ahead ('+str(_depth)+' blocks): blocks = '+str(_totals['blocks'])+', read = '+str(round(_totals['read_s'], 3))+' s, I/O wait = '+ \
+		str(round(_totals['io_wait_s'], 3))+' s, compute = '+str(round(_totals['compute_s'], 3))+' s'
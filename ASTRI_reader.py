@@ -0,0 +1,285 @@
+"""
+ ASTRI_reader.py  -  description
+ ---------------------------------------------------------------------------------
+ Chunked, memory-mapped streaming reader for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_reader
+ dl0 = ASTRI_reader.open_dl0(filename)
+ for row_start, block in dl0.iter_blocks(['PDM01HI'], start, stop, maxevt):
+     block['PDM01HI'], block['TIME_S']
+ ---------------------------------------------------------------------------------
+ Functions:
+ - DL0File: BINTABLE of a DL0 file, read by row blocks
+ - RowFollower: rows appended to a growing DL0 file since the last read
+ - ColumnStore: columnar copy of a DL0 file (convASTRI_columnar.py), read as a DL0File
+ - store_path: directory of the columnar store of a DL0 file
+ - open_dl0: columnar store of a DL0 file if present and up to date, else the DL0 file
+ - iter_blocks: open a DL0 file and iterate over its row blocks
+ - native_order: array in the native byte order, swapped in place
+ ---------------------------------------------------------------------------------
+ Caveats:
+ Only the byte range of the current block is memory mapped, and only the
+ requested columns (plus TIME_S) are copied out of it, so the peak memory is
+ bounded by block_size and not by the file size.
+ The row range is [start, stop) (rows starting from 0, stop = 0 is the end of the
+ table). If maxevt > 0 at most maxevt rows are read starting from start.
+ The FITS columns are big-endian: each column of a block is copied once out of the rows
+ and byte-swapped in place, so the blocks hold native arrays of the type of the file (e.g. int16
+ for HI/LO), about the size of the column on disk, and the analyses never convert them again.
+ TSCALE/TZERO are applied per block. Unsigned integers stored with TZERO = 2**(bits-1) (the FITS
+ convention) are returned as unsigned integers of the same width, flipping the sign bit in place;
+ any other integer offset gives int64. Variable length array columns are not supported.
+ The number of rows is NAXIS2, limited to the rows completely written on disk, and
+ is re-read by DL0File.refresh for files still being acquired.
+ The columnar store is a directory (filename.col) with one native-endian .npy array per
+ column, TSCALE/TZERO already applied, and a manifest.json with the number of rows, the
+ columns and the size and modification time of the DL0 file it was converted from.
+ Each column is memory mapped on its own, so reading a column costs only its bytes, and
+ the blocks are read-only views of the mapped columns, without copies.
+ open_dl0 falls back to the DL0 file if the store is missing or older than the file.
+ When a script runs with --profile the row blocks are timed and counted (ASTRI_profile).
+ If the read-ahead is enabled (ASTRI_readahead) the blocks are read by a background thread.
+ A block whose rows are not consecutive has their row numbers in its field sROW.
+ pyfits is imported when a FITS file is opened: reading a columnar store does not load it.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Columnar store (ColumnStore, open_dl0).
+ - 2026/10/18: Row blocks timed and counted by the active profiler.
+ - 2026/10/18: Native byte order blocks, narrow unsigned TZERO columns, views of the columnar store.
+ - 2026/10/18: Row blocks read ahead by ASTRI_readahead.
+ - 2026/10/18: pyfits imported only when a FITS file is opened.
+
+"""
+
+import numpy as np
+import warnings
+import json
+import os
+
+import ASTRI_profile
+import ASTRI_readahead
+
+# number of rows per block
+DEFAULT_BLOCK_SIZE = 4096
+# seconds between two reads of a growing file
+DEFAULT_FOLLOW_INTERVAL = 2.
+
+STORE_EXT = '.col'
+STORE_MANIFEST = 'manifest.json'
+
+sTIME = 'TIME_S'
+# row numbers of a block whose rows are not consecutive (e.g. after an event selection, ASTRI_expr)
+sROW = '_ROW'
+
+
+class DL0File(object):
+	"""BINTABLE (extension hdu) of a DL0 file, read by row blocks through memory mapping"""
+
+	def __init__(self, filename, hdu = 1):
+		self.filename = filename
+		self.hdu = hdu
+		import pyfits
+		with warnings.catch_warnings():
+			# a file still being acquired is shorter than its header says
+			warnings.filterwarnings('ignore', message='File may have been truncated')
+			hdulist_astri = pyfits.open(filename, memmap=True)
+		try:
+			table = hdulist_astri[hdu]
+			self.data_offset = table.fileinfo()['datLoc']
+			self.row_bytes = table.header['NAXIS1']
+			self.nrows = self._available_rows(table.header['NAXIS2'])
+			self.names = list(table.columns.names)
+			self.raw_dtype = table.columns.dtype.newbyteorder('>')
+			self.scaling = {}
+			for col in table.columns:
+				if ((col.bscale not in (None, 1)) or (col.bzero not in (None, 0))):
+					self.scaling[col.name] = (col.bscale, col.bzero)
+		finally:
+			hdulist_astri.close()
+
+	def _available_rows(self, naxis2):
+		"""NAXIS2 limited to the complete rows already written on disk (growing files)"""
+		if (self.row_bytes == 0):
+			return naxis2
+		written = (os.path.getsize(self.filename) - self.data_offset)//self.row_bytes
+		return max(0, min(naxis2, written))
+
+	def refresh(self):
+		"""Re-read the number of rows of a growing file, return it"""
+		import pyfits
+		with warnings.catch_warnings():
+			warnings.filterwarnings('ignore', message='File may have been truncated')
+			naxis2 = pyfits.getheader(self.filename, self.hdu)['NAXIS2']
+		self.nrows = self._available_rows(naxis2)
+		return self.nrows
+
+	def row_range(self, start = 0, stop = 0, maxevt = 0):
+		"""Clip the row range [start, stop) to the table; stop = 0 is the end of the table"""
+		start = max(start, 0)
+		if ((stop <= 0) or (stop > self.nrows)):
+			stop = self.nrows
+		if (maxevt > 0):
+			stop = min(stop, start + maxevt)
+		return start, max(start, stop)
+
+	def element_count(self, name):
+		"""Number of elements per row of the field name (e.g. 64 for PDM01HI)"""
+		return int(np.prod(self.raw_dtype[name].shape))
+
+	def field_dtype(self, name):
+		"""Type of the values of the field name as returned in the blocks"""
+		return self._scale(name, np.zeros(0, dtype=self.raw_dtype[name].base.newbyteorder('='))).dtype
+
+	def block_columns(self, names):
+		"""Requested columns plus TIME_S, without duplicates"""
+		columns = []
+		for name in list(names) + [sTIME]:
+			if ((name in self.names) and (name not in columns)):
+				columns.append(name)
+		missing = [name for name in names if name not in self.names]
+		if (len(missing) > 0):
+			raise KeyError('Field(s) not found in '+self.filename+': '+', '.join(missing))
+		return columns
+
+	def read(self, names, start, stop):
+		"""Copy the columns names of the rows [start, stop) out of the file"""
+		rows = np.memmap(self.filename, dtype=self.raw_dtype, mode='r', offset=self.data_offset + start*self.row_bytes, shape=(stop - start,))
+		block = {}
+		for name in names:
+			block[name] = self._scale(name, native_order(np.array(rows[name])))
+		del rows
+		return block
+
+	def iter_blocks(self, names, start = 0, stop = 0, maxevt = 0, block_size = DEFAULT_BLOCK_SIZE):
+		"""Yield (row_start, block) for the rows [start, stop), block_size rows at a time.
+		block is a dictionary field name -> array with the requested columns and TIME_S."""
+		columns = self.block_columns(names)
+		start, stop = self.row_range(start, stop, maxevt)
+		return ASTRI_profile.active().blocks(ASTRI_readahead.wrap(self._blocks(columns, start, stop, block_size)))
+
+	def _blocks(self, columns, start, stop, block_size):
+		for row_start in xrange(start, stop, block_size):
+			yield row_start, self.read(columns, row_start, min(row_start + block_size, stop))
+
+	def _scale(self, name, column):
+		if (name not in self.scaling):
+			return column
+		bscale, bzero = self.scaling[name]
+		sign_bit = 1 << (8*column.dtype.itemsize - 1)
+		if ((bscale in (None, 1)) and (bzero == sign_bit) and (column.dtype.kind == 'i')):
+			# unsigned integers: x + 2**(bits-1) is x with the sign bit flipped
+			unsigned = column.view(column.dtype.str.replace('i', 'u'))
+			unsigned ^= np.array(sign_bit, dtype=unsigned.dtype)
+			return unsigned
+		if ((bscale in (None, 1)) and (int(bzero) == bzero) and (column.dtype.kind in 'iu')):
+			return column.astype(np.int64) + int(bzero)
+		if (bscale is None):
+			bscale = 1.
+		if (bzero is None):
+			bzero = 0.
+		return column*float(bscale) + float(bzero)
+
+
+class RowFollower(object):
+	"""Row range [start, stop) of a growing DL0 file, read by pieces as new rows are appended"""
+
+	def __init__(self, dl0_file, start = 0, stop = 0, maxevt = 0):
+		self.dl0_file = dl0_file
+		self.next_row = max(start, 0)
+		self.stop = stop
+		if (maxevt > 0):
+			if (stop > 0):
+				self.stop = min(stop, self.next_row + maxevt)
+			else:
+				self.stop = self.next_row + maxevt
+
+	def new_blocks(self, names, block_size = DEFAULT_BLOCK_SIZE):
+		"""Refresh the file and return the row blocks (row_start, block) appended since the last call"""
+		self.dl0_file.refresh()
+		row_start, row_stop = self.dl0_file.row_range(self.next_row, self.stop)
+		self.next_row = row_stop
+		return self.dl0_file.iter_blocks(names, row_start, row_stop, 0, block_size)
+
+	def done(self):
+		"""True if all the rows of the range have been read"""
+		return ((self.stop > 0) and (self.next_row >= self.stop))
+
+
+class ColumnStore(DL0File):
+	"""Columnar store of a DL0 file, with the interface of DL0File"""
+
+	def __init__(self, filename, manifest):
+		self.filename = filename
+		self.hdu = manifest['hdu']
+		self.store_dir = store_path(filename)
+		self.nrows = manifest['nrows']
+		self.names = [str(column['name']) for column in manifest['columns']]
+		self.raw_dtype = np.dtype([(str(column['name']), str(column['dtype']), tuple(column['shape'])) for column in manifest['columns']])
+		self.files = dict([(str(column['name']), os.path.join(self.store_dir, str(column['file']))) for column in manifest['columns']])
+		self.scaling = {}
+		self.columns = {}
+
+	def refresh(self):
+		return self.nrows
+
+	def column(self, name):
+		"""Memory-mapped array of the column name"""
+		if (name not in self.columns):
+			self.columns[name] = np.load(self.files[name], mmap_mode='r')
+		return self.columns[name]
+
+	def read(self, names, start, stop):
+		"""Read-only views of the columns names of the rows [start, stop) of the store"""
+		block = {}
+		for name in names:
+			block[name] = np.asarray(self.column(name)[start:stop])
+		return block
+
+
+def native_order(column):
+	"""column in the native byte order, swapped in place if needed (column must own its data)"""
+	if (column.dtype.isnative):
+		return column
+	return column.byteswap(True).view(column.dtype.newbyteorder('='))
+
+
+def store_path(filename):
+	"""Directory of the columnar store of the DL0 file filename"""
+	return filename + STORE_EXT
+
+
+def read_manifest(filename):
+	"""Manifest of the columnar store of filename, None if missing or older than the file"""
+	manifest_path = os.path.join(store_path(filename), STORE_MANIFEST)
+	if (not os.path.exists(manifest_path)):
+		return None
+	try:
+		manifest_file = open(manifest_path)
+		try:
+			manifest = json.load(manifest_file)
+		finally:
+			manifest_file.close()
+	except (IOError, ValueError):
+		return None
+	file_stat = os.stat(filename)
+	if ((manifest['size'] != file_stat.st_size) or (manifest['mtime'] != file_stat.st_mtime)):
+		return None
+	return manifest
+
+
+def open_dl0(filename, hdu = 1):
+	"""ColumnStore of the DL0 file filename if present and up to date, else DL0File"""
+	manifest = read_manifest(filename)
+	if ((manifest is not None) and (manifest['hdu'] == hdu)):
+		return ColumnStore(filename, manifest)
+	return DL0File(filename, hdu)
+
+
+def iter_blocks(filename, names, start = 0, stop = 0, maxevt = 0, block_size = DEFAULT_BLOCK_SIZE):
+	"""Open the DL0 file filename (or its columnar store) and yield (row_start, block) as DL0File.iter_blocks"""
+	return open_dl0(filename).iter_blocks(names, start, stop, maxevt, block_size)
@@ -0,0 +1,244 @@
+"""
+ ASTRI_render.py  -  description
+ ---------------------------------------------------------------------------------
+ Headless rendering of the ASTRI histograms to image files
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_render
+ jobs = ASTRI_render.layout_jobs(histo_cube, 'pdm', outdir)
+ ASTRI_render.render_images(histo_cube, jobs, binx, n_workers = 8)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - GridFigure: figure of nrows x ncols histogram panels, re-used for several images
+ - layout_jobs: images (file name, grid shape, panels) of a layout of a histogram cube
+ - render_job: draw and save one image (worker of the process pool)
+ - render_images: draw the images of a cube, in a pool of worker processes
+ - SeriesFigure: figure of time series against TIME_S and the row counter, re-used for several images
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The figures are drawn with the Agg canvas of matplotlib, without pyplot: no window is
+ opened and the matplotlib backend of the caller is not changed.
+ Each worker process keeps one figure per grid shape: the axes, the bars and the texts are
+ created once and only their heights, texts and limits change from an image to the next.
+ The bars of a panel are drawn as one polygon (their outline), not as one patch per bin.
+ The histograms are sliced from the cube (ASTRI_cube), filled in a single pass over the file.
+ Layouts:
+ - camera: one image, a panel per PDM (histogram of its elements)
+ - pdm: one image per PDM, a panel per element (pixel for HI/LO, sensor for T)
+ - pixel: one image per PDM and element
+ As in visASTRI_histo.py, the bin content annotated is N_counts[binx-1].
+ SeriesFigure draws the stack view of visASTRI_temporal.py, the curves decimated to the
+ min/max envelope of the pixel budget (ASTRI_decimate) with the annotated points kept.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Axis labels of GridFigure, SeriesFigure (job files).
+
+"""
+
+import numpy as np
+import multiprocessing
+import os
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Polygon
+
+import ASTRI_decimate
+import ASTRI_histo
+
+LAYOUTS = ('camera', 'pdm', 'pixel')
+
+DEFAULT_DPI = 80
+
+# inches of a panel
+PANEL_SIZE = 2.5
+
+
+def step_outline(bin_array, N_counts):
+	"""[2*nbins+2, 2] vertices of the outline of the bars N_counts on the bins bin_array"""
+	outline = np.zeros((2*len(N_counts)+2, 2))
+	outline[0::2, 0] = bin_array
+	outline[1::2, 0] = bin_array
+	outline[1:-1:2, 1] = N_counts
+	outline[2:-1:2, 1] = N_counts
+	return outline
+
+
+def grid_shape(npanels):
+	"""(nrows, ncols) of the smallest near-square grid with npanels panels"""
+	ncols = int(np.ceil(np.sqrt(npanels)))
+	nrows = int(np.ceil(npanels/float(ncols)))
+	return nrows, ncols
+
+
+class GridFigure(object):
+	"""nrows x ncols histogram panels with the bins bin_array"""
+
+	def __init__(self, nrows, ncols, bin_array, binx, dpi = DEFAULT_DPI):
+		self.binx = binx
+		self.dpi = dpi
+		# headroom: y-axis limit / highest bin
+		if (nrows*ncols == 1):
+			self.figure = Figure(figsize=[10,7])
+			fontsize = 12
+			text_x, text_y, text_step = 0.6, 0.8, 0.05
+			self.headroom = 1.05
+		else:
+			# small panels: the annotations in the top left corner
+			self.figure = Figure(figsize=[PANEL_SIZE*ncols, PANEL_SIZE*nrows])
+			self.figure.subplots_adjust(left=0.04, right=0.98, bottom=0.04, top=0.93, wspace=0.3, hspace=0.4)
+			fontsize = 6
+			text_x, text_y, text_step = 0.03, 0.9, 0.09
+			self.headroom = 1.7
+		self.canvas = FigureCanvasAgg(self.figure)
+		self.bin_array = np.asarray(bin_array, dtype=np.float64)
+		self.panels = []
+		for panel_index in range(nrows*ncols):
+			ax = self.figure.add_subplot(nrows, ncols, panel_index+1)
+			# the bars of a panel are a single polygon
+			bars = ax.add_patch(Polygon(step_outline(self.bin_array, np.zeros(len(self.bin_array)-1)), closed=True, edgecolor='blue', facecolor='blue', lw = 1))
+			texts = [ax.text(text_x, text_y - text_step*line, '', transform=ax.transAxes, fontsize=fontsize, zorder=100) for line in range(4)]
+			ax.set_xlim(bin_array[0], bin_array[-1])
+			ax.tick_params(labelsize=fontsize)
+			if (nrows*ncols > 1):
+				ax.locator_params(nbins=4)
+			ax.grid()
+			self.panels.append((ax, bars, texts))
+		self.fontsize = fontsize
+
+	def draw(self, histograms, title = '', xlabel = '', ylabel = ''):
+		"""Fill the panels with histograms, a list of (N_counts, N_entries, mean_out, sd_out, panel title)"""
+		for panel_index, (ax, bars, texts) in enumerate(self.panels):
+			if (panel_index >= len(histograms)):
+				ax.set_visible(False)
+				continue
+			N_counts, N_entries, mean_out, sd_out, panel_title = histograms[panel_index]
+			ax.set_visible(True)
+			bars.set_xy(step_outline(self.bin_array, N_counts))
+			texts[0].set_text('Entries = '+str(N_entries))
+			texts[1].set_text('Mean = '+str(round(mean_out, 1)))
+			texts[2].set_text('RMS = '+str(round(sd_out, 1)))
+			texts[3].set_text('Bin content ['+str(self.binx)+'] = '+str(N_counts[self.binx-1]))
+			ax.set_ylim(0, max(N_counts.max(), 1)*self.headroom)
+			ax.set_title(panel_title, fontsize=self.fontsize+2)
+			ax.set_xlabel(xlabel, fontsize=self.fontsize)
+			ax.set_ylabel(ylabel, fontsize=self.fontsize)
+		self.figure.suptitle(title)
+
+	def save(self, filename):
+		self.figure.savefig(filename, dpi=self.dpi)
+
+
+def layout_jobs(histo_cube, layout, outdir, selPDM = 0):
+	"""Images of the layout of histo_cube as (file name, (nrows, ncols), panels, title),
+	panels being a list of (selPDM, subfield_id, panel title). selPDM > 0 limits the images to one PDM."""
+	nPDM, nelem = histo_cube.counts.shape[:2]
+	if (selPDM > 0):
+		pdm_ids = [selPDM]
+	else:
+		pdm_ids = range(1, nPDM+1)
+	jobs = []
+	if (layout == 'camera'):
+		panels = [(pdm_id, 0, 'PDM'+str(pdm_id).zfill(2)) for pdm_id in pdm_ids]
+		jobs.append((os.path.join(outdir, histo_cube.param+'_camera.png'), grid_shape(len(panels)), panels, histo_cube.param))
+	elif (layout == 'pdm'):
+		for pdm_id in pdm_ids:
+			field = ASTRI_histo.pdm_field(pdm_id, histo_cube.param)
+			panels = [(pdm_id, elem_id, field+' ['+str(elem_id)+']') for elem_id in range(1, nelem+1)]
+			jobs.append((os.path.join(outdir, field+'.png'), grid_shape(nelem), panels, field))
+	elif (layout == 'pixel'):
+		for pdm_id in pdm_ids:
+			field = ASTRI_histo.pdm_field(pdm_id, histo_cube.param)
+			for elem_id in range(1, nelem+1):
+				jobs.append((os.path.join(outdir, field+'_'+str(elem_id).zfill(2)+'.png'), (1, 1), [(pdm_id, elem_id, field+' ['+str(elem_id)+']')], ''))
+	else:
+		raise ValueError('Unknown layout '+layout+' (layouts: '+', '.join(LAYOUTS)+')')
+	return jobs
+
+
+# state of a worker process: the cube and the figures by grid shape
+_worker = {}
+
+
+def init_worker(histo_cube, binx, dpi = DEFAULT_DPI):
+	"""Set the cube and the annotated bin of the worker process"""
+	_worker['cube'] = histo_cube
+	_worker['binx'] = binx
+	_worker['dpi'] = dpi
+	_worker['figures'] = {}
+
+
+def render_job(job):
+	"""Worker: draw and save the image job of layout_jobs, return its file name"""
+	filename, shape, panels, title = job
+	histo_cube = _worker['cube']
+	if (shape not in _worker['figures']):
+		_worker['figures'][shape] = GridFigure(shape[0], shape[1], histo_cube.bin_array, _worker['binx'], _worker['dpi'])
+	grid_figure = _worker['figures'][shape]
+	histograms = []
+	for selPDM, subfield_id, panel_title in panels:
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+		histograms.append((N_counts, N_entries, mean_out, sd_out, panel_title))
+	grid_figure.draw(histograms, title)
+	grid_figure.save(filename)
+	return filename
+
+
+def render_images(histo_cube, jobs, binx, n_workers = 1, dpi = DEFAULT_DPI):
+	"""Draw the images jobs of layout_jobs, in n_workers processes. Yield the file names as they are written."""
+	if ((n_workers <= 1) or (len(jobs) <= 1)):
+		init_worker(histo_cube, binx, dpi)
+		for job in jobs:
+			yield render_job(job)
+		return
+	pool = multiprocessing.Pool(min(n_workers, len(jobs)), init_worker, (histo_cube, binx, dpi))
+	try:
+		for filename in pool.imap_unordered(render_job, jobs):
+			yield filename
+	finally:
+		pool.close()
+		pool.join()
+
+
+class SeriesFigure(object):
+	"""Time series of channels against TIME_S (left) and the row counter (right), as visASTRI_temporal.py"""
+
+	def __init__(self, dpi = DEFAULT_DPI):
+		self.dpi = dpi
+		self.figure = Figure(figsize=[10,6])
+		self.canvas = FigureCanvasAgg(self.figure)
+		self.ax_temp = self.figure.add_subplot(121)
+		self.ax_graph = self.figure.add_subplot(122)
+
+	def draw(self, plot_data, time_column, row_column, labels, xvalue_temp, xvalue_graph, title = '', ylabel = '',
+		npoints = 0, channel_offset = None):
+		"""Draw the [channels, events] values plot_data, annotating the points xvalue_temp and
+		xvalue_graph (starting from 1) of a single channel. npoints = 0 is two points per pixel."""
+		nchannels, nevents = plot_data.shape
+		if (channel_offset is None):
+			channel_offset = np.zeros(nchannels)
+		if (npoints <= 0):
+			npoints = 2*int(max(self.ax_temp.bbox.width, self.ax_graph.bbox.width))
+		line_width = 1
+		if (nchannels == 1):
+			line_width = 2
+		for ax, x_column, xlabel, xvalue in ((self.ax_temp, time_column, 'TIME_S', xvalue_temp), (self.ax_graph, row_column, 'ROW COUNTER', xvalue_graph)):
+			ax.cla()
+			for channel in range(nchannels):
+				plot_index = ASTRI_decimate.with_points(ASTRI_decimate.envelope_index(plot_data[channel], npoints), [xvalue_temp-1, xvalue_graph-1], nevents)
+				ax.plot(x_column[plot_index], plot_data[channel, plot_index] + channel_offset[channel], lw = line_width, label = labels[channel])
+			if ((nchannels == 1) and (nevents >= xvalue)):
+				ax.text(0.1, 0.9, ylabel+' value ['+str(x_column[xvalue-1])+'] = '+str(plot_data[0, xvalue-1]), transform=ax.transAxes, fontsize=12, zorder=100)
+			ax.set_xlabel(xlabel)
+			ax.set_ylabel(ylabel)
+			ax.set_title(title)
+			ax.grid()
+		if ((nchannels > 1) and (nchannels <= 16)):
+			self.ax_graph.legend(fontsize='small')
+
+	def save(self, filename):
+		self.figure.savefig(filename, dpi=self.dpi)
@@ -0,0 +1,150 @@
+"""
+ ASTRI_stats.py  -  description
+ ---------------------------------------------------------------------------------
+ Mergeable streaming statistics accumulator for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_stats
+ pixel_stats = ASTRI_stats.StatsAccumulator((ASTRI_nPDM, ASTRI_NPixels_PDM))
+ pixel_stats.add(values, mask, pdm_index)
+ tot_stats = pixel_stats.total()
+ N_entries, mean_out, sd_out = tot_stats.summary()
+ ---------------------------------------------------------------------------------
+ Functions:
+ - StatsAccumulator: per-element count, mean, M2, min, max and out-of-range count
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The mean and M2 (sum of the squared deviations from the mean) are updated with
+ the Welford/Chan formulas, so accumulators filled on different row blocks,
+ files or processes merge exactly and need memory per element, not per event.
+ count, mean, M2, min and max are of the values inside the selection window,
+ n_out counts the read values outside it: Entries = count + n_out.
+ The RMS is the standard deviation of the selected values, as np.std.
+ The 8 and 16 bit integer values of a block (the ADC counts) are not converted to float:
+ the sums are exact int64 sums, M2 is computed from the deviations from the rounded mean.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Integer blocks accumulated without a float copy.
+
+"""
+
+import numpy as np
+
+STATS_ARRAYS = ('count', 'mean', 'm2', 'min', 'max', 'n_out')
+
+
+class StatsAccumulator(object):
+	"""Streaming statistics of the values of each element of an array of the given shape"""
+
+	def __init__(self, shape = ()):
+		self.count = np.zeros(shape, dtype=np.int64)
+		self.mean = np.zeros(shape, dtype=np.float64)
+		self.m2 = np.zeros(shape, dtype=np.float64)
+		self.min = np.zeros(shape, dtype=np.float64) + np.inf
+		self.max = np.zeros(shape, dtype=np.float64) - np.inf
+		self.n_out = np.zeros(shape, dtype=np.int64)
+
+	@classmethod
+	def from_values(cls, values, mask = None):
+		"""Accumulator of the columns of the 2-D values [events, elements].
+		Only the values where mask is True are selected, the others are counted as out of range."""
+		values = np.asarray(values)
+		if (mask is None):
+			mask = np.ones(values.shape, dtype=bool)
+		batch = cls(values.shape[1:])
+		batch.count = mask.sum(axis=0).astype(np.int64)
+		batch.n_out = values.shape[0] - batch.count
+		selected = batch.count > 0
+		if ((values.dtype.kind in 'iu') and (values.dtype.itemsize <= 2)):
+			batch._integer_moments(values, mask, selected)
+			return batch
+		values = values.astype(np.float64)
+		batch.mean[selected] = (np.where(mask, values, 0.).sum(axis=0)/np.maximum(batch.count, 1))[selected]
+		batch.m2[selected] = np.where(mask, (values - batch.mean)**2, 0.).sum(axis=0)[selected]
+		if (values.shape[0] > 0):
+			batch.min[selected] = np.where(mask, values, np.inf).min(axis=0)[selected]
+			batch.max[selected] = np.where(mask, values, -np.inf).max(axis=0)[selected]
+		return batch
+
+	def _integer_moments(self, values, mask, selected):
+		"""mean, M2, min and max of the 8/16 bit integer values, computed in integer arithmetic"""
+		total = np.where(mask, values, 0).sum(axis=0, dtype=np.int64)
+		mean = total/np.maximum(self.count, 1).astype(np.float64)
+		# deviations from the rounded mean: |x - shift| < 2**16, the squares fit in int64
+		shift = np.round(mean).astype(np.int32)
+		deviation = np.subtract(values, shift, dtype=np.int32)
+		deviation *= mask
+		m2 = np.square(deviation, dtype=np.int64).sum(axis=0) - self.count*(mean - shift)**2
+		self.mean[selected] = mean[selected]
+		self.m2[selected] = m2[selected]
+		if (values.shape[0] > 0):
+			type_info = np.iinfo(values.dtype)
+			self.min[selected] = np.where(mask, values, type_info.max).min(axis=0)[selected]
+			self.max[selected] = np.where(mask, values, type_info.min).max(axis=0)[selected]
+
+	def add(self, values, mask = None, index = Ellipsis):
+		"""Add the 2-D values [events, elements] to the elements self[index]"""
+		self.merge(StatsAccumulator.from_values(values, mask), index)
+
+	def merge(self, other, index = Ellipsis):
+		"""Merge the accumulator other into the elements self[index]"""
+		count_a = self.count[index]
+		count = count_a + other.count
+		delta = other.mean - self.mean[index]
+		weight = np.where(count > 0, other.count/np.maximum(count, 1).astype(np.float64), 0.)
+		self.mean[index] = self.mean[index] + delta*weight
+		self.m2[index] = self.m2[index] + other.m2 + delta**2*count_a*weight
+		self.min[index] = np.minimum(self.min[index], other.min)
+		self.max[index] = np.maximum(self.max[index], other.max)
+		self.n_out[index] = self.n_out[index] + other.n_out
+		self.count[index] = count
+
+	def total(self, index = Ellipsis):
+		"""Accumulator (scalar) of all the elements self[index] merged together"""
+		count = self.count[index]
+		mean = self.mean[index]
+		tot = StatsAccumulator()
+		tot.count = np.int64(count.sum())
+		tot.n_out = np.int64(self.n_out[index].sum())
+		if (tot.count > 0):
+			tot.mean = np.float64((count*mean).sum()/float(tot.count))
+			tot.m2 = np.float64(self.m2[index].sum() + (count*(mean - tot.mean)**2).sum())
+			tot.min = np.float64(self.min[index].min())
+			tot.max = np.float64(self.max[index].max())
+		return tot
+
+	def entries(self):
+		"""Number of read values (inside and outside the window)"""
+		return self.count + self.n_out
+
+	def rms(self):
+		"""Standard deviation of the selected values (nan if none)"""
+		with np.errstate(invalid='ignore', divide='ignore'):
+			return np.sqrt(self.m2/self.count)
+
+	def mean_value(self):
+		"""Mean of the selected values (nan if none)"""
+		return np.where(self.count > 0, self.mean, np.nan)
+
+	def summary(self):
+		"""Return (N_entries, mean_out, sd_out) of a scalar accumulator"""
+		return int(self.entries()), float(self.mean_value()), float(self.rms())
+
+	def to_arrays(self, prefix = 'stats_'):
+		"""Dictionary of the arrays of the accumulator, e.g. to save it with np.savez"""
+		arrays = {}
+		for name in STATS_ARRAYS:
+			arrays[prefix+name] = getattr(self, name)
+		return arrays
+
+	@classmethod
+	def from_arrays(cls, arrays, prefix = 'stats_'):
+		"""Accumulator from the arrays written by to_arrays"""
+		stats = cls(arrays[prefix+'count'].shape)
+		for name in STATS_ARRAYS:
+			setattr(stats, name, np.array(arrays[prefix+name]))
+		return stats
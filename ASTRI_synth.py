@@ -0,0 +1,132 @@
+"""
+ ASTRI_synth.py  -  description
+ ---------------------------------------------------------------------------------
+ Synthetic DL0 data with the layout of the ASTRI camera
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_synth
+ ASTRI_synth.write_dl0('synth_1e5.lv0', 100000)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - table_columns: FITS columns of a DL0 file (TIME_S, then HI, LO, T, DT of each PDM)
+ - SynthCamera: pedestals and noise of a synthetic camera, generating row blocks
+ - table_hdu: FITS table extension (header only) of a DL0 file with nevents rows
+ - file_size: bytes of the synthetic DL0 file with nevents rows
+ - write_dl0: write a synthetic DL0 file with nevents rows
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The file is written block by block (the FITS header with the final NAXIS2, then the
+ rows in big-endian order, then the padding to 2880 bytes), so the memory does not
+ depend on the number of events.
+ HI and LO are Gaussian around a pedestal drawn per pixel, T drifts slowly around a
+ value per sensor, DT is uniform, TIME_S increases by 1/rate per event.
+ For speed the Gaussian noise is taken from a pool of pre-generated values at random
+ offsets, so the events are not fully independent: the files are meant for timing
+ and for testing the tools, not for physics.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: file_size, to check the disk space before writing.
+
+"""
+
+import numpy as np
+
+import pyfits
+
+import ASTRI_histo
+
+# set-up parameters
+ASTRI_nPDM = 37
+ASTRI_NPixels_PDM = 64
+ASTRI_nTemp_PDM = 16
+ASTRI_nDT_PDM = 2
+
+# parameters of the PDMs: (name, FITS format, elements)
+PDM_PARAMS = (('HI', 'I', ASTRI_NPixels_PDM), ('LO', 'I', ASTRI_NPixels_PDM), ('T', 'E', ASTRI_nTemp_PDM), ('DT', 'J', ASTRI_nDT_PDM))
+
+# values of the noise pool
+NOISE_POOL_SIZE = 1 << 22
+
+FITS_BLOCK = 2880
+
+
+def table_columns(nPDM = ASTRI_nPDM):
+	"""FITS columns (ColDefs) of a DL0 file"""
+	columns = [pyfits.Column(name='TIME_S', format='D')]
+	for pdm_id in range(1, nPDM+1):
+		for param, fits_format, nelem in PDM_PARAMS:
+			columns.append(pyfits.Column(name=ASTRI_histo.pdm_field(pdm_id, param), format=str(nelem)+fits_format))
+	return pyfits.ColDefs(columns)
+
+
+class SynthCamera(object):
+	"""Pedestals, gains and noise of a synthetic camera of nPDM PDMs"""
+
+	def __init__(self, nPDM = ASTRI_nPDM, seed = 0, rate = 100., tstart = 0.):
+		self.nPDM = nPDM
+		self.rate = rate
+		self.tstart = tstart
+		self.rng = np.random.RandomState(seed)
+		self.pedestal_hi = self.rng.normal(1000., 20., (nPDM, ASTRI_NPixels_PDM))
+		self.pedestal_lo = self.rng.normal(500., 10., (nPDM, ASTRI_NPixels_PDM))
+		self.temperature = self.rng.normal(25., 1., (nPDM, ASTRI_nTemp_PDM))
+		self.noise = self.rng.normal(0., 1., NOISE_POOL_SIZE).astype(np.float32)
+
+	def gaussian(self, shape):
+		"""Unit Gaussian values of the given shape from the noise pool"""
+		size = int(np.prod(shape))
+		if (size > len(self.noise)):
+			return self.rng.normal(0., 1., shape)
+		offset = self.rng.randint(0, len(self.noise) - size + 1)
+		return self.noise[offset:offset + size].reshape(shape)
+
+	def block(self, row_start, nrows, dtype):
+		"""Structured array (dtype) of the rows [row_start, row_start + nrows)"""
+		rows = np.zeros(nrows, dtype=dtype)
+		rows['TIME_S'] = self.tstart + np.arange(row_start, row_start + nrows)/self.rate
+		# slow drift of the temperatures (one cycle every 10^6 events)
+		drift = 0.5*np.sin(2.*np.pi*np.arange(row_start, row_start + nrows)/1.e6)
+		for pdm_index in range(self.nPDM):
+			pdm_id = pdm_index + 1
+			rows[ASTRI_histo.pdm_field(pdm_id, 'HI')] = self.pedestal_hi[pdm_index] + 100.*self.gaussian((nrows, ASTRI_NPixels_PDM))
+			rows[ASTRI_histo.pdm_field(pdm_id, 'LO')] = self.pedestal_lo[pdm_index] + 30.*self.gaussian((nrows, ASTRI_NPixels_PDM))
+			rows[ASTRI_histo.pdm_field(pdm_id, 'T')] = self.temperature[pdm_index] + drift[:, np.newaxis] + 0.1*self.gaussian((nrows, ASTRI_nTemp_PDM))
+			rows[ASTRI_histo.pdm_field(pdm_id, 'DT')] = self.rng.randint(0, 100, (nrows, ASTRI_nDT_PDM))
+		return rows
+
+
+def table_hdu(nevents, nPDM = ASTRI_nPDM):
+	"""FITS table extension of a DL0 file with nevents rows, without data (its header is written)"""
+	dl0_hdu = pyfits.BinTableHDU.from_columns(table_columns(nPDM), nrows=0)
+	dl0_hdu.header['NAXIS2'] = nevents
+	dl0_hdu.header['ORIGIN'] = ('ASTRI_synth', 'synthetic DL0 data')
+	return dl0_hdu
+
+
+def file_size(nevents, nPDM = ASTRI_nPDM):
+	"""Bytes of the synthetic DL0 file with nevents rows written by write_dl0"""
+	dl0_hdu = table_hdu(nevents, nPDM)
+	data_bytes = nevents*dl0_hdu.columns.dtype.itemsize
+	return len(pyfits.PrimaryHDU().header.tostring()) + len(dl0_hdu.header.tostring()) + data_bytes + (-data_bytes % FITS_BLOCK)
+
+
+def write_dl0(filename, nevents, nPDM = ASTRI_nPDM, seed = 0, rate = 100., tstart = 0., block_size = 4096):
+	"""Write the synthetic DL0 file filename with nevents rows"""
+	dl0_hdu = table_hdu(nevents, nPDM)
+	dtype = dl0_hdu.columns.dtype.newbyteorder('>')
+	camera = SynthCamera(nPDM, seed, rate, tstart)
+
+	out_file = open(filename, 'wb')
+	try:
+		out_file.write(pyfits.PrimaryHDU().header.tostring())
+		out_file.write(dl0_hdu.header.tostring())
+		for row_start in xrange(0, nevents, block_size):
+			out_file.write(camera.block(row_start, min(block_size, nevents - row_start), dtype).tostring())
+		data_bytes = nevents*dtype.itemsize
+		out_file.write('\0'*(-data_bytes % FITS_BLOCK))
+	finally:
+		out_file.close()
@@ -0,0 +1,226 @@
+"""
+ ASTRI_temporal.py  -  description
+ ---------------------------------------------------------------------------------
+ Time series extraction for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_temporal
+ blocks = ASTRI_reader.iter_blocks(filename, [sPDM], start, stop, maxevt)
+ data_column, time_column, row_column = ASTRI_temporal.collect_series(blocks, sPDM, subfield_id)
+ channel_data, time_column, row_column = ASTRI_temporal.collect_channels(blocks, fields, subfield_id)
+ mean_data, rms_data = ASTRI_temporal.rolling_stats(channel_data, window)
+ ---------------------------------------------------------------------------------
+ Functions:
+ - collect_series: values of one element of a field, TIME_S and row counter
+ - collect_channels: [channels, events] values of the elements of a set of fields, TIME_S and row counter
+ - fill_channels: collect_channels into arrays allocated within the memory budget
+ - channel_labels: names of the channels of collect_channels
+ - append_series: add new values to a time series
+ - SeriesBuffer: time series growing in place, for the rows appended to a growing file
+ - rolling_stats: rolling mean and RMS of each channel
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The row counter is the row of the file, starting from 1, also after an event selection (ASTRI_expr).
+ The channels of collect_channels are ordered by field and then by element, e.g.
+ all the 16 sensors of PDM01T, then the ones of PDM02T, and are read in a single pass.
+ The rolling statistics are over the last window rows (fewer at the beginning of
+ the series), the RMS is the standard deviation as np.std. Extending them from the row first
+ on only reads the last window rows before it.
+ append_series copies the whole series; SeriesBuffer keeps free room after the events and doubles
+ it when full, so that appending n events costs O(n) on average (follow mode).
+ With a memory budget (ASTRI_memory) collect_channels is given the number of rows that can be read
+ (ASTRI_timeindex.row_count): the series are allocated once, on disk if the budget does not allow
+ them in memory, and filled block by block instead of being concatenated. The rolling statistics
+ are then computed one channel at a time, into arrays allocated the same way.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Multi-channel series (collect_channels) and rolling statistics.
+ - 2026/10/18: Row numbers of the blocks of an event selection.
+ - 2026/10/18: Series and rolling statistics allocated within the memory budget (ASTRI_memory).
+ - 2026/10/18: SeriesBuffer, rolling statistics extended without converting the whole series.
+ - 2026/10/18: Series without rows sized with the channels given (nchannels).
+
+"""
+
+import numpy as np
+
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_reader
+
+sTIME = 'TIME_S'
+
+# initial number of events of a SeriesBuffer
+MIN_CAPACITY = 1024
+
+# temporaries of rolling_stats for each event of a channel (float copies, cumulative sums, indexes)
+ROLLING_BYTES_PER_EVENT = 96
+
+
+def collect_series(blocks, field, subfield_id):
+	"""Return (data_column, time_column, row_column) of the element subfield_id (starting from 1)
+	of field over the row blocks (row_start, block) of ASTRI_reader"""
+	channel_data, time_column, row_column = collect_channels(blocks, [field], subfield_id)
+	return channel_data[0], time_column, row_column
+
+
+def collect_channels(blocks, fields, subfield_id, max_events = None, nchannels = None):
+	"""Return (channel_data, time_column, row_column) over the row blocks (row_start, block) of
+	ASTRI_reader, channel_data being the [channels, events] values of the element subfield_id
+	(starting from 1, 0 = all the elements) of each field.
+	If max_events (rows that can be read) is given the arrays are allocated once with ASTRI_memory.
+	nchannels (fields times elements, ASTRI_histo.element_count) sizes the series when no row is read,
+	one channel per field if not given."""
+	if (max_events is not None):
+		return fill_channels(blocks, fields, subfield_id, max_events, nchannels)
+	data_list = []
+	time_list = []
+	row_list = []
+	for row_start, block in blocks:
+		# [events, channels] of the block, transposed at the end
+		data_list.append(np.hstack([ASTRI_histo.select_subfield(block[field], subfield_id) for field in fields]))
+		time_list.append(block[sTIME])
+		if (ASTRI_reader.sROW in block):
+			# rows of an event selection
+			row_list.append(block[ASTRI_reader.sROW] + 1)
+		else:
+			row_list.append(np.arange(row_start + 1, row_start + 1 + len(block[sTIME])))
+	if (len(data_list) == 0):
+		return empty_channels(fields, nchannels)
+	return np.ascontiguousarray(np.concatenate(data_list).T), np.concatenate(time_list), np.concatenate(row_list)
+
+
+def empty_channels(fields, nchannels = None):
+	"""collect_channels without rows: nchannels channels, one per field if not given"""
+	if (nchannels is None):
+		nchannels = len(fields)
+	return np.zeros((nchannels, 0)), np.array([]), np.array([], dtype=np.int64)
+
+
+def fill_channels(blocks, fields, subfield_id, max_events, nchannels = None):
+	"""collect_channels into arrays of max_events events allocated within the memory budget
+	(ASTRI_memory), returned up to the last event read"""
+	channel_data = None
+	nevents = 0
+	for row_start, block in blocks:
+		block_data = [ASTRI_histo.select_subfield(block[field], subfield_id) for field in fields]
+		nrows = len(block[sTIME])
+		if (channel_data is None):
+			nchannels = sum([values.shape[1] for values in block_data])
+			channel_data = ASTRI_memory.zeros((nchannels, max_events), block_data[0].dtype, 'time series')
+			time_column = ASTRI_memory.zeros(max_events, block[sTIME].dtype, 'time series TIME_S')
+			row_column = ASTRI_memory.zeros(max_events, np.int64, 'time series rows')
+		if (nevents + nrows > max_events):
+			raise ValueError('Time series: more than the '+str(max_events)+' rows expected')
+		channel = 0
+		for values in block_data:
+			channel_data[channel:channel+values.shape[1], nevents:nevents+nrows] = values.T
+			channel += values.shape[1]
+		time_column[nevents:nevents+nrows] = block[sTIME]
+		if (ASTRI_reader.sROW in block):
+			# rows of an event selection
+			row_column[nevents:nevents+nrows] = block[ASTRI_reader.sROW] + 1
+		else:
+			row_column[nevents:nevents+nrows] = np.arange(row_start + 1, row_start + 1 + nrows)
+		nevents += nrows
+	if (channel_data is None):
+		return empty_channels(fields, nchannels)
+	for column in (channel_data, time_column, row_column):
+		ASTRI_memory.flush(column)
+	return channel_data[:, :nevents], time_column[:nevents], row_column[:nevents]
+
+
+def channel_labels(fields, nelem, subfield_id):
+	"""Names of the channels of collect_channels (e.g. PDM01T 3), nelem elements per field"""
+	if (subfield_id > 0):
+		return [field+' '+str(subfield_id) for field in fields]
+	return [field+' '+str(elem_id) for field in fields for elem_id in range(1, nelem+1)]
+
+
+def append_series(series, new_series):
+	"""Time series (data_column, time_column, row_column) with new_series appended.
+	data_column can be [channels, events], the events are appended."""
+	return tuple([np.concatenate((old_column, new_column), axis=-1) for old_column, new_column in zip(series, new_series)])
+
+
+class SeriesBuffer(object):
+	"""Time series (arrays whose last axis is the events, e.g. channel_data, time_column, row_column)
+	grown in place: appending n events costs O(n) on average"""
+
+	def __init__(self, series):
+		self.length = 0
+		self.buffers = []
+		self.append(series)
+
+	def capacity(self):
+		if (len(self.buffers) == 0):
+			return 0
+		return self.buffers[0].shape[-1]
+
+	def _allocate(self, arrays, capacity):
+		"""New buffers of capacity events, of the shape and type of arrays, holding the current events"""
+		buffers = []
+		for index, array in enumerate(arrays):
+			buffer = np.empty(array.shape[:-1] + (capacity,), dtype=array.dtype)
+			if (self.length > 0):
+				buffer[..., :self.length] = self.buffers[index][..., :self.length]
+			buffers.append(buffer)
+		self.buffers = buffers
+
+	def append(self, new_series):
+		"""Append the events of new_series (same arrays in the same order) and return the series"""
+		new_series = [np.asarray(array) for array in new_series]
+		nnew = new_series[0].shape[-1]
+		if (self.length == 0):
+			# no event yet: the shapes and types are the ones of the new events
+			self._allocate(new_series, max(nnew, MIN_CAPACITY))
+		elif (self.length + nnew > self.capacity()):
+			self._allocate(self.buffers, max(2*self.capacity(), self.length + nnew))
+		for buffer, array in zip(self.buffers, new_series):
+			buffer[..., self.length:self.length+nnew] = array
+		self.length += nnew
+		return self.series()
+
+	def series(self):
+		"""Views of the events of the arrays"""
+		return tuple([buffer[..., :self.length] for buffer in self.buffers])
+
+
+def rolling_stats(channel_data, window, first = 0):
+	"""Return (mean_data, rms_data): rolling mean and RMS over window rows of each channel
+	(last axis) of channel_data, for the rows from first on (to extend a series already computed).
+	With a memory budget (ASTRI_memory) the [channels, events] statistics are computed one channel at a time."""
+	if ((ASTRI_memory.active() is not None) and (np.ndim(channel_data) == 2)):
+		nchannels, nevents = np.shape(channel_data)
+		ASTRI_memory.check(ROLLING_BYTES_PER_EVENT*nevents, 'Rolling statistics of one channel ('+str(nevents)+' events)')
+		mean_data = ASTRI_memory.zeros((nchannels, nevents - first), np.float64, 'rolling mean')
+		rms_data = ASTRI_memory.zeros((nchannels, nevents - first), np.float64, 'rolling RMS')
+		for channel in range(nchannels):
+			mean_data[channel], rms_data[channel] = rolling_stats(channel_data[channel], window, first)
+		ASTRI_memory.flush(mean_data)
+		ASTRI_memory.flush(rms_data)
+		return mean_data, rms_data
+	channel_data = np.asarray(channel_data)
+	history = max(first - window + 1, 0)
+	# only the rows needed from first on are converted
+	values = channel_data[..., history:].astype(np.float64)
+	# centred on the channel mean to limit the round-off of the sums
+	offset = 0.
+	if (values.shape[-1] > 0):
+		offset = values.mean(axis=-1)[..., np.newaxis]
+	values = values - offset
+	zero = np.zeros(values.shape[:-1] + (1,))
+	sum_x = np.concatenate((zero, np.cumsum(values, axis=-1)), axis=-1)
+	sum_x2 = np.concatenate((zero, np.cumsum(values*values, axis=-1)), axis=-1)
+	stop = np.arange(history + 1, channel_data.shape[-1] + 1)
+	start = np.maximum(stop - window, 0)
+	n = (stop - start).astype(np.float64)
+	mean = (sum_x[..., stop - history] - sum_x[..., start - history])/n
+	var = (sum_x2[..., stop - history] - sum_x2[..., start - history])/n - mean*mean
+	var[..., n == 1] = 0.
+	skip = first - history
+	return (mean + offset)[..., skip:], np.sqrt(np.maximum(var, 0.))[..., skip:]
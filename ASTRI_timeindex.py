@@ -0,0 +1,233 @@
+"""
+ ASTRI_timeindex.py  -  description
+ ---------------------------------------------------------------------------------
+ TIME_S index and time-window selection for the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_timeindex
+ dl0 = ASTRI_reader.DL0File(filename)
+ for row_start, block in ASTRI_timeindex.iter_time_blocks(dl0, ['PDM01HI'], tstart, tstop):
+     block['PDM01HI'], block['TIME_S']
+ ---------------------------------------------------------------------------------
+ Functions:
+ - TimeIndex: minimum and maximum TIME_S of each group of rows of a DL0 file
+ - build_index: index of a DL0 file, in a single pass over its TIME_S column
+ - load_index: index of a DL0 file from its sidecar file, built and saved if missing or old
+ - index_path: name of the sidecar file of a DL0 file
+ - time_mask: selection mask of the time window
+ - split_time_window: rows of the row blocks inside the time window
+ - read_ranges: row ranges of a DL0 file read for a time window
+ - row_count: number of rows read for a time window, at most
+ - iter_time_blocks: row blocks of the rows of a DL0 file inside the time window
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The time window is tstart <= TIME_S < tstop, tstart or tstop = None is not bounded.
+ The index is built on the first time-window query of a file (only the TIME_S column is
+ copied out of the file) and saved next to it as filename.tidx.npz, together with the size
+ and modification time of the file: it is built again if the file changes. If the sidecar
+ cannot be written (e.g. read-only directory) the index is only kept in memory.
+ If TIME_S never decreases the window is a single row range, found by binary search on
+ the index and then on the TIME_S of its first and last group, so only the rows of the
+ window are read. Otherwise (e.g. time resets) only the groups of rows whose TIME_S range
+ overlaps the window are read, and their rows are selected one by one.
+ The blocks are split where rows are excluded, so each block is still a range of
+ consecutive rows starting at row_start.
+ row_count is the number of rows of the ranges read: the rows of the window, or more if TIME_S
+ decreases somewhere (the rows of the groups overlapping the window).
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: read_ranges and row_count (memory estimates of ASTRI_memory).
+
+"""
+
+import numpy as np
+import tempfile
+import os
+
+import ASTRI_reader
+
+# rows per group of the index
+INDEX_BLOCK_SIZE = 4096
+
+INDEX_EXT = '.tidx.npz'
+
+sTIME = ASTRI_reader.sTIME
+
+
+class TimeIndex(object):
+	"""First row, minimum and maximum TIME_S of each group of block_size rows of a DL0 file"""
+
+	def __init__(self, starts, tmin, tmax, nrows, monotonic, block_size = INDEX_BLOCK_SIZE):
+		self.starts = starts
+		self.tmin = tmin
+		self.tmax = tmax
+		self.nrows = nrows
+		self.monotonic = monotonic
+		self.block_size = block_size
+
+	def row_ranges(self, dl0_file, tstart = None, tstop = None):
+		"""Row ranges [(start, stop), ...] of dl0_file that can hold the rows of the time window"""
+		if ((len(self.starts) == 0) or ((tstart is not None) and (tstop is not None) and (tstop <= tstart))):
+			return []
+		if (self.monotonic):
+			first_block = 0
+			last_block = len(self.starts)
+			if (tstart is not None):
+				first_block = np.searchsorted(self.tmax, tstart, side='left')
+			if (tstop is not None):
+				last_block = np.searchsorted(self.tmin, tstop, side='left')
+			if (first_block >= last_block):
+				return []
+			first_row = self.starts[first_block]
+			last_row = self.group_stop(last_block - 1)
+			# exact rows by binary search on the TIME_S of the first and last group
+			if (tstart is not None):
+				first_row += np.searchsorted(self.group_time(dl0_file, first_block), tstart, side='left')
+			if (tstop is not None):
+				last_row = self.starts[last_block - 1] + np.searchsorted(self.group_time(dl0_file, last_block - 1), tstop, side='left')
+			if (first_row >= last_row):
+				return []
+			return [(first_row, last_row)]
+
+		overlap = np.ones(len(self.starts), dtype=bool)
+		if (tstart is not None):
+			overlap &= self.tmax >= tstart
+		if (tstop is not None):
+			overlap &= self.tmin < tstop
+		ranges = []
+		for group in np.flatnonzero(overlap):
+			# consecutive groups are read as a single range
+			if ((len(ranges) > 0) and (ranges[-1][1] == self.starts[group])):
+				ranges[-1] = (ranges[-1][0], self.group_stop(group))
+			else:
+				ranges.append((self.starts[group], self.group_stop(group)))
+		return ranges
+
+	def group_stop(self, group):
+		"""Row after the last row of the group"""
+		return min(self.starts[group] + self.block_size, self.nrows)
+
+	def group_time(self, dl0_file, group):
+		"""TIME_S of the rows of the group"""
+		return dl0_file.read([sTIME], self.starts[group], self.group_stop(group))[sTIME]
+
+
+def build_index(dl0_file, block_size = INDEX_BLOCK_SIZE):
+	"""Index of the DL0File dl0_file, reading only its TIME_S column"""
+	starts = []
+	tmin = []
+	tmax = []
+	monotonic = True
+	last_time = None
+	for row_start, block in dl0_file.iter_blocks([], 0, 0, 0, block_size):
+		time_column = block[sTIME]
+		starts.append(row_start)
+		tmin.append(np.nanmin(time_column))
+		tmax.append(np.nanmax(time_column))
+		if (monotonic):
+			monotonic = bool(np.all(time_column[1:] >= time_column[:-1]))
+			if ((last_time is not None) and (time_column[0] < last_time)):
+				monotonic = False
+		last_time = time_column[-1]
+	return TimeIndex(np.array(starts, dtype=np.int64), np.array(tmin, dtype=np.float64), np.array(tmax, dtype=np.float64),
+		dl0_file.nrows, monotonic, block_size)
+
+
+def index_path(filename):
+	"""Sidecar file of the index of the DL0 file filename"""
+	return filename + INDEX_EXT
+
+
+def load_index(dl0_file, block_size = INDEX_BLOCK_SIZE):
+	"""Index of the DL0File dl0_file from its sidecar file, built (and saved) if missing or old"""
+	path = index_path(dl0_file.filename)
+	file_stat = os.stat(dl0_file.filename)
+	identity = np.array([file_stat.st_size, file_stat.st_mtime, block_size, dl0_file.nrows], dtype=np.float64)
+	if (os.path.exists(path)):
+		try:
+			index_file = np.load(path)
+			if (np.array_equal(index_file['identity'], identity)):
+				time_index = TimeIndex(index_file['starts'], index_file['tmin'], index_file['tmax'], dl0_file.nrows,
+					bool(index_file['monotonic']), block_size)
+				index_file.close()
+				return time_index
+			index_file.close()
+		except Exception:
+			# broken sidecar: built again
+			pass
+
+	time_index = build_index(dl0_file, block_size)
+	try:
+		fd, temp_path = tempfile.mkstemp(suffix=INDEX_EXT, dir=os.path.dirname(os.path.abspath(path)))
+		temp_file = os.fdopen(fd, 'wb')
+		try:
+			np.savez(temp_file, identity=identity, starts=time_index.starts, tmin=time_index.tmin, tmax=time_index.tmax,
+				monotonic=time_index.monotonic)
+		finally:
+			temp_file.close()
+		os.rename(temp_path, path)
+	except (IOError, OSError):
+		pass
+	return time_index
+
+
+def time_mask(time_column, tstart = None, tstop = None):
+	"""Selection mask of the time window: tstart <= TIME_S < tstop"""
+	mask = np.ones(len(time_column), dtype=bool)
+	if (tstart is not None):
+		mask &= time_column >= tstart
+	if (tstop is not None):
+		mask &= time_column < tstop
+	return mask
+
+
+def split_time_window(blocks, tstart = None, tstop = None):
+	"""Yield (row_start, block) with only the rows of the row blocks of ASTRI_reader inside
+	the time window, a block being split in ranges of consecutive rows where needed"""
+	for row_start, block in blocks:
+		mask = time_mask(block[sTIME], tstart, tstop)
+		if (np.all(mask)):
+			yield row_start, block
+			continue
+		# limits of the runs of selected rows
+		edges = np.flatnonzero(np.diff(np.r_[False, mask, False]))
+		for run_start, run_stop in zip(edges[0::2], edges[1::2]):
+			sub_block = {}
+			for name in block:
+				sub_block[name] = block[name][run_start:run_stop]
+			yield row_start + run_start, sub_block
+
+
+def read_ranges(dl0_file, tstart = None, tstop = None, start = 0, stop = 0, maxevt = 0):
+	"""Row ranges [range_start, range_stop) of the DL0File dl0_file read by iter_time_blocks"""
+	start, stop = dl0_file.row_range(start, stop, maxevt)
+	if ((tstart is None) and (tstop is None)):
+		ranges = [(start, stop)]
+	else:
+		ranges = load_index(dl0_file).row_ranges(dl0_file, tstart, tstop)
+	read = []
+	for range_start, range_stop in ranges:
+		range_start = max(range_start, start)
+		range_stop = min(range_stop, stop)
+		if (range_start < range_stop):
+			read.append((range_start, range_stop))
+	return read
+
+
+def row_count(dl0_file, tstart = None, tstop = None, start = 0, stop = 0, maxevt = 0):
+	"""Number of rows read by iter_time_blocks, an upper bound of the rows of the time window"""
+	return sum([range_stop - range_start for range_start, range_stop in read_ranges(dl0_file, tstart, tstop, start, stop, maxevt)])
+
+
+def iter_time_blocks(dl0_file, names, tstart = None, tstop = None, start = 0, stop = 0, maxevt = 0,
+	block_size = ASTRI_reader.DEFAULT_BLOCK_SIZE):
+	"""Yield (row_start, block) of the DL0File dl0_file as DL0File.iter_blocks, with only the rows
+	of the row range [start, stop) (and maxevt) inside the time window"""
+	for range_start, range_stop in read_ranges(dl0_file, tstart, tstop, start, stop, maxevt):
+		blocks = dl0_file.iter_blocks(names, range_start, range_stop, 0, block_size)
+		for row_start, block in split_time_window(blocks, tstart, tstop):
+			yield row_start, block
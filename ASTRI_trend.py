@@ -0,0 +1,313 @@
+"""
+ ASTRI_trend.py  -  description
+ ---------------------------------------------------------------------------------
+ Cross-run trending database of the per-file statistics of the ASTRI DL0 data
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ import ASTRI_trend
+ trend_db = ASTRI_trend.open_db('ASTRI_trend.sqlite')
+ windows = ASTRI_trend.parse_windows('HI:800:1400,LO:800:1400', ('HI', 'LO', 'T'))
+ params = ASTRI_trend.missing_params(trend_db, filename, windows)
+ summary = ASTRI_trend.file_summary(filename, params, windows = windows)
+ ASTRI_trend.store_summary(trend_db, summary)
+ times, values, errors, runs = ASTRI_trend.trend(trend_db, 'HI', 1, 5, 'mean')
+ ---------------------------------------------------------------------------------
+ Functions:
+ - open_db: open (and create) the SQLite trending database
+ - run_name: run of a DL0 file from its name
+ - parse_windows: selection window of each parameter from param:min:max,... text
+ - file_summary: per-pixel statistics of the parameters of a DL0 file, in a single pass
+ - summary_job: file_summary for a worker process, errors returned and not raised
+ - summarize_files: file summaries computed in a pool of worker processes
+ - missing_params: parameters of a file not in the database with their window, all if the file changed
+ - store_summary: write (or replace) the statistics of the parameters of a file
+ - trend: statistics of a pixel, PDM or of the camera versus time
+ - ingested_files: files in the database, with their run and time range
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The database has two tables:
+ - files: one row per ingested file, with its absolute path, size, modification time,
+   run, first and last TIME_S and number of rows
+ - stats: for each file and parameter the statistics (ASTRI_stats) of each pixel (pdm, element),
+   of each PDM (element = 0) and of the whole camera (pdm = 0, element = 0), with the window
+   (minval, maxval) of the parameter
+ entries counts the values read, count the ones inside the window (minval < x < maxval, or
+ x < maxval if minval = 0, as ASTRI_histo), mean, rms, min and max are of the values inside it.
+ For HI/LO the mean in a window around the pedestal is the pedestal of the pixel: each parameter
+ has its own window (parse_windows), so that T is not cut by the window of HI/LO.
+ The stats table is indexed by (param, pdm, element), so a trend is read without scanning the
+ other pixels, and sorted by the TIME_S of the start of the files.
+ The run of a file is its name without directory, extension and final _<number> field
+ (e.g. astri_000_11_111_11111_R_000000_000 for astri_000_11_111_11111_R_000000_000_0201.lv0).
+ A file is ingested again if its size or modification time changed (all its parameters are
+ replaced), and a parameter of an unchanged file if it is missing or was ingested with another
+ window (the other parameters are kept). A database of format version 1 (without windows) is
+ upgraded when opened: its parameters are ingested again. The statistics are computed in
+ worker processes, only the main process writes to the database.
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Window of each parameter stored and compared, only the missing parameters ingested.
+ - 2026/10/18: open_db errors (missing file, not a database) raised as ValueError.
+
+"""
+
+import numpy as np
+import multiprocessing
+import sqlite3
+import time
+import re
+import os
+
+import ASTRI_cache
+import ASTRI_histo
+import ASTRI_reader
+import ASTRI_stats
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+# format of the database
+TREND_VERSION = 2
+
+DEFAULT_DB = 'ASTRI_trend.sqlite'
+
+DEFAULT_PARAMS = ('HI', 'LO', 'T')
+
+QUANTITIES = ('mean', 'rms', 'min', 'max', 'entries', 'out')
+
+SCHEMA = (
+	'CREATE TABLE IF NOT EXISTS files (file_id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime REAL, '
+	'run TEXT, tstart REAL, tstop REAL, nrows INTEGER, ingested TEXT)',
+	'CREATE TABLE IF NOT EXISTS stats (file_id INTEGER, param TEXT, pdm INTEGER, element INTEGER, '
+	'entries INTEGER, count INTEGER, mean REAL, rms REAL, min REAL, max REAL, minval REAL, maxval REAL, '
+	'PRIMARY KEY (file_id, param, pdm, element))',
+	'CREATE INDEX IF NOT EXISTS files_time ON files (tstart)',
+	'CREATE INDEX IF NOT EXISTS files_run ON files (run)',
+	'CREATE INDEX IF NOT EXISTS stats_pixel ON stats (param, pdm, element, file_id)')
+
+# upgrade of a database of format version 1: windows unknown (NULL)
+UPGRADE_V1 = (
+	'ALTER TABLE stats ADD COLUMN minval REAL',
+	'ALTER TABLE stats ADD COLUMN maxval REAL')
+
+# SQL of the quantities of the stats table
+QUANTITY_SQL = {'mean': 'stats.mean', 'rms': 'stats.rms', 'min': 'stats.min', 'max': 'stats.max',
+	'entries': 'stats.entries', 'out': '(stats.entries - stats.count)*1.0/stats.entries'}
+
+
+def open_db(db_path = DEFAULT_DB, create = True):
+	"""sqlite3 connection to the trending database db_path, created if missing and create.
+	A ValueError is raised if it is missing (and not create), not a database or of another format version."""
+	if ((not create) and (not os.path.exists(db_path))):
+		raise ValueError('Trending database '+db_path+' not found')
+	try:
+		trend_db = sqlite3.connect(db_path)
+		version = trend_db.execute('PRAGMA user_version').fetchone()[0]
+	except sqlite3.DatabaseError as error:
+		raise ValueError('Trending database '+db_path+' cannot be opened: '+str(error))
+	if (version == 0):
+		for statement in SCHEMA:
+			trend_db.execute(statement)
+		trend_db.execute('PRAGMA user_version = '+str(TREND_VERSION))
+		trend_db.commit()
+	elif (version == 1):
+		for statement in UPGRADE_V1:
+			trend_db.execute(statement)
+		trend_db.execute('PRAGMA user_version = '+str(TREND_VERSION))
+		trend_db.commit()
+	elif (version != TREND_VERSION):
+		trend_db.close()
+		raise ValueError('Trending database '+db_path+' has format version '+str(version)+', expected '+str(TREND_VERSION))
+	return trend_db
+
+
+def run_name(filename):
+	"""Run of the DL0 file filename: its name without extensions and final _<number> field"""
+	name = os.path.basename(filename).split('.')[0]
+	return re.sub('_[0-9]+$', '', name)
+
+
+def parse_windows(text, params, minval = 0, maxval = np.inf):
+	"""param -> (minval, maxval) of the parameters params: the windows of the text param:min:max,...
+	(min or max empty: the default), (minval, maxval) for the parameters not in it"""
+	windows = dict([(param, (minval, maxval)) for param in params])
+	if (text in (None, '')):
+		return windows
+	for window_text in text.split(','):
+		parts = window_text.split(':')
+		if ((len(parts) != 3) or (parts[0] not in windows)):
+			raise ValueError('Bad window '+window_text+' (param:min:max, param one of '+','.join(params)+')')
+		param_min, param_max = windows[parts[0]]
+		if (parts[1] != ''):
+			param_min = float(parts[1])
+		if (parts[2] != ''):
+			param_max = float(parts[2])
+		windows[parts[0]] = (param_min, param_max)
+	return windows
+
+
+def file_summary(filename, params = DEFAULT_PARAMS, minval = 0, maxval = np.inf, block_size = ASTRI_reader.DEFAULT_BLOCK_SIZE,
+	nPDM = ASTRI_nPDM, windows = None):
+	"""Statistics of the parameters params of the DL0 file filename, in a single pass over its rows,
+	in the window windows[param] (parse_windows), (minval, maxval) if not given.
+	Return a dictionary with the file identity (ASTRI_cache), nrows, tstart, tstop, stats and windows,
+	stats being param -> StatsAccumulator [nPDM, elements] and windows param -> (minval, maxval)."""
+	if (windows is None):
+		windows = {}
+	windows = dict([(param, windows.get(param, (minval, maxval))) for param in params])
+	dl0_astri = ASTRI_reader.open_dl0(filename)
+	fields = {}
+	all_fields = []
+	pixel_stats = {}
+	for param in params:
+		fields[param] = ASTRI_histo.pdm_fields(0, param, nPDM = nPDM)
+		all_fields += fields[param]
+		pixel_stats[param] = ASTRI_stats.StatsAccumulator((nPDM, dl0_astri.element_count(fields[param][0])))
+	tstart = np.inf
+	tstop = -np.inf
+	nrows = 0
+	for row_start, block in dl0_astri.iter_blocks(all_fields, 0, 0, 0, block_size):
+		time_column = block[ASTRI_reader.sTIME]
+		nrows += len(time_column)
+		if (len(time_column) > 0):
+			tstart = min(tstart, float(time_column.min()))
+			tstop = max(tstop, float(time_column.max()))
+		for param in params:
+			param_min, param_max = windows[param]
+			for pdm_index, field in enumerate(fields[param]):
+				values = ASTRI_histo.select_subfield(block[field], 0)
+				pixel_stats[param].add(values, ASTRI_histo.window_mask(values, param_min, param_max), pdm_index)
+	if (nrows == 0):
+		tstart = tstop = np.nan
+	return {'identity': ASTRI_cache.file_identity(filename), 'nrows': nrows, 'tstart': tstart, 'tstop': tstop, 'stats': pixel_stats,
+		'windows': windows}
+
+
+def summary_job(job):
+	"""Worker: (filename, summary, error, time [s]) of file_summary(*job)"""
+	filename = job[0]
+	time_start = time.time()
+	try:
+		summary = file_summary(*job)
+	except Exception as error:
+		return filename, None, str(error), time.time() - time_start
+	return filename, summary, '', time.time() - time_start
+
+
+def summarize_files(jobs, n_workers = 1):
+	"""Yield summary_job of the jobs (arguments of file_summary) as they are done, in n_workers processes"""
+	if ((n_workers <= 1) or (len(jobs) <= 1)):
+		for job in jobs:
+			yield summary_job(job)
+		return
+	pool = multiprocessing.Pool(min(n_workers, len(jobs)))
+	try:
+		for result in pool.imap_unordered(summary_job, jobs):
+			yield result
+	finally:
+		pool.close()
+		pool.join()
+
+
+def missing_params(trend_db, filename, windows):
+	"""Parameters of windows (param -> (minval, maxval)) to be ingested for filename: all if the file is not
+	in the database with its current size and modification time, else the ones missing or with another window"""
+	path, size, mtime = ASTRI_cache.file_identity(filename)
+	row = trend_db.execute('SELECT file_id, size, mtime FROM files WHERE path = ?', (path,)).fetchone()
+	if ((row is None) or (row[1] != size) or (row[2] != mtime)):
+		return sorted(windows)
+	stored = dict([(param, (param_min, param_max)) for param, param_min, param_max in
+		trend_db.execute('SELECT DISTINCT param, minval, maxval FROM stats WHERE file_id = ?', (row[0],))])
+	return [param for param in sorted(windows) if stored.get(param) != tuple(windows[param])]
+
+
+def stats_rows(file_id, param, pixel_stats, window):
+	"""Rows of the stats table: camera, PDMs and pixels of the StatsAccumulator pixel_stats in the window (minval, maxval)"""
+	minval, maxval = window
+
+	def stats_row(pdm, element, stats):
+		entries, mean_out, sd_out = stats.summary()
+		if (stats.count == 0):
+			return (file_id, param, pdm, element, entries, 0, None, None, None, None, minval, maxval)
+		return (file_id, param, pdm, element, entries, int(stats.count), mean_out, sd_out, float(stats.min), float(stats.max), minval, maxval)
+
+	nPDM, nelem = pixel_stats.count.shape
+	rows = [stats_row(0, 0, pixel_stats.total())]
+	for pdm_index in range(nPDM):
+		rows.append(stats_row(pdm_index+1, 0, pixel_stats.total(pdm_index)))
+	# pixels without values in the window: NULL
+	empty = pixel_stats.count == 0
+	columns = [pixel_stats.entries(), pixel_stats.count, pixel_stats.mean_value(), pixel_stats.rms(), pixel_stats.min, pixel_stats.max]
+	columns = [column.astype(object) for column in columns]
+	for column in columns[2:]:
+		column[empty] = None
+	pdm_ids, element_ids = np.indices((nPDM, nelem)) + 1
+	rows += zip([file_id]*(nPDM*nelem), [param]*(nPDM*nelem), pdm_ids.ravel().tolist(), element_ids.ravel().tolist(),
+		*([column.ravel().tolist() for column in columns] + [[minval]*(nPDM*nelem), [maxval]*(nPDM*nelem)]))
+	return rows
+
+
+def store_summary(trend_db, summary, run = None):
+	"""Write the file_summary summary to the database. The parameters of the summary replace the ones
+	already stored for the same file, the other parameters are kept if the file did not change."""
+	path, size, mtime = summary['identity']
+	if (run is None):
+		run = run_name(path)
+	file_values = (run, summary['tstart'], summary['tstop'], summary['nrows'], time.strftime('%Y-%m-%dT%H:%M:%S'))
+	with trend_db:
+		old_row = trend_db.execute('SELECT file_id, size, mtime FROM files WHERE path = ?', (path,)).fetchone()
+		if ((old_row is not None) and (old_row[1] == size) and (old_row[2] == mtime)):
+			file_id = old_row[0]
+			trend_db.execute('UPDATE files SET run = ?, tstart = ?, tstop = ?, nrows = ?, ingested = ? WHERE file_id = ?', file_values + (file_id,))
+			for param in sorted(summary['stats']):
+				trend_db.execute('DELETE FROM stats WHERE file_id = ? AND param = ?', (file_id, param))
+		else:
+			if (old_row is not None):
+				trend_db.execute('DELETE FROM stats WHERE file_id = ?', old_row[:1])
+				trend_db.execute('DELETE FROM files WHERE file_id = ?', old_row[:1])
+			file_id = trend_db.execute('INSERT INTO files (path, size, mtime, run, tstart, tstop, nrows, ingested) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+				(path, size, mtime) + file_values).lastrowid
+		for param in sorted(summary['stats']):
+			trend_db.executemany('INSERT INTO stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+				stats_rows(file_id, param, summary['stats'][param], summary['windows'][param]))
+	return file_id
+
+
+def trend(trend_db, param, pdm, element, quantity, tstart = None, tstop = None, run = None):
+	"""Return (times, values, errors, runs) of the quantity of the pixel element of the PDM pdm
+	(element = 0: whole PDM, pdm = 0: whole camera), one per file sorted by the TIME_S of its start.
+	errors are the RMS for the mean, 0 for the other quantities. Only the files starting in
+	tstart <= TIME_S < tstop and of the run run are selected, if given."""
+	if (quantity not in QUANTITY_SQL):
+		raise ValueError('Unknown quantity '+quantity+' (quantities: '+', '.join(QUANTITIES)+')')
+	query = 'SELECT files.tstart, '+QUANTITY_SQL[quantity]+', stats.rms, files.run FROM stats JOIN files ON stats.file_id = files.file_id ' \
+		'WHERE stats.param = ? AND stats.pdm = ? AND stats.element = ?'
+	query_args = [param, pdm, element]
+	if (tstart is not None):
+		query += ' AND files.tstart >= ?'
+		query_args.append(tstart)
+	if (tstop is not None):
+		query += ' AND files.tstart < ?'
+		query_args.append(tstop)
+	if (run is not None):
+		query += ' AND files.run = ?'
+		query_args.append(run)
+	rows = trend_db.execute(query + ' ORDER BY files.tstart', query_args).fetchall()
+	# NULL (no values in the window) -> NaN
+	times = np.array([row[0] for row in rows], dtype=np.float64)
+	values = np.array([row[1] for row in rows], dtype=np.float64)
+	if (quantity == 'mean'):
+		errors = np.array([row[2] for row in rows], dtype=np.float64)
+	else:
+		errors = np.zeros(len(rows))
+	runs = [row[3] for row in rows]
+	return times, values, errors, runs
+
+
+def ingested_files(trend_db):
+	"""List of (path, run, tstart, tstop, nrows) of the files in the database, sorted by tstart"""
+	return trend_db.execute('SELECT path, run, tstart, tstop, nrows FROM files ORDER BY tstart').fetchall()
@@ -0,0 +1,181 @@
+"""
+ batchASTRI_histo.py  -  description
+ ---------------------------------------------------------------------------------
+ Histograms of a set of ASTRI DL0 files processed in parallel
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ batchASTRI_histo.py files selPDM param subfield_id nbins minval maxval maxevt --workers=N --start=row --stop=row --block=rows --tstart=time --tstop=time --out=file
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - files: glob pattern of the FITS files (quoted, e.g. "astri_*_R_*.lv0"), or @listfile with listfile a text file with one FITS file per line
+ - selPDM: the ID of the PDM to be histogrammed. If selPDM = 0 all the PDMs are histogrammed.
+ - param: name of the parameter to be histogrammed, using the same convention of the FITS fields. E.g. HI
+ - subfield_id: element (starting from 1) of the sub-array to be histogrammed (e.g. 1 to select the pixel 1 for HI of PDM).
+ 				 If subfield_id = 0 all the sub-array is histogrammed
+ - nbins: number of bins for the histogram
+ - minval: minimum value to create the histogram
+ - maxval: maximum value to create the histogram
+ - maxevt: max row (event) to read for each file. If 0 all the events are read.
+ - (optional) --workers=N: number of worker processes. If not given, one per CPU.
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --out=file: save the combined histogram and statistics to file (.npz)
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ Each file is histogrammed by a worker process, the per-file histograms and
+ statistics (ASTRI_stats) are then merged into the combined result.
+ The per-file results are printed as soon as each file is done, files that
+ cannot be read are reported and left out of the combined result.
+ The --out file lists the merged files (files) and the ones that could not be read (failed_files),
+ in the order of the command line.
+ ---------------------------------------------------------------------------------
+ Example:
+ python batchASTRI_histo.py "astri_000_11_111_11111_R_*.lv0" 1 HI 0 100 800 1400 0 --workers=32 --out=night_PDM01_HI.npz
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: TIME_S window (ASTRI_timeindex), --tstart and --tstop options.
+ - 2026/10/18: file_list moved to ASTRI_cli.
+ - 2026/10/18: Only the merged files listed in the --out file, the failed ones apart.
+
+"""
+
+import numpy as np
+import multiprocessing
+import time
+import sys
+import os
+
+import ASTRI_cli
+import ASTRI_histo
+import ASTRI_reader
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+
+def histo_job(job):
+	"""Worker: histogram of one file, job being the arguments of ASTRI_histo.histo_file"""
+	filename = job[0]
+	time_start = time.time()
+	try:
+		N_counts, bin_array, pixel_stats = ASTRI_histo.histo_file(*job)
+	except Exception as error:
+		return filename, None, None, None, str(error), time.time() - time_start
+	return filename, N_counts, bin_array, pixel_stats, '', time.time() - time_start
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'batchASTRI_histo.py'
+	print '----'
+	print 'Histograms of a set of ASTRI DL0 files processed in parallel'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'batchASTRI_histo.py files selPDM param subfield_id nbins minval maxval maxevt --workers=N --start=row --stop=row --block=rows --tstart=time --tstop=time --out=file'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- files: glob pattern of the FITS files (quoted, e.g. "astri_*_R_*.lv0"), or @listfile with listfile a text file with one FITS file per line'
+ 	print '- selPDM: the ID of the PDM to be histogrammed. If selPDM = 0 all the PDMs are histogrammed.'
+ 	print '- param: name of the parameter to be histogrammed, using the same convention of the FITS fields. E.g. HI'
+ 	print '- subfield_id: element (starting from 1) of the sub-array to be histogrammed (e.g. 1 to select the pixel 1 for HI of PDM).'
+ 	print '			      If subfield_id = 0 all the sub-array is histogrammed.'
+ 	print '- nbins: number of bins for the histogram'
+ 	print '- minval: minimum value to create the histogram'
+ 	print '- maxval: maximum value to create the histogram'
+ 	print '- maxevt: max row (event) to read for each file. If 0 all the events are read.'
+ 	print '- (optional) --workers=N: number of worker processes. If not given, one per CPU.'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --out=file: save the combined histogram and statistics to file (.npz)'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python batchASTRI_histo.py "astri_000_11_111_11111_R_*.lv0" 1 HI 0 100 800 1400 0 --workers=32 --out=night_PDM01_HI.npz'
+ 	print '-------------------------------------------------'
+
+else:
+
+	files = arg_list[1]
+	selPDM = int(arg_list[2])
+	param = arg_list[3]
+	subfield_id = int(arg_list[4])
+	nbins = int(arg_list[5])
+	minval = int(arg_list[6])
+	maxval = int(arg_list[7])
+	maxevt = int(arg_list[8])
+	n_workers = ASTRI_cli.int_option(options, 'workers', multiprocessing.cpu_count())
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+
+	filenames = ASTRI_cli.file_list(files)
+	if (len(filenames) == 0):
+		print 'Error! No FITS file found for '+files
+		sys.exit(1)
+
+	jobs = []
+	for filename in filenames:
+		jobs.append((filename, selPDM, param, subfield_id, nbins, minval, maxval, start, stop, maxevt, block_size, ASTRI_nPDM, tstart, tstop))
+
+	# histogram the files in parallel and merge the results as they come
+	N_counts = np.zeros(nbins, dtype=np.int64)
+	bin_array = None
+	tot_stats = None
+	merged_files = set()
+	failed_files = set()
+	time_start = time.time()
+
+	print 'Processing '+str(len(filenames))+' files with '+str(n_workers)+' workers'
+	print 'FILE  ENTRIES  MEAN  RMS  TIME[s]'
+	pool = multiprocessing.Pool(n_workers)
+	for filename, file_counts, file_bins, file_stats, error, file_time in pool.imap_unordered(histo_job, jobs):
+		if (error != ''):
+			failed_files.add(filename)
+			print os.path.basename(filename)+'  Error! '+error
+			continue
+		merged_files.add(filename)
+		N_counts += file_counts
+		bin_array = file_bins
+		if (tot_stats is None):
+			tot_stats = file_stats
+		else:
+			tot_stats.merge(file_stats)
+		N_entries, mean_out, sd_out = file_stats.total().summary()
+		print os.path.basename(filename)+'  '+str(N_entries)+'  '+str(round(mean_out, 1))+'  '+str(round(sd_out, 1))+'  '+str(round(file_time, 2))
+	pool.close()
+	pool.join()
+
+	if (tot_stats is None):
+		print 'Error! None of the files could be read.'
+		sys.exit(1)
+
+	# combined results
+	N_entries, mean_out, sd_out = tot_stats.total().summary()
+	print '-------------------------------------------------'
+	print 'Files = '+str(len(merged_files))+' (failed = '+str(len(failed_files))+')'
+	print 'Entries = '+str(N_entries)
+	print 'Mean = '+str(round(mean_out, 1))
+	print 'RMS = '+str(round(sd_out, 1))
+	print 'Time = '+str(round(time.time() - time_start, 2))+' s'
+
+	if ('out' in options):
+		np.savez_compressed(options['out'], files=np.array([filename for filename in filenames if filename in merged_files]),
+			failed_files=np.array([filename for filename in filenames if filename in failed_files]), param=param, selPDM=selPDM, subfield_id=subfield_id,
+			N_counts=N_counts, bin_array=bin_array, **tot_stats.to_arrays())
@@ -0,0 +1,205 @@
+"""
+ benchASTRI_quicklook.py  -  description
+ ---------------------------------------------------------------------------------
+ Benchmark of the ASTRI quicklook tools on synthetic DL0 files
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ benchASTRI_quicklook.py workdir --events=N,N,... --tasks=name,name,... --repeat=N --out=file --label=text
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - workdir: directory of the synthetic DL0 files (synth_<events>.lv0), written if missing
+ - (optional) --events=N,N,...: numbers of events of the files (default 1e4,1e5,1e6)
+ - (optional) --tasks=name,name,...: tasks to be timed (default histo,temporal,all_pdm)
+ - (optional) --repeat=N: runs of each task, the fastest is reported (default 1)
+ - (optional) --out=file: JSON report (default workdir/bench_report.json)
+ - (optional) --label=text: label of the report (e.g. the version under test)
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The tasks are the analysis paths of the quicklook scripts, without the plots:
+ - histo: histogram of the HI pixels of PDM01 (ASTRI_histo.histo_file)
+ - temporal: time series of the sensor 1 of PDM01 T and its decimation (ASTRI_temporal, ASTRI_decimate)
+ - all_pdm: histogram of the HI pixels of all the PDMs
+ Each run is a separate process, so its peak RSS (ru_maxrss) is its own. The wall time
+ includes the reading of the file: the first run after the generation of a file can find
+ it in the page cache. The synthetic files are kept in workdir for the next benchmarks.
+ 1e7 events are about 120 GB (genASTRI_DL0.py), so they are run only if asked with --events:
+ the files to be written are checked against the free disk space of workdir before any of
+ them is written.
+ The report holds the Python, numpy and git versions, the label and, for each task and
+ number of events, the wall time and the peak RSS.
+ ---------------------------------------------------------------------------------
+ Example:
+ python benchASTRI_quicklook.py /data/bench --events=1e4,1e5,1e6 --repeat=3 --label=v1.2
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: 1e7 events only with --events, free disk space checked before writing the files.
+
+"""
+
+import numpy as np
+import subprocess
+import platform
+import resource
+import json
+import time
+import sys
+import os
+
+import ASTRI_cli
+import ASTRI_decimate
+import ASTRI_histo
+import ASTRI_reader
+import ASTRI_synth
+import ASTRI_temporal
+
+DEFAULT_EVENTS = '1e4,1e5,1e6'
+DEFAULT_TASKS = 'histo,temporal,all_pdm'
+
+
+def task_histo(filename):
+	ASTRI_histo.histo_file(filename, 1, 'HI', 0, 100, 800, 1400)
+
+
+def task_temporal(filename):
+	blocks = ASTRI_reader.iter_blocks(filename, ['PDM01T'])
+	data_column, time_column, row_column = ASTRI_temporal.collect_series(blocks, 'PDM01T', 1)
+	ASTRI_decimate.envelope_index(data_column, 2000)
+
+
+def task_all_pdm(filename):
+	ASTRI_histo.histo_file(filename, 0, 'HI', 0, 100, 800, 1400)
+
+
+TASKS = {'histo': task_histo, 'temporal': task_temporal, 'all_pdm': task_all_pdm}
+
+
+def run_task(task, filename):
+	"""Run task in this process, return (wall time [s], peak RSS [MB])"""
+	time_start = time.time()
+	TASKS[task](filename)
+	wall_time = time.time() - time_start
+	# ru_maxrss is in kB on Linux
+	return wall_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.
+
+
+def time_task(task, filename):
+	"""Run task in a new process, return (wall time [s], peak RSS [MB])"""
+	child = subprocess.Popen([sys.executable, os.path.abspath(__file__), filename, '--task='+task], stdout=subprocess.PIPE)
+	output = child.communicate()[0]
+	if (child.returncode != 0):
+		raise RuntimeError('Task '+task+' failed on '+filename)
+	result = json.loads(output.strip().splitlines()[-1])
+	return result['wall_s'], result['peak_rss_mb']
+
+
+def missing_files(workdir, events):
+	"""(filename, events) of the synthetic files of workdir to be written"""
+	missing = []
+	for nevents in events:
+		filename = os.path.join(workdir, 'synth_'+str(nevents)+'.lv0')
+		if ((not os.path.exists(filename)) or (ASTRI_reader.DL0File(filename).nrows != nevents)):
+			missing.append((filename, nevents))
+	return missing
+
+
+def check_disk_space(workdir, missing):
+	"""Fail if the files to be written do not fit the free disk space of workdir"""
+	disk_stat = os.statvfs(workdir)
+	free_bytes = disk_stat.f_bavail*disk_stat.f_frsize
+	# a file with the wrong number of events is written again in its place
+	free_bytes += sum([os.path.getsize(filename) for filename, nevents in missing if os.path.exists(filename)])
+	needed_bytes = sum([ASTRI_synth.file_size(nevents) for filename, nevents in missing])
+	if (needed_bytes > free_bytes):
+		raise ValueError('The synthetic files need '+str(round(needed_bytes/1024.**3, 1))+' GB in '+workdir+', '+
+			str(round(free_bytes/1024.**3, 1))+' GB free')
+
+
+def git_version():
+	"""Commit of the scripts, '' if not a git repository"""
+	try:
+		return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(os.path.abspath(__file__)),
+			stderr=open(os.devnull, 'w')).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ''
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'benchASTRI_quicklook.py'
+	print '----'
+	print 'Benchmark of the ASTRI quicklook tools on synthetic DL0 files'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'benchASTRI_quicklook.py workdir --events=N,N,... --tasks=name,name,... --repeat=N --out=file --label=text'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- workdir: directory of the synthetic DL0 files (synth_<events>.lv0), written if missing'
+ 	print '- (optional) --events=N,N,...: numbers of events of the files (default 1e4,1e5,1e6)'
+ 	print '- (optional) --tasks=name,name,...: tasks to be timed (default histo,temporal,all_pdm)'
+ 	print '- (optional) --repeat=N: runs of each task, the fastest is reported (default 1)'
+ 	print '- (optional) --out=file: JSON report (default workdir/bench_report.json)'
+ 	print '- (optional) --label=text: label of the report (e.g. the version under test)'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python benchASTRI_quicklook.py /data/bench --events=1e4,1e5,1e6 --repeat=3 --label=v1.2'
+ 	print '-------------------------------------------------'
+
+# a single run of a task, started by the benchmark
+elif ('task' in options):
+	wall_time, peak_rss = run_task(options['task'], arg_list[1])
+	print json.dumps({'wall_s': wall_time, 'peak_rss_mb': peak_rss})
+
+else:
+
+	workdir = arg_list[1]
+	events = [int(float(nevents)) for nevents in options.get('events', DEFAULT_EVENTS).split(',')]
+	tasks = options.get('tasks', DEFAULT_TASKS).split(',')
+	repeat = ASTRI_cli.int_option(options, 'repeat', 1)
+	out_name = options.get('out', os.path.join(workdir, 'bench_report.json'))
+	for task in tasks:
+		if (task not in TASKS):
+			print 'Error! Unknown task '+task+' (tasks: '+', '.join(sorted(TASKS))+')'
+			sys.exit(1)
+	if (not os.path.isdir(workdir)):
+		os.makedirs(workdir)
+	missing = missing_files(workdir, events)
+	try:
+		check_disk_space(workdir, missing)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+
+	report = {'label': options.get('label', ''), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'host': platform.node(),
+		'python': platform.python_version(), 'numpy': np.__version__, 'git': git_version(), 'repeat': repeat, 'results': []}
+
+	print 'TASK  EVENTS  WALL[s]  PEAK_RSS[MB]'
+	for nevents in events:
+		filename = os.path.join(workdir, 'synth_'+str(nevents)+'.lv0')
+		if ((filename, nevents) in missing):
+			time_start = time.time()
+			ASTRI_synth.write_dl0(filename, nevents)
+			print 'Written '+filename+' in '+str(round(time.time() - time_start, 2))+' s'
+		for task in tasks:
+			runs = [time_task(task, filename) for run in range(repeat)]
+			wall_time = min([run[0] for run in runs])
+			peak_rss = max([run[1] for run in runs])
+			report['results'].append({'task': task, 'events': nevents, 'wall_s': wall_time, 'peak_rss_mb': peak_rss,
+				'file_mb': os.path.getsize(filename)/1024./1024., 'runs_s': [run[0] for run in runs]})
+			print task+'  '+str(nevents)+'  '+str(round(wall_time, 3))+'  '+str(round(peak_rss, 1))
+
+	out_file = open(out_name, 'w')
+	try:
+		json.dump(report, out_file, indent=1, sort_keys=True)
+	finally:
+		out_file.close()
+	print 'Report: '+out_name
@@ -0,0 +1,140 @@
+"""
+ calibASTRI_pedestal.py  -  description
+ ---------------------------------------------------------------------------------
+ Per-pixel pedestal calibration table of an ASTRI pedestal run
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ calibASTRI_pedestal.py filename maxevt --out=file --params=HI,LO --min=ADC --max=ADC --start=row --stop=row --block=rows --tstart=time --tstop=time --force
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file of the pedestal run
+ - maxevt: max row (event) to read. If 0 all the events are read.
+ - (optional) --out=file: calibration table to be written (default filename.calib.npz)
+ - (optional) --params=HI,LO: parameters to be calibrated (default HI,LO)
+ - (optional) --min=ADC: minimum value of the pedestal window (default 0)
+ - (optional) --max=ADC: maximum value of the pedestal window (default 4096)
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --force: derive the table again even if it is up to date
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The pedestal of each pixel is the median of its values inside the window, the width is the sigma
+ from the median absolute deviation (ASTRI_calib), both computed in a single pass over the run.
+ If the table already exists and was derived from the same run (path, size and modification time),
+ parameters, window and rows (maxevt, --start, --stop, --tstart, --tstop), it is not computed again.
+ The table is applied by visASTRI_histo.py and visASTRI_temporal.py with --calib=file: the values
+ plotted are ADC - pedestal (times the gain, 1 for a table of a pedestal run).
+ ---------------------------------------------------------------------------------
+ Example:
+ python calibASTRI_pedestal.py astri_000_11_111_11111_P_000000_000_0201.lv0 0 --out=ped_0201.calib.npz
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Table derived again when the rows read changed.
+
+"""
+
+import numpy as np
+import time
+import sys
+import os
+
+import ASTRI_cache
+import ASTRI_calib
+import ASTRI_cli
+import ASTRI_reader
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+
+def table_up_to_date(out_name, filename, params, window, rows):
+	"""Table out_name if it was derived from filename with params, window and the row selection
+	rows (start, stop, maxevt, tstart, tstop), else None"""
+	if (not os.path.exists(out_name)):
+		return None
+	try:
+		calib_table = ASTRI_calib.load_table(out_name)
+	except (ValueError, KeyError, IOError):
+		return None
+	if ((calib_table.source != ASTRI_cache.file_identity(filename)) or (calib_table.params() != sorted(params))
+		or (tuple(calib_table.window) != tuple(window)) or (calib_table.rows != tuple(rows))):
+		return None
+	return calib_table
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'calibASTRI_pedestal.py'
+	print '----'
+	print 'Per-pixel pedestal calibration table of an ASTRI pedestal run'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'calibASTRI_pedestal.py filename maxevt --out=file --params=HI,LO --min=ADC --max=ADC --start=row --stop=row --block=rows --tstart=time --tstop=time --force'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file of the pedestal run'
+ 	print '- maxevt: max row (event) to read. If 0 all the events are read.'
+ 	print '- (optional) --out=file: calibration table to be written (default filename.calib.npz)'
+ 	print '- (optional) --params=HI,LO: parameters to be calibrated (default HI,LO)'
+ 	print '- (optional) --min=ADC: minimum value of the pedestal window (default 0)'
+ 	print '- (optional) --max=ADC: maximum value of the pedestal window (default 4096)'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --force: derive the table again even if it is up to date'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python calibASTRI_pedestal.py astri_000_11_111_11111_P_000000_000_0201.lv0 0 --out=ped_0201.calib.npz'
+ 	print '-------------------------------------------------'
+
+else:
+
+	filename = arg_list[1]
+	maxevt = int(arg_list[2])
+	out_name = options.get('out', filename + ASTRI_calib.CALIB_EXT)
+	params = options.get('params', ','.join(ASTRI_calib.DEFAULT_PARAMS)).split(',')
+	minval = ASTRI_cli.int_option(options, 'min', 0)
+	maxval = ASTRI_cli.int_option(options, 'max', 4096)
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+
+	calib_table = None
+	if ('force' not in options):
+		calib_table = table_up_to_date(out_name, filename, params, (minval, maxval), (start, stop, maxevt, tstart, tstop))
+	if (calib_table is not None):
+		print 'Calibration table '+out_name+' is up to date (--force to derive it again)'
+	else:
+		time_start = time.time()
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		calib_table = ASTRI_calib.derive_table(dl0_astri, params, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop)
+		calib_table.save(out_name)
+		print 'Calibration table '+out_name+' written in '+str(round(time.time() - time_start, 2))+' s ('+str(calib_table.nrows)+' rows)'
+
+	# summary of the table
+	print 'PARAM  PEDESTAL  WIDTH  NO_DATA  NOISY'
+	for param in calib_table.params():
+		pedestal = calib_table.pedestal[param]
+		width = calib_table.width[param]
+		median_width = np.nanmedian(width)
+		n_nodata = int(np.isnan(pedestal).sum())
+		# pixels with a width more than 3 times the median one
+		n_noisy = int((np.nan_to_num(width) > 3.*median_width).sum())
+		print param+'  '+str(round(np.nanmedian(pedestal), 1))+'  '+str(round(median_width, 1))+'  '+str(n_nodata)+'  '+str(n_noisy)
@@ -0,0 +1,68 @@
+"""
+ convASTRI_columnar.py  -  description
+ ---------------------------------------------------------------------------------
+ Conversion of ASTRI DL0 files to the columnar store read by the quicklook scripts
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ convASTRI_columnar.py filename [filename ...] --block=rows
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file(s) to be converted
+ - (optional) --block=rows: number of rows read at a time
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The store of filename is written to the directory filename.col, with one .npy file per
+ column (e.g. PDM01HI.npy, TIME_S.npy) and a manifest.json (ASTRI_columnar).
+ visASTRI_histo.py, visASTRI_histo_BOKEH.py, visASTRI_temporal.py and batchASTRI_histo.py
+ read the store instead of the FITS file when it exists and the FITS file has not been
+ modified since the conversion. The follow mode always reads the FITS file.
+ ---------------------------------------------------------------------------------
+ Example:
+ python convASTRI_columnar.py astri_000_11_111_11111_R_000000_000_0201.lv0
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import time
+import sys
+
+import ASTRI_cli
+import ASTRI_columnar
+import ASTRI_reader
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'convASTRI_columnar.py'
+	print '----'
+	print 'Conversion of ASTRI DL0 files to the columnar store read by the quicklook scripts'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'convASTRI_columnar.py filename [filename ...] --block=rows'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file(s) to be converted'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python convASTRI_columnar.py astri_000_11_111_11111_R_000000_000_0201.lv0'
+ 	print '-------------------------------------------------'
+
+else:
+
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+
+	for filename in arg_list[1:]:
+		time_start = time.time()
+		store_dir = ASTRI_columnar.convert(filename, block_size = block_size)
+		print filename+' -> '+store_dir+'  '+str(round(time.time() - time_start, 2))+' s'
@@ -0,0 +1,78 @@
+"""
+ genASTRI_DL0.py  -  description
+ ---------------------------------------------------------------------------------
+ Synthetic DL0 files with the layout of the ASTRI camera
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ genASTRI_DL0.py filename nevents --seed=N --rate=Hz --tstart=time --block=rows
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file to be written
+ - nevents: number of rows (events), e.g. 100000 or 1e5
+ - (optional) --seed=N: seed of the random generator (default 0)
+ - (optional) --rate=Hz: event rate, TIME_S increases by 1/rate per event (default 100 Hz)
+ - (optional) --tstart=time: TIME_S of the first event (default 0)
+ - (optional) --block=rows: number of rows written at a time
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The file has TIME_S and, for each of the 37 PDMs, the HI and LO (64 pixels), T (16 sensors)
+ and DT (2) fields (ASTRI_synth), i.e. 12144 bytes per event: 1e6 events are about 12 GB.
+ The same seed gives the same file.
+ ---------------------------------------------------------------------------------
+ Example:
+ python genASTRI_DL0.py synth_1e5.lv0 1e5 --seed=1
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import time
+import sys
+
+import ASTRI_cli
+import ASTRI_reader
+import ASTRI_synth
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'genASTRI_DL0.py'
+	print '----'
+	print 'Synthetic DL0 files with the layout of the ASTRI camera'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'genASTRI_DL0.py filename nevents --seed=N --rate=Hz --tstart=time --block=rows'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file to be written'
+ 	print '- nevents: number of rows (events), e.g. 100000 or 1e5'
+ 	print '- (optional) --seed=N: seed of the random generator (default 0)'
+ 	print '- (optional) --rate=Hz: event rate, TIME_S increases by 1/rate per event (default 100 Hz)'
+ 	print '- (optional) --tstart=time: TIME_S of the first event (default 0)'
+ 	print '- (optional) --block=rows: number of rows written at a time'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python genASTRI_DL0.py synth_1e5.lv0 1e5 --seed=1'
+ 	print '-------------------------------------------------'
+
+else:
+
+	filename = arg_list[1]
+	nevents = int(float(arg_list[2]))
+	seed = ASTRI_cli.int_option(options, 'seed', 0)
+	rate = ASTRI_cli.float_option(options, 'rate', 100.)
+	tstart = ASTRI_cli.float_option(options, 'tstart', 0.)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+
+	time_start = time.time()
+	ASTRI_synth.write_dl0(filename, nevents, seed = seed, rate = rate, tstart = tstart, block_size = block_size)
+	print filename+': '+str(nevents)+' events, '+str(round(time.time() - time_start, 2))+' s'
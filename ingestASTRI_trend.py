@@ -0,0 +1,144 @@
+"""
+ ingestASTRI_trend.py  -  description
+ ---------------------------------------------------------------------------------
+ Ingestion of the statistics of a set of ASTRI DL0 files in the trending database
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ ingestASTRI_trend.py files database --params=HI,LO,T --min=value --max=value --window=param:min:max,... --workers=N --block=rows --run=name --force
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - files: glob pattern of the FITS files (quoted, e.g. "astri_*_R_*.lv0"), or @listfile with listfile a text file with one FITS file per line
+ - database: SQLite trending database, created if missing (e.g. ASTRI_trend.sqlite)
+ - (optional) --params=HI,LO,T: parameters of the statistics (default HI,LO,T)
+ - (optional) --min=value: minimum value of the selection window (default 0)
+ - (optional) --max=value: maximum value of the selection window (default no limit)
+ - (optional) --window=param:min:max,...: selection window of some parameters (e.g. HI:800:1400,LO:800:1400), --min/--max for the others
+ - (optional) --workers=N: number of worker processes. If not given, one per CPU.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --run=name: run of all the files (default from the file names)
+ - (optional) --force: ingest the parameters of the files again even if they are up to date
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ For each file the mean, RMS, minimum, maximum and entries of each pixel, of each PDM and of
+ the camera are stored (ASTRI_trend), from a single pass over the file. The parameters already
+ in the database with the same window, for a file with the same size and modification time,
+ are skipped: only the missing parameters (or the ones with a new window) are read, and the
+ others are kept. A file changed since is ingested again with the parameters given.
+ --min/--max apply to the parameters without a --window of their own (e.g. T when --window
+ has a pedestal window for HI and LO), with the convention of visASTRI_histo.py
+ (minval < x < maxval, or x < maxval if minval = 0).
+ The trends are plotted by visASTRI_trend.py.
+ ---------------------------------------------------------------------------------
+ Example:
+ python ingestASTRI_trend.py "archive/astri_000_11_111_11111_P_*.lv0" ASTRI_trend.sqlite --params=HI,LO --workers=8
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Window per parameter (--window option), only the missing parameters ingested.
+ - 2026/10/18: Error message for a trending database that cannot be opened.
+
+"""
+
+import numpy as np
+import multiprocessing
+import time
+import sys
+import os
+
+import ASTRI_cli
+import ASTRI_reader
+import ASTRI_trend
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'ingestASTRI_trend.py'
+	print '----'
+	print 'Ingestion of the statistics of a set of ASTRI DL0 files in the trending database'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'ingestASTRI_trend.py files database --params=HI,LO,T --min=value --max=value --window=param:min:max,... --workers=N --block=rows --run=name --force'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- files: glob pattern of the FITS files (quoted, e.g. "astri_*_R_*.lv0"), or @listfile with listfile a text file with one FITS file per line'
+ 	print '- database: SQLite trending database, created if missing (e.g. ASTRI_trend.sqlite)'
+ 	print '- (optional) --params=HI,LO,T: parameters of the statistics (default HI,LO,T)'
+ 	print '- (optional) --min=value: minimum value of the selection window (default 0)'
+ 	print '- (optional) --max=value: maximum value of the selection window (default no limit)'
+ 	print '- (optional) --window=param:min:max,...: selection window of some parameters (e.g. HI:800:1400,LO:800:1400), --min/--max for the others'
+ 	print '- (optional) --workers=N: number of worker processes. If not given, one per CPU.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --run=name: run of all the files (default from the file names)'
+ 	print '- (optional) --force: ingest the parameters of the files again even if they are up to date'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python ingestASTRI_trend.py "archive/astri_000_11_111_11111_P_*.lv0" ASTRI_trend.sqlite --params=HI,LO --workers=8'
+ 	print '-------------------------------------------------'
+
+else:
+
+	files = arg_list[1]
+	db_path = arg_list[2]
+	params = options.get('params', ','.join(ASTRI_trend.DEFAULT_PARAMS)).split(',')
+	minval = ASTRI_cli.float_option(options, 'min', 0)
+	maxval = ASTRI_cli.float_option(options, 'max', np.inf)
+	try:
+		windows = ASTRI_trend.parse_windows(options.get('window', None), params, minval, maxval)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+	n_workers = ASTRI_cli.int_option(options, 'workers', multiprocessing.cpu_count())
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+	run = options.get('run', None)
+
+	filenames = ASTRI_cli.file_list(files)
+	if (len(filenames) == 0):
+		print 'Error! No FITS file found for '+files
+		sys.exit(1)
+
+	try:
+		trend_db = ASTRI_trend.open_db(db_path)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+	jobs = []
+	for filename in filenames:
+		if ('force' in options):
+			file_params = sorted(windows)
+		else:
+			file_params = ASTRI_trend.missing_params(trend_db, filename, windows)
+		if (len(file_params) > 0):
+			jobs.append((filename, file_params, minval, maxval, block_size, ASTRI_nPDM, windows))
+	print str(len(filenames))+' files, '+str(len(filenames) - len(jobs))+' already ingested'
+
+	n_done = 0
+	n_failed = 0
+	time_start = time.time()
+	if (len(jobs) > 0):
+		print 'Ingesting '+str(len(jobs))+' files with '+str(min(n_workers, len(jobs)))+' workers'
+		print 'FILE  RUN  ROWS  TIME[s]'
+	for filename, summary, error, file_time in ASTRI_trend.summarize_files(jobs, n_workers):
+		if (error != ''):
+			n_failed += 1
+			print os.path.basename(filename)+'  Error! '+error
+			continue
+		ASTRI_trend.store_summary(trend_db, summary, run)
+		n_done += 1
+		print os.path.basename(filename)+'  '+(run or ASTRI_trend.run_name(filename))+'  '+str(summary['nrows'])+'  '+str(round(file_time, 2))
+	trend_db.close()
+
+	print '-------------------------------------------------'
+	print 'Ingested = '+str(n_done)+' (failed = '+str(n_failed)+')'
+	print 'Time = '+str(round(time.time() - time_start, 2))+' s'
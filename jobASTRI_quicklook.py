@@ -0,0 +1,254 @@
+"""
+ jobASTRI_quicklook.py  -  description
+ ---------------------------------------------------------------------------------
+ Histogram and temporal plots of an ASTRI DL0 file listed in a job file, drawn in one process
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ jobASTRI_quicklook.py filename jobfile outdir --dpi=N --start=row --stop=row --block=rows --tstart=time --tstop=time --calib=file --where="expression" --readahead=N --profile=file --max-memory=MB
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file
+ - jobfile: text file with one plot per line (see Caveats)
+ - outdir: directory of the PNG files, created if missing
+ - (optional) --dpi=N: resolution of the images (default 80)
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --calib=file: pedestal calibration table (calibASTRI_pedestal.py) subtracted from the values
+ - (optional) --where="expression": select the events (rows) with an expression over the columns (ASTRI_expr)
+ - (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)
+ - (optional) --profile=file: print the time and memory of each stage and write them to file (JSON)
+ - (optional) --max-memory=MB: memory budget of the analyses: block size picked from it, large arrays kept on disk, peak memory printed
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ Each line of the job file is a plot, with the parameters of visASTRI_histo.py or
+ visASTRI_temporal.py after the file name, prefixed by histo or temporal (ASTRI_jobs):
+   histo selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel --options
+   temporal selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel --options
+ Empty lines and lines starting with # are skipped. The --options of a line (--start, --stop,
+ --tstart, --tstop, --calib, --where, --rolling, --rms, --offset, --points, --out=name) apply to
+ that plot only, the ones of the command line to all the plots.
+ The file is opened once. The histograms with the same param, bins and reading options are
+ filled by a single pass over the file (ASTRI_cube); each temporal plot reads its channels.
+ The histograms are drawn first, then the temporal plots, each in the order of the job file.
+ The plots are drawn without window (ASTRI_render) to outdir, in the stack view for the
+ temporal plots. The images are named as in ASTRI_jobs, or --out=name.
+ With --max-memory (ASTRI_memory) the rows per block of each pass are picked from the budget, the cubes
+ and the time series that do not fit are kept on disk, and a plot that cannot fit stops the jobs with an
+ estimate of the memory needed, before its pass over the file. The peak memory is printed at the end.
+ ---------------------------------------------------------------------------------
+ Example:
+ python jobASTRI_quicklook.py astri_000_11_111_11111_R_000000_000_0201.lv0 night.jobs night_plots
+ with night.jobs:
+   histo 1 HI 5 100 800 1400 0 50 "t=PDM01 pixel 5"
+   histo 1 HI 6 100 800 1400 0 50 "t=PDM01 pixel 6"
+   temporal 1 T 0 0 1 1 "t=PDM01 temperatures" "y=T [deg]"
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Memory budget (ASTRI_memory), --max-memory option.
+ - 2026/10/18: Channels of the time series counted from the file, also when no row is read.
+
+"""
+
+import numpy as np
+import time
+import sys
+import os
+
+import ASTRI_calib
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_jobs
+import ASTRI_memory
+import ASTRI_profile
+import ASTRI_readahead
+import ASTRI_reader
+import ASTRI_render
+import ASTRI_temporal
+import ASTRI_timeindex
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'jobASTRI_quicklook.py'
+	print '----'
+	print 'Histogram and temporal plots of an ASTRI DL0 file listed in a job file, drawn in one process'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'jobASTRI_quicklook.py filename jobfile outdir --dpi=N --start=row --stop=row --block=rows --tstart=time --tstop=time --calib=file --where="expression" --readahead=N --profile=file --max-memory=MB'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file'
+ 	print '- jobfile: text file with one plot per line:'
+ 	print '    histo selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel --options'
+ 	print '    temporal selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel --options'
+ 	print '- outdir: directory of the PNG files, created if missing'
+ 	print '- (optional) --dpi=N: resolution of the images (default 80)'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --calib=file: pedestal calibration table (calibASTRI_pedestal.py) subtracted from the values'
+ 	print '- (optional) --where="expression": select the events (rows) with an expression over the columns (ASTRI_expr)'
+ 	print '- (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)'
+ 	print '- (optional) --profile=file: print the time and memory of each stage and write them to file (JSON)'
+ 	print '- (optional) --max-memory=MB: memory budget of the analyses: block size picked from it, large arrays kept on disk, peak memory printed'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python jobASTRI_quicklook.py astri_000_11_111_11111_R_000000_000_0201.lv0 night.jobs night_plots'
+ 	print '-------------------------------------------------'
+
+else:
+
+	profiler = ASTRI_profile.from_options(options, 'jobASTRI_quicklook.py')
+	ASTRI_readahead.from_options(options)
+	try:
+		ASTRI_memory.from_options(options)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+
+	filename = arg_list[1]
+	jobfile = arg_list[2]
+	outdir = arg_list[3]
+	dpi = ASTRI_cli.int_option(options, 'dpi', ASTRI_render.DEFAULT_DPI)
+	block_option = ASTRI_cli.int_option(options, 'block', None)
+	try:
+		jobs = ASTRI_jobs.read_jobs(jobfile, options)
+	except ValueError as error:
+		print 'Error! '+jobfile+' '+str(error)
+		sys.exit(1)
+	if (not os.path.isdir(outdir)):
+		os.makedirs(outdir)
+
+	# the file, and the calibration tables and selections shared by the jobs
+	dl0_astri = ASTRI_reader.open_dl0(filename)
+	calib_tables = {}
+	selections = {}
+
+	def job_setup(job):
+		"""(CalibTable, Selection) of the options of job, None if not given"""
+		calib_path = job.options.get('calib')
+		if (calib_path not in calib_tables):
+			calib_tables[calib_path] = ASTRI_calib.from_options(job.options)
+		where = job.options.get('where')
+		if (where not in selections):
+			selections[where] = ASTRI_expr.from_options(job.options, dl0_astri)
+		return calib_tables[calib_path], selections[where]
+
+	def job_failed(job, error):
+		print 'Error! '+jobfile+' line '+str(job.line_number)+': '+str(error)
+		sys.exit(1)
+
+	# the tables and the expressions are checked before drawing
+	try:
+		for job in jobs:
+			job_setup(job)
+	except ValueError as error:
+		job_failed(job, error)
+
+	time_start = time.time()
+	n_images = 0
+	print 'IMAGE  TIME[s]'
+
+	# histograms: one pass over the file for the jobs of the same cube
+	histo_figures = {}
+	for cube_jobs in ASTRI_jobs.cube_groups(jobs):
+		job_start = time.time()
+		job = cube_jobs[0]
+		calib_table, selection = job_setup(job)
+		profiler.begin('analysis')
+		try:
+			if (len(cube_jobs) > 1):
+				block_size = ASTRI_memory.block_size(dl0_astri, ASTRI_histo.pdm_fields(0, job.param, nPDM = ASTRI_nPDM) + ASTRI_expr.selection_columns(selection), block_option)
+				histo_cube = ASTRI_cube.build_cube(dl0_astri, job.param, job.nbins, job.minval, job.maxval, job.start, job.stop, job.maxevt, block_size,
+					nPDM = ASTRI_nPDM, tstart = job.tstart, tstop = job.tstop, calib_table = calib_table, selection = selection)
+				histograms = [histo_cube.histogram(cube_job.selPDM, cube_job.subfield_id) for cube_job in cube_jobs]
+			else:
+				block_size = ASTRI_memory.block_size(dl0_astri, ASTRI_histo.pdm_fields(job.selPDM, job.param, nPDM = ASTRI_nPDM) + ASTRI_expr.selection_columns(selection), block_option)
+				N_counts, bin_array, pixel_stats = ASTRI_histo.histo_dl0(dl0_astri, job.selPDM, job.param, job.subfield_id, job.nbins, job.minval, job.maxval,
+					job.start, job.stop, job.maxevt, block_size, nPDM = ASTRI_nPDM, tstart = job.tstart, tstop = job.tstop, calib_table = calib_table, selection = selection)
+				histograms = [(N_counts, bin_array) + pixel_stats.total().summary()]
+		except ValueError as error:
+			job_failed(job, error)
+		profiler.end('analysis')
+
+		profiler.begin('plot')
+		for job, (N_counts, bin_array, N_entries, mean_out, sd_out) in zip(cube_jobs, histograms):
+			figure_key = (tuple(bin_array), job.binx)
+			if (figure_key not in histo_figures):
+				histo_figures[figure_key] = ASTRI_render.GridFigure(1, 1, bin_array, job.binx, dpi)
+			histo_figures[figure_key].draw([(N_counts, N_entries, mean_out, sd_out, job.title)], xlabel = job.xlabel, ylabel = job.ylabel)
+			histo_figures[figure_key].save(os.path.join(outdir, job.image))
+			n_images += 1
+			print job.image+'  '+str(round((time.time() - job_start)/len(cube_jobs), 3))
+		profiler.end('plot')
+		ASTRI_memory.release_arrays()
+
+	# temporal plots
+	series_figure = None
+	for job in jobs:
+		if (job.kind != 'temporal'):
+			continue
+		job_start = time.time()
+		calib_table, selection = job_setup(job)
+		profiler.begin('analysis')
+		fields = ASTRI_histo.pdm_fields(job.selPDM, job.param, nPDM = ASTRI_nPDM)
+		read_fields = fields + ASTRI_expr.selection_columns(selection)
+		max_events = None
+		nchannels = len(fields)*ASTRI_histo.element_count(dl0_astri, fields[0], job.subfield_id)
+		try:
+			# the curves of the channels, then the series within the memory budget
+			ASTRI_memory.check(nchannels*ASTRI_memory.CURVE_KB*1024, 'Plot curves')
+			block_size = ASTRI_memory.block_size(dl0_astri, read_fields, block_option)
+			if (ASTRI_memory.active() is not None):
+				max_events = ASTRI_timeindex.row_count(dl0_astri, job.tstart, job.tstop, job.start, job.stop, job.maxevt)
+			blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, job.tstart, job.tstop, job.start, job.stop, job.maxevt, block_size)
+			blocks = ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(blocks, calib_table), selection)
+			channel_data, time_column, row_column = ASTRI_temporal.collect_channels(blocks, fields, job.subfield_id, max_events, nchannels)
+			labels = ASTRI_temporal.channel_labels(fields, nchannels//len(fields), job.subfield_id)
+			rolling_window = ASTRI_cli.int_option(job.options, 'rolling', 0)
+			plot_data = channel_data
+			if (rolling_window > 0):
+				mean_data, rms_data = ASTRI_temporal.rolling_stats(channel_data, rolling_window)
+				plot_data = mean_data
+				if ('rms' in job.options):
+					plot_data = rms_data
+		except ValueError as error:
+			job_failed(job, error)
+		profiler.end('analysis')
+
+		profiler.begin('plot')
+		if (series_figure is None):
+			series_figure = ASTRI_render.SeriesFigure(dpi)
+		series_figure.draw(plot_data, time_column, row_column, labels, job.xvalue_temp, job.xvalue_graph, job.title, job.ylabel,
+			npoints = ASTRI_cli.int_option(job.options, 'points', 0), channel_offset = ASTRI_cli.float_option(job.options, 'offset', 0.)*np.arange(nchannels))
+		series_figure.save(os.path.join(outdir, job.image))
+		profiler.end('plot')
+		ASTRI_memory.release_arrays()
+		n_images += 1
+		print job.image+'  '+str(round(time.time() - job_start, 3))
+
+	print '-------------------------------------------------'
+	print str(n_images)+' images written to '+outdir+' in '+str(round(time.time() - time_start, 2))+' s'
+	ASTRI_readahead.report()
+	ASTRI_memory.report()
+	profiler.finish()
@@ -0,0 +1,144 @@
+"""
+ renderASTRI_histo.py  -  description
+ ---------------------------------------------------------------------------------
+ Headless rendering of the histograms of all the ASTRI PDMs to PNG files
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ renderASTRI_histo.py filename param nbins minval maxval maxevt binx outdir --layout=camera|pdm|pixel --pdm=N --workers=N --dpi=N --start=row --stop=row --block=rows --tstart=time --tstop=time --cube=file
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube
+ - param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI
+ - nbins: number of bins for the histogram
+ - minval: minimum value to create the histogram
+ - maxval: maximum value to create the histogram
+ - maxevt: max row (event) to read. If 0 all the events are read.
+ - binx: selected x-axis value index for which the bin content must be annotated.
+ - outdir: directory of the PNG files, created if missing
+ - (optional) --layout=camera|pdm|pixel: one image with a panel per PDM (camera), one image per PDM with a panel
+                per element (pdm, default), or one image per PDM and element (pixel)
+ - (optional) --pdm=N: only the images of the PDM N
+ - (optional) --workers=N: number of worker processes drawing the images. If not given, one per CPU.
+ - (optional) --dpi=N: resolution of the images (default 80)
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --cube=file: save the histogram cube to file (.npz), to be rendered again without reading the FITS file
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The histograms of all the PDMs and elements are filled in a single pass over the file (ASTRI_cube),
+ then drawn without any window (ASTRI_render) by a pool of worker processes, each re-using its figure
+ from an image to the next. Each panel shows Entries, Mean, RMS and the content of the bin binx.
+ The images are outdir/<param>_camera.png, outdir/PDMnn<param>.png or outdir/PDMnn<param>_ee.png.
+ When a histogram cube is rendered its bins are used, param, nbins, minval, maxval, maxevt and the
+ reading --options are not applied.
+ ---------------------------------------------------------------------------------
+ Example:
+ python renderASTRI_histo.py astri_000_11_111_11111_R_000000_000_0201.lv0 HI 100 800 1400 0 50 night_HI --layout=pdm --workers=8
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+
+"""
+
+import multiprocessing
+import time
+import sys
+import os
+
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_reader
+import ASTRI_render
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'renderASTRI_histo.py'
+	print '----'
+	print 'Headless rendering of the histograms of all the ASTRI PDMs to PNG files'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'renderASTRI_histo.py filename param nbins minval maxval maxevt binx outdir --layout=camera|pdm|pixel --pdm=N --workers=N --dpi=N --start=row --stop=row --block=rows --tstart=time --tstop=time --cube=file'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube'
+ 	print '- param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI'
+ 	print '- nbins: number of bins for the histogram'
+ 	print '- minval: minimum value to create the histogram'
+ 	print '- maxval: maximum value to create the histogram'
+ 	print '- maxevt: max row (event) to read. If 0 all the events are read.'
+ 	print '- binx: selected x-axis value index for which the bin content must be annotated.'
+ 	print '- outdir: directory of the PNG files, created if missing'
+ 	print '- (optional) --layout=camera|pdm|pixel: one image with a panel per PDM (camera), one image per PDM with a panel'
+ 	print '               per element (pdm, default), or one image per PDM and element (pixel)'
+ 	print '- (optional) --pdm=N: only the images of the PDM N'
+ 	print '- (optional) --workers=N: number of worker processes drawing the images. If not given, one per CPU.'
+ 	print '- (optional) --dpi=N: resolution of the images (default 80)'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --cube=file: save the histogram cube to file (.npz), to be rendered again without reading the FITS file'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python renderASTRI_histo.py astri_000_11_111_11111_R_000000_000_0201.lv0 HI 100 800 1400 0 50 night_HI --layout=pdm --workers=8'
+ 	print '-------------------------------------------------'
+
+else:
+
+	filename = arg_list[1]
+	param = arg_list[2]
+	nbins = int(arg_list[3])
+	minval = int(arg_list[4])
+	maxval = int(arg_list[5])
+	maxevt = int(arg_list[6])
+	binx = int(arg_list[7])
+	outdir = arg_list[8]
+	layout = options.get('layout', 'pdm')
+	selPDM = ASTRI_cli.int_option(options, 'pdm', 0)
+	n_workers = ASTRI_cli.int_option(options, 'workers', multiprocessing.cpu_count())
+	dpi = ASTRI_cli.int_option(options, 'dpi', ASTRI_render.DEFAULT_DPI)
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+	if (layout not in ASTRI_render.LAYOUTS):
+		print 'Error! Unknown layout '+layout+' (layouts: '+', '.join(ASTRI_render.LAYOUTS)+')'
+		sys.exit(1)
+
+	# all the PDMs and elements in a single pass
+	time_start = time.time()
+	if (ASTRI_cube.is_cube_file(filename)):
+		histo_cube = ASTRI_cube.load_cube(filename)
+	else:
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		histo_cube = ASTRI_cube.build_cube(dl0_astri, param, nbins, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop)
+		if ('cube' in options):
+			histo_cube.save(options['cube'])
+	print 'Histograms filled in '+str(round(time.time() - time_start, 2))+' s'
+
+	if (not os.path.isdir(outdir)):
+		os.makedirs(outdir)
+	jobs = ASTRI_render.layout_jobs(histo_cube, layout, outdir, selPDM)
+
+	time_start = time.time()
+	n_images = 0
+	for image_file in ASTRI_render.render_images(histo_cube, jobs, binx, n_workers, dpi):
+		n_images += 1
+	print str(n_images)+' images written to '+outdir+' in '+str(round(time.time() - time_start, 2))+' s'
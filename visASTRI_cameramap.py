@@ -0,0 +1,235 @@
+"""
+ visASTRI_cameramap.py  -  description
+ ---------------------------------------------------------------------------------
+ Plotting the per-pixel statistics of the ASTRI DL0 data on the camera focal plane
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ visASTRI_cameramap.py filename param minval maxval maxevt t=title --quantity=mean|rms|entries|out --bokeh --start=row --stop=row --block=rows --tstart=time --tstop=time --where="expression" --max-memory=MB
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube by visASTRI_histo.py
+ - param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI
+ - minval: minimum value of the selection window
+ - maxval: maximum value of the selection window
+ - maxevt: max row (event) to read. If 0 all the events are read.
+ - (optional) t=title: title of the plot
+ - (optional) --quantity=mean|rms|entries|out: plot only this quantity. If not given the four maps are plotted.
+ - (optional) --bokeh: plot with the BOKEH framework (ASTRIQL_cameramap.html), with the pixel details on hover
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)
+ - (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, peak memory printed
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The quantities of each pixel are computed in a single pass over the PDMxx<param> fields (ASTRI_cameramap):
+ - mean, rms: mean and RMS of the values inside the window (minval < x < maxval, or x < maxval if minval = 0)
+ - entries: number of values read
+ - out: fraction of the values read outside the window
+ The PDMs are placed on the 7 x 7 grid of the camera without the corners, numbered row by row from
+ the top left. The color scale of a map goes from its 1st to its 99th percentile, so that a few hot or
+ dead pixels do not hide the others: they are drawn with the color of the end of the scale.
+ Pixels without values are grey. With matplotlib the PDM, pixel and value under the cursor are shown
+ in the toolbar.
+ When a histogram cube is plotted its window is used, minval, maxval, maxevt and the --options are not applied.
+ With --where only the rows selected by the expression are used (ASTRI_expr).
+ With --max-memory the rows per block are picked from the budget, or --block is checked against it, and the
+ analysis stops with an estimate of the memory needed if the blocks do not fit (ASTRI_memory). The peak
+ memory is printed before the maps are shown.
+ ---------------------------------------------------------------------------------
+ Example:
+ python visASTRI_cameramap.py astri_000_11_111_11111_R_000000_000_0201.lv0 HI 0 4000 0 "t=Camera HG" --bokeh
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Event selection (ASTRI_expr), --where option.
+ - 2026/10/18: Memory budget (ASTRI_memory), --max-memory option.
+ - 2026/10/18: Error message for an invalid --where expression.
+
+"""
+
+import numpy as np
+import sys
+
+import ASTRI_cameramap
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_reader
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+QUANTITY_LABELS = {'mean': 'Mean', 'rms': 'RMS', 'entries': 'Entries', 'out': 'Out of window fraction'}
+
+title = ''
+
+
+def color_range(values):
+	"""(low, high) of the color scale: 1st and 99th percentiles of the finite values"""
+	finite = values[np.isfinite(values)]
+	if (finite.size == 0):
+		return 0., 1.
+	low, high = np.percentile(finite, [1., 99.])
+	if (high <= low):
+		high = low + 1.
+	return float(low), float(high)
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'visASTRI_cameramap.py'
+	print '----'
+	print 'Plotting the per-pixel statistics of the ASTRI DL0 data on the camera focal plane'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'visASTRI_cameramap.py filename param minval maxval maxevt t=title --quantity=mean|rms|entries|out --bokeh --start=row --stop=row --block=rows --tstart=time --tstop=time --where="expression" --max-memory=MB'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube by visASTRI_histo.py'
+ 	print '- param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI'
+ 	print '- minval: minimum value of the selection window'
+ 	print '- maxval: maximum value of the selection window'
+ 	print '- maxevt: max row (event) to read. If 0 all the events are read.'
+ 	print '- (optional) t=title: title of the plot'
+ 	print '- (optional) --quantity=mean|rms|entries|out: plot only this quantity. If not given the four maps are plotted.'
+ 	print '- (optional) --bokeh: plot with the BOKEH framework (ASTRIQL_cameramap.html), with the pixel details on hover'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)'
+ 	print '- (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, peak memory printed'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python visASTRI_cameramap.py astri_000_11_111_11111_R_000000_000_0201.lv0 HI 0 4000 0 "t=Camera HG" --bokeh'
+ 	print '-------------------------------------------------'
+
+else:
+
+	filename = arg_list[1]
+	param = arg_list[2]
+	minval = int(arg_list[3])
+	maxval = int(arg_list[4])
+	maxevt = int(arg_list[5])
+	if (len(arg_list) > 6):
+		temp_string = arg_list[6]
+		if (temp_string[0]=='t'):
+			title = temp_string[2:]
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', None)
+	if ('quantity' in options):
+		quantities = [options['quantity']]
+	else:
+		quantities = list(ASTRI_cameramap.QUANTITIES)
+	for quantity in quantities:
+		if (quantity not in ASTRI_cameramap.QUANTITIES):
+			print 'Error! Unknown quantity '+quantity+' (quantities: '+', '.join(ASTRI_cameramap.QUANTITIES)+')'
+			sys.exit(1)
+
+	# per-pixel statistics of all the PDMs
+	if (ASTRI_cube.is_cube_file(filename)):
+		pixel_stats = ASTRI_cube.load_cube(filename).stats
+	else:
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		try:
+			selection = ASTRI_expr.from_options(options, dl0_astri)
+			ASTRI_memory.from_options(options)
+			block_size = ASTRI_memory.block_size(dl0_astri, ASTRI_histo.pdm_fields(0, param, nPDM = ASTRI_nPDM) + ASTRI_expr.selection_columns(selection), block_size)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+		pixel_stats = ASTRI_cameramap.camera_stats(dl0_astri, param, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop, selection = selection)
+	nPDM, nelem = pixel_stats.count.shape
+	maps = {}
+	for quantity in ASTRI_cameramap.QUANTITIES:
+		maps[quantity] = ASTRI_cameramap.map_values(pixel_stats, quantity)
+	rows, columns = ASTRI_cameramap.pixel_positions(nPDM, nelem)
+	side = ASTRI_cameramap.pdm_side(nelem)
+	camera_size = ASTRI_cameramap.CAMERA_SIDE*side
+
+	if ('bokeh' in options):
+
+		from bokeh.plotting import figure, output_file, show
+		from bokeh.models import ColumnDataSource, HoverTool, ColorBar
+		from bokeh.layouts import gridplot
+		from bokeh.palettes import Viridis256
+		from bokeh.transform import linear_cmap
+
+		# output to static HTML file
+		output_file("ASTRIQL_cameramap.html", title=title)
+
+		# one square per pixel, y pointing up
+		pixel_source = ColumnDataSource(data=dict(x=columns.ravel() + 0.5, y=camera_size - rows.ravel() - 0.5,
+			pdm=np.repeat(np.arange(1, nPDM+1), nelem), pixel=np.tile(np.arange(1, nelem+1), nPDM), **dict((quantity, maps[quantity].ravel()) for quantity in ASTRI_cameramap.QUANTITIES)))
+		hover_tooltips = [('PDM', '@pdm'), ('pixel', '@pixel'), ('entries', '@entries'), ('mean', '@mean{0.0}'), ('rms', '@rms{0.0}'), ('out', '@out{0.000}')]
+
+		plots = []
+		for quantity in quantities:
+			low, high = color_range(maps[quantity])
+			color_mapper = linear_cmap(quantity, Viridis256, low, high, nan_color='lightgrey')
+			p = figure(title=title+' '+QUANTITY_LABELS[quantity], x_range=(0, camera_size), y_range=(0, camera_size), match_aspect=True,
+				plot_width=500, plot_height=450, tools='pan,wheel_zoom,box_zoom,reset,save')
+			p.rect('x', 'y', width=1, height=1, source=pixel_source, fill_color=color_mapper, line_color=None)
+			p.add_tools(HoverTool(tooltips=hover_tooltips))
+			p.add_layout(ColorBar(color_mapper=color_mapper['transform'], width=8), 'right')
+			p.axis.visible = False
+			p.grid.grid_line_color = None
+			plots.append(p)
+
+		# show the results
+		ASTRI_memory.report()
+		show(gridplot(plots, ncols=min(len(plots), 2)))
+
+	else:
+
+		import matplotlib.pylab as plt
+		from matplotlib.patches import Rectangle
+
+		def pixel_label(x, y):
+			"""Toolbar text of the pixel under the cursor"""
+			row, column = int(y + 0.5), int(x + 0.5)
+			hit = np.nonzero((rows == row) & (columns == column))
+			if (len(hit[0]) == 0):
+				return ''
+			pdm_index, pixel_index = hit[0][0], hit[1][0]
+			return 'PDM '+str(pdm_index+1)+' pixel '+str(pixel_index+1)+': entries = '+str(int(maps['entries'][pdm_index, pixel_index]))+ \
+				', mean = '+str(round(maps['mean'][pdm_index, pixel_index], 1))+', rms = '+str(round(maps['rms'][pdm_index, pixel_index], 1))+ \
+				', out = '+str(round(maps['out'][pdm_index, pixel_index], 3))
+
+		color_map = plt.get_cmap('viridis')
+		color_map.set_bad('lightgrey')
+		fig = plt.figure(1,figsize=[6*min(len(quantities), 2), 5*((len(quantities)+1)//2)])
+		for plot_index, quantity in enumerate(quantities):
+			ax = fig.add_subplot((len(quantities)+1)//2, min(len(quantities), 2), plot_index+1)
+			low, high = color_range(maps[quantity])
+			image = ax.imshow(np.ma.masked_invalid(ASTRI_cameramap.focal_plane_image(maps[quantity])), cmap=color_map, vmin=low, vmax=high, interpolation='nearest')
+			fig.colorbar(image, ax=ax)
+			# PDM borders and numbers
+			for pdm_index, (pdm_row, pdm_column) in enumerate(ASTRI_cameramap.pdm_positions(nPDM)):
+				ax.add_patch(Rectangle((pdm_column*side - 0.5, pdm_row*side - 0.5), side, side, fill=False, edgecolor='black', lw=0.5))
+				ax.text(pdm_column*side - 0.3, pdm_row*side - 0.3, str(pdm_index+1), fontsize=6, color='white', va='top')
+			ax.set_xticks([])
+			ax.set_yticks([])
+			ax.set_title(title+' '+QUANTITY_LABELS[quantity])
+			ax.format_coord = pixel_label
+
+		ASTRI_memory.report()
+		plt.show()
@@ -7,10 +7,10 @@
  email                : fioretti@iasfbo.inaf.it
  ----------------------------------------------
  Usage:
- visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel  
+ visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --cube=file --no-cache --clear-cache --cache-size=MB --follow=seconds --tstart=time --tstop=time --profile=file --calib=file --readahead=N --where="expression" --pyramid=file --max-memory=MB
  ---------------------------------------------------------------------------------
  Parameters:
- - filename: path + file name of the FITS file
+ - filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube, or of a histogram pyramid (.pyr) written with --pyramid
  - selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.
  - param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI
  - subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).
@@ -23,12 +23,57 @@
  - (optional) t=title: title of the plot
  - (optional) x=xlabel: label of the x axis
  - (optional) y=ylabel: label of the y axis
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --cube=file: fill the histograms of all the PDMs and elements in a single pass and save them to file (.npz)
+ - (optional) --no-cache: do not use the result cache
+ - (optional) --clear-cache: empty the result cache before running
+ - (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)
+ - (optional) --follow=seconds: follow a file still being acquired, reading the new rows every seconds (default 2 s)
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)
+ - (optional) --calib=file: subtract the pixel pedestals of the calibration table file (calibASTRI_pedestal.py)
+ - (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)
+ - (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)
+ - (optional) --pyramid=file: fill the histograms of all the PDMs and elements with one bin per ADC count from minval to maxval and save them to file (.pyr)
+ - (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, large arrays kept on disk, peak memory printed
  ---------------------------------------------------------------------------------
  Required data format: FITS file
  ---------------------------------------------------------------------------------
  Caveats:
  Each optional parameter requires the previous one.
  E.g. you can assign only the title, but if you want to assign the xlabel you need to assign the title.
+ The --options can be placed anywhere in the command line.
+ If maxevt > 0 at most maxevt rows are read starting from --start.
+ When a histogram cube is plotted its bins are used, nbins, minval, maxval, maxevt and the --options are not applied.
+ The histogram and the statistics of a FITS file are cached ($ASTRI_CACHE_DIR, default ~/.astri_cache), keyed by
+ the path, size and modification time of the file and by the analysis parameters: plotting again the same selection
+ (e.g. with a different title) does not read the file.
+ With --follow only the rows appended since the last update are read and added to the histogram and
+ the statistics, until the plot is closed or the --stop/maxevt row is reached. The cache is not used.
+ With --tstart/--tstop only the rows inside the TIME_S window are read: the row range is found with a
+ TIME_S index (ASTRI_timeindex) built at the first query and saved next to the file (filename.tidx.npz).
+ With --profile the wall time, CPU time and peak memory of the stages (analysis, read, cache, plot) and the
+ rows, pixels and bytes read are printed and written to a JSON file (ASTRI_profile). The report covers the
+ first plot: it is written before the plot window opens, the follow updates are not included.
+ To write the histograms of all the PDMs to PNG files without opening any window use renderASTRI_histo.py.
+ With --calib the values are calibrated as they are read, (ADC - pedestal)*gain for each pixel (ASTRI_calib),
+ so minval and maxval are in calibrated units. The cache keys include the id of the table.
+ The row blocks are read by a background thread (ASTRI_readahead) --readahead blocks ahead of the analysis,
+ so that the reading of the file overlaps with the computation; the read, I/O wait and compute times are printed.
+ With --where only the rows selected by the expression are used; the columns of the expression are
+ read in the same pass (ASTRI_expr). The cache keys include the expression. A cube or pyramid file
+ holds the histograms of all its rows: --where is an error with it (select the rows with --where when
+ the cube or pyramid is written).
+ With --pyramid the integer values (HI, LO) of all the PDMs and elements are histogrammed with one bin per ADC
+ count from minval to maxval, with the sums per PDM and camera (ASTRI_pyramid). When a histogram pyramid is plotted,
+ nbins, minval and maxval are applied, inside the values of the pyramid, without reading the FITS file; maxevt and
+ the --options are not. The counts and the statistics are the same as the ones of the FITS file.
+ With --max-memory the rows per block are picked from the budget (or --block is checked against it), the cube and
+ the pyramid are kept on disk if they do not fit, and the analysis stops before reading the file, with an estimate
+ of the memory needed, if the blocks do not fit (ASTRI_memory). The peak memory is printed at the end.
  
  ---------------------------------------------------------------------------------
  Example:
@@ -36,16 +81,43 @@
  ---------------------------------------------------------------------------------
  Modification history:
  - 2015/09/10: Creation date.
+ - 2026/10/18: Vectorized selection and histogram (ASTRI_histo).
+ - 2026/10/18: Streaming read by row blocks (ASTRI_reader), --start, --stop and --block options.
+ - 2026/10/18: Histogram cube of the whole camera (ASTRI_cube), --cube option and cube input files.
+ - 2026/10/18: Streaming statistics (ASTRI_stats), no list of the selected values.
+ - 2026/10/18: Persistent result cache (ASTRI_cache), --no-cache, --clear-cache and --cache-size options.
+ - 2026/10/18: Follow mode for growing files (--follow option).
+ - 2026/10/18: TIME_S window (ASTRI_timeindex), --tstart and --tstop options.
+ - 2026/10/18: Columnar store (convASTRI_columnar.py) read when present.
+ - 2026/10/18: Per-stage timing and memory report (ASTRI_profile), --profile option.
+ - 2026/10/18: Pedestal calibration tables (ASTRI_calib), --calib option.
+ - 2026/10/18: Read-ahead of the row blocks (ASTRI_readahead), --readahead option.
+ - 2026/10/18: Event selection (ASTRI_expr), --where option.
+ - 2026/10/18: pyplot imported only when the plot is drawn.
+ - 2026/10/18: Histogram pyramid (ASTRI_pyramid), --pyramid option and pyramid input files.
+ - 2026/10/18: Memory budget (ASTRI_memory), --max-memory option.
+ - 2026/10/18: --where with a histogram cube or pyramid is an error.
+ - 2026/10/18: Error message for an invalid --where expression.
  
 """
 
 import numpy as np
-import matplotlib.pylab as plt
-import pylab
 import sys
 import os
 
-import pyfits
+import ASTRI_cache
+import ASTRI_calib
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_expr
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_profile
+import ASTRI_pyramid
+import ASTRI_readahead
+import ASTRI_reader
+import ASTRI_stats
+import ASTRI_timeindex
 
 # set-up parameters
 ASTRI_nPDM = 37
@@ -58,7 +130,7 @@ xlabel = ''
 ylabel = ''
 
 # Import the input parameters
-arg_list = sys.argv
+arg_list, options = ASTRI_cli.split_options(sys.argv)
 
 if (len(arg_list) == 1):
  	print '-------------------------------------------------'
@@ -68,10 +140,10 @@ if (len(arg_list) == 1):
 	print 'Author: V. Fioretti (INAF/IASF Bologna)'
 	print '----'
 	print 'Usage:'
-	print 'visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel'
+	print 'visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt binx t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --cube=file --no-cache --clear-cache --cache-size=MB --follow=seconds --tstart=time --tstop=time --profile=file --calib=file --readahead=N --where="expression" --pyramid=file --max-memory=MB'
  	print '-------------------------------------------------'
  	print 'Parameters:'
- 	print '- filename: path + file name of the FITS file'
+ 	print '- filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube, or of a histogram pyramid (.pyr) written with --pyramid'
  	print '- selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.'
  	print '- param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI'
  	print '- subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).'
@@ -84,6 +156,22 @@ if (len(arg_list) == 1):
  	print ' - (optional) t=title: title of the plot'
  	print ' - (optional) x=xlabel: label of the x axis'
  	print ' - (optional) y=ylabel: label of the y axis'
+ 	print ' - (optional) --start=row: first row (starting from 0) to read'
+ 	print ' - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print ' - (optional) --block=rows: number of rows read at a time'
+ 	print ' - (optional) --cube=file: fill the histograms of all the PDMs and elements in a single pass and save them to file (.npz)'
+ 	print ' - (optional) --no-cache: do not use the result cache'
+ 	print ' - (optional) --clear-cache: empty the result cache before running'
+ 	print ' - (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)'
+ 	print ' - (optional) --follow=seconds: follow a file still being acquired, reading the new rows every seconds (default 2 s)'
+ 	print ' - (optional) --tstart=time: first TIME_S to read'
+ 	print ' - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print ' - (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)'
+ 	print ' - (optional) --calib=file: subtract the pixel pedestals of the calibration table file (calibASTRI_pedestal.py)'
+ 	print ' - (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)'
+ 	print ' - (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)'
+ 	print ' - (optional) --pyramid=file: fill the histograms of all the PDMs and elements with one bin per ADC count from minval to maxval and save them to file (.pyr)'
+ 	print ' - (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, large arrays kept on disk, peak memory printed'
  	print '-------------------------------------------------'
  	print 'Example:'
  	print 'python visASTRI_histo.py astri_000_11_111_11111_R_000000_000_0201.lv0 1 HI 0 100 800 1400 0 900 "t=PDM 01 HG histo" "x=ADC counts" "y=N"'
@@ -91,6 +179,14 @@ if (len(arg_list) == 1):
 
 else:
 
+	profiler = ASTRI_profile.from_options(options, 'visASTRI_histo.py')
+	ASTRI_readahead.from_options(options)
+	try:
+		memory_budget = ASTRI_memory.from_options(options)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+
 	filename = arg_list[1]
 	selPDM = int(arg_list[2])
 	param = arg_list[3]
@@ -100,6 +196,35 @@ else:
 	maxval = int(arg_list[7])
 	maxevt = int(arg_list[8])
 	binx = int(arg_list[9])
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', None)
+	calib_table = ASTRI_calib.from_options(options)
+	selection = None
+	if ((not ASTRI_cube.is_cube_file(filename)) and (not ASTRI_pyramid.is_pyramid_file(filename))):
+		try:
+			selection = ASTRI_expr.from_options(options, ASTRI_reader.open_dl0(filename))
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+	elif ('where' in options):
+		print 'Error! --where selects the rows of a FITS file, it cannot be used with a histogram cube or pyramid ('+filename+')'
+		sys.exit(1)
+	try:
+		if (memory_budget is not None):
+			# one bar per bin
+			memory_budget.reserve(nbins*ASTRI_memory.BAR_KB*1024, 'plot bars')
+		if ((not ASTRI_cube.is_cube_file(filename)) and (not ASTRI_pyramid.is_pyramid_file(filename))):
+			# rows per block within the memory budget, all the PDMs being read for a cube or a pyramid
+			block_PDM = selPDM
+			if (('cube' in options) or ('pyramid' in options)):
+				block_PDM = 0
+			block_size = ASTRI_memory.block_size(ASTRI_reader.open_dl0(filename), ASTRI_histo.pdm_fields(block_PDM, param, nPDM = ASTRI_nPDM) + ASTRI_expr.selection_columns(selection), block_size)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
 	if (len(arg_list) > 10): 
 		temp_string = arg_list[10]
 		if (temp_string[0]=='t'):
@@ -125,172 +250,138 @@ else:
 		if (temp_string[0]=='y'):
 			ylabel = temp_string[2:]
 
-	# read the file
-	hdulist_astri = pyfits.open(filename)
-	events = hdulist_astri[1].data
-	cols_events = hdulist_astri[1].columns
-	names_events = cols_events.names
-
-
-	tot_data_column = []
-	data_column = []
-	#square_data_column = []
-	
-	# if a PDM has been selected:
-	if (selPDM > 0):
-		if (selPDM < 10):
-			sPDM = 'PDM0'+str(selPDM)+param
-		else:
-			sPDM = 'PDM'+str(selPDM)+param
-		data_column_all = events.field(sPDM)
-		if (maxevt > 0):
-			data_column_all = data_column_all[:maxevt]
-			
-		# if on pixel/one temperature sensor is selected
-		if (subfield_id > 0):
-			for evid in xrange(len(data_column_all)):
-				row_data_column = data_column_all[evid]
-				tot_data_column.append(row_data_column[subfield_id-1])
-				if (minval==0):
-					if (row_data_column[subfield_id-1] < maxval):
-						data_column.append(row_data_column[subfield_id-1])
-						#square_data_column.append((row_data_column[subfield_id-1])**2.)
-				else:
-					if ((row_data_column[subfield_id-1] > minval) & (row_data_column[subfield_id-1] < maxval)):
-						data_column.append(row_data_column[subfield_id-1])
-						#square_data_column.append((row_data_column[subfield_id-1])**2.)
-		# else if all the sub-array is taken
-		else:
-			for evid in xrange(len(data_column_all)):
-				if (data_column_all[evid].size > 1):
-					row_data_column = data_column_all[evid]
-					for jcol in xrange(len(row_data_column)):
-						tot_data_column.append(row_data_column[jcol])
-						if (minval==0):
-							if (row_data_column[jcol] < maxval):
-								data_column.append(row_data_column[jcol])
-								#square_data_column.append((row_data_column[jcol])**2.)
-						else:
-							if ((row_data_column[jcol] > minval) & (row_data_column[jcol] < maxval)):
-								data_column.append(row_data_column[jcol])
-								#square_data_column.append((row_data_column[jcol])**2.)		
-				else:
-					row_data_column = data_column_all[evid]
-					tot_data_column.append(row_data_column)
-					if (minval==0):
-						if (row_data_column < maxval):
-							data_column.append(row_data_column)
-							#square_data_column.append((row_data_column[jcol])**2.)
-					else:
-						if ((row_data_column > minval) & (row_data_column < maxval)):
-							data_column.append(row_data_column)
-							#square_data_column.append((row_data_column[jcol])**2.)								
-	# else if all PDM are taken
+	profiler.begin('analysis')
+	# the input file is a histogram cube: slice it
+	if (ASTRI_cube.is_cube_file(filename)):
+		histo_cube = ASTRI_cube.load_cube(filename)
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+	# single pass over all the PDMs and elements, saved as cube
+	elif ('cube' in options):
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		try:
+			histo_cube = ASTRI_cube.build_cube(dl0_astri, param, nbins, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop, calib_table = calib_table, selection = selection)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+		histo_cube.save(options['cube'])
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+	# the input file is a histogram pyramid: rebin it with nbins, minval and maxval
+	elif (ASTRI_pyramid.is_pyramid_file(filename)):
+		histo_pyramid = ASTRI_pyramid.load_pyramid(filename)
+		try:
+			N_counts, bin_array, N_entries, mean_out, sd_out = histo_pyramid.histogram(selPDM, subfield_id, nbins, minval, maxval)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+	# single pass over all the PDMs and elements at the resolution of one ADC count, saved as pyramid
+	elif ('pyramid' in options):
+		if (calib_table is not None):
+			print 'Error! --pyramid histograms the ADC counts, it cannot be used with --calib'
+			sys.exit(1)
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		vmin, vmax = ASTRI_pyramid.value_range(minval, maxval)
+		try:
+			histo_pyramid = ASTRI_pyramid.build_pyramid(dl0_astri, param, vmin, vmax, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop, selection = selection)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+		histo_pyramid.save(options['pyramid'])
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_pyramid.histogram(selPDM, subfield_id, nbins, minval, maxval)
+	# follow a growing file: the new rows are added at each update
+	elif ('follow' in options):
+		dl0_astri = ASTRI_reader.DL0File(filename)
+		row_follower = ASTRI_reader.RowFollower(dl0_astri, start, stop, maxevt)
+		fields = ASTRI_histo.pdm_fields(selPDM, param, nPDM = ASTRI_nPDM)
+		read_fields = fields + ASTRI_expr.selection_columns(selection)
+		bin_array = ASTRI_histo.bin_edges(nbins, minval, maxval, ASTRI_histo.field_dtype(dl0_astri, fields[0], calib_table))
+		pixel_stats = ASTRI_stats.StatsAccumulator((len(fields), ASTRI_histo.element_count(dl0_astri, fields[0], subfield_id)))
+		N_counts, pixel_stats = ASTRI_histo.accumulate(ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(ASTRI_timeindex.split_time_window(row_follower.new_blocks(read_fields, block_size), tstart, tstop), calib_table), selection), fields, subfield_id, bin_array, minval, maxval, pixel_stats = pixel_stats)
+		N_entries, mean_out, sd_out = pixel_stats.total().summary()
 	else:
+		# look for the result in the cache
+		result_cache = ASTRI_cache.from_options(options)
+		cache_key = ASTRI_cache.result_key(filename, 'histo', selPDM, param, subfield_id, nbins, minval, maxval, maxevt, start, stop, tstart, tstop, ASTRI_calib.table_id(calib_table), ASTRI_expr.selection_key(selection))
+		cached = None
+		if (result_cache is not None):
+			profiler.begin('cache')
+			cached = result_cache.get(cache_key)
+			profiler.end('cache')
 
-		for jid in xrange(ASTRI_nPDM):
-			single_data_column = []
-			tot_single_data_column = []
-			#single_square_data_column = []
-			if ((jid+1) < 10):
-				sPDM = 'PDM0'+str(jid+1)+param
-			else:
-				sPDM = 'PDM'+str(jid+1)+param
-			
-			single_data_column_all = events.field(sPDM)
-			if (maxevt > 0):
-				single_data_column_all = single_data_column_all[:maxevt]
-
-			if (subfield_id > 0):
-				for evid in xrange(len(single_data_column_all)):
-					row_data_column = single_data_column_all[evid]
-					tot_single_data_column.append(row_data_column[subfield_id-1])
-					if (minval==0):
-						if (row_data_column[subfield_id-1] < maxval):
-							single_data_column.append(row_data_column[subfield_id-1])
-							#single_square_data_column.append((row_data_column[subfield_id-1])**2.)
-					else:
-						if ((row_data_column[subfield_id-1] > minval) & (row_data_column[subfield_id-1] < maxval)):
-							single_data_column.append(row_data_column[subfield_id-1])
-							#single_square_data_column.append((row_data_column[subfield_id-1])**2.)
-												
-				for jev in xrange(len(single_data_column)):
-					data_column.append(single_data_column[jev])
-				for jev in xrange(len(tot_single_data_column)):
-					tot_data_column.append(tot_single_data_column[jev])
-							
-			else:
-				for evid in xrange(len(single_data_column_all)):
-					if (single_data_column_all[evid].size > 1):
-						row_data_column = single_data_column_all[evid]
-						for jcol in xrange(len(row_data_column)):
-							tot_single_data_column.append(row_data_column[jcol])
-							if (minval==0):
-								if (row_data_column[jcol] < maxval):
-									single_data_column.append(row_data_column[jcol])
-									#single_square_data_column.append((row_data_column[jcol])**2.)
-							else:
-								if ((row_data_column[jcol] > minval) & (row_data_column[jcol] < maxval)):
-									single_data_column.append(row_data_column[jcol])
-									#single_square_data_column.append((row_data_column[jcol])**2.)
-					else:
-						row_data_column = single_data_column_all[evid]
-						tot_single_data_column.append(row_data_column)
-						if (minval==0):
-							if (row_data_column < maxval):
-								single_data_column.append(row_data_column)
-								#single_square_data_column.append((row_data_column[jcol])**2.)
-						else:
-							if ((row_data_column > minval) & (row_data_column < maxval)):
-								single_data_column.append(row_data_column)
-								#single_square_data_column.append((row_data_column[jcol])**2.)												
-				for jev in xrange(len(single_data_column)):
-					data_column.append(single_data_column[jev])
-				for jev in xrange(len(tot_single_data_column)):	
-					tot_data_column.append(tot_single_data_column[jev])
-
-		data_column = np.array(data_column)
-		tot_data_column = np.array(tot_data_column)
-		#square_data_column = np.array(square_data_column)
-				
-
-
-
+		if (cached is not None):
+			N_counts = cached['N_counts']
+			bin_array = cached['bin_array']
+			pixel_stats = ASTRI_stats.StatsAccumulator.from_arrays(cached)
+		else:
+			# read the file by row blocks and select the values of the PDM (or all the PDMs if selPDM = 0)
+			N_counts, bin_array, pixel_stats = ASTRI_histo.histo_file(filename, selPDM, param, subfield_id, nbins, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop, calib_table = calib_table, selection = selection)
+			if (result_cache is not None):
+				cache_arrays = pixel_stats.to_arrays()
+				cache_arrays['N_counts'] = N_counts
+				cache_arrays['bin_array'] = bin_array
+				profiler.begin('cache')
+				result_cache.put(cache_key, cache_arrays)
+				profiler.end('cache')
 
-	N_counts, bin_array = np.histogram(data_column, bins = nbins, range=(minval, maxval))
-	x_array = np.zeros(len(N_counts))
-	err_x_array = np.zeros(len(N_counts))
+		# analysis results
+		N_entries, mean_out, sd_out = pixel_stats.total().summary()
+	profiler.end('analysis')
 
-	for jn in xrange(len(N_counts)):
-			err_x_array[jn] = (bin_array[jn+1] - bin_array[jn])/2.
-			x_array[jn] = bin_array[jn]
+	profiler.begin('plot')
+	x_array, err_x_array = ASTRI_histo.bin_geometry(bin_array)
 	
 	valx = N_counts[binx-1]
 
 
 
+	# the plotting backend is loaded only when a plot is drawn
+	import matplotlib.pyplot as plt
 	fig = plt.figure(1,figsize=[10,7])
 	ax = fig.add_subplot(111)
 
 
-	ax.bar(x_array, N_counts, width=2.*err_x_array, edgecolor='blue', facecolor='blue', lw = 1)
+	histo_bars = ax.bar(x_array, N_counts, width=2.*err_x_array, edgecolor='blue', facecolor='blue', lw = 1)
 
 
 	# analysis results
-	N_entries = len(tot_data_column)
-	mean_out = np.mean(data_column)
-	#rms_out = np.sqrt((1./N_entries)*np.sum(square_data_column))
-	sd_out = np.std(data_column)
-	
-	plt.text(0.6, 0.8, 'Entries = '+str(N_entries), transform=ax.transAxes, fontsize=12, zorder=100)
-	plt.text(0.6, 0.75, 'Mean = '+str(round(mean_out, 1)), transform=ax.transAxes, fontsize=12, zorder=100)
-	plt.text(0.6, 0.7, 'RMS = '+str(round(sd_out, 1)), transform=ax.transAxes, fontsize=12, zorder=100)
-	plt.text(0.6, 0.65, 'Bin content ['+str(binx)+'] = '+str(valx), transform=ax.transAxes, fontsize=12, zorder=100)
+	text_entries = plt.text(0.6, 0.8, 'Entries = '+str(N_entries), transform=ax.transAxes, fontsize=12, zorder=100)
+	text_mean = plt.text(0.6, 0.75, 'Mean = '+str(round(mean_out, 1)), transform=ax.transAxes, fontsize=12, zorder=100)
+	text_rms = plt.text(0.6, 0.7, 'RMS = '+str(round(sd_out, 1)), transform=ax.transAxes, fontsize=12, zorder=100)
+	text_valx = plt.text(0.6, 0.65, 'Bin content ['+str(binx)+'] = '+str(valx), transform=ax.transAxes, fontsize=12, zorder=100)
 
 	ax.set_xlabel(xlabel)
 	ax.set_ylabel(ylabel)
 	ax.set_title(title)
 	ax.grid()
-	plt.show()
 
+	if (profiler.enabled):
+		# render now, so that the drawing time is part of the plot stage
+		fig.canvas.draw()
+	profiler.end('plot')
+	ASTRI_readahead.report()
+	ASTRI_memory.report()
+	profiler.finish()
+
+	if ('follow' in options):
+		# poll the file for new rows until the plot is closed
+		follow_interval = ASTRI_cli.float_option(options, 'follow', ASTRI_reader.DEFAULT_FOLLOW_INTERVAL)
+		plt.show(block=False)
+		while (plt.fignum_exists(1) and (not row_follower.done())):
+			plt.pause(follow_interval)
+			last_row = row_follower.next_row
+			N_counts, pixel_stats = ASTRI_histo.accumulate(ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(ASTRI_timeindex.split_time_window(row_follower.new_blocks(read_fields, block_size), tstart, tstop), calib_table), selection), fields, subfield_id, bin_array, minval, maxval, N_counts, pixel_stats)
+			if (row_follower.next_row == last_row):
+				continue
+			N_entries, mean_out, sd_out = pixel_stats.total().summary()
+			valx = N_counts[binx-1]
+			for histo_bar, bin_content in zip(histo_bars, N_counts):
+				histo_bar.set_height(bin_content)
+			text_entries.set_text('Entries = '+str(N_entries))
+			text_mean.set_text('Mean = '+str(round(mean_out, 1)))
+			text_rms.set_text('RMS = '+str(round(sd_out, 1)))
+			text_valx.set_text('Bin content ['+str(binx)+'] = '+str(valx))
+			ax.relim()
+			ax.autoscale_view()
+			fig.canvas.draw_idle()
+
+	plt.show()
 
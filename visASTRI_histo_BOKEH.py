@@ -7,10 +7,10 @@
  email                : fioretti@iasfbo.inaf.it
  ----------------------------------------------
  Usage:
- visASTRI_histo_BOKEH.py filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel  
+ visASTRI_histo_BOKEH.py filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --cube=file --no-cache --clear-cache --cache-size=MB --tstart=time --tstop=time --profile=file --pyramid=file
  ---------------------------------------------------------------------------------
  Parameters:
- - filename: path + file name of the FITS file
+ - filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube, or of a histogram pyramid (.pyr) written with --pyramid
  - selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.
  - param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI
  - subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).
@@ -22,12 +22,40 @@
  - (optional) t=title: title of the plot
  - (optional) x=xlabel: label of the x axis
  - (optional) y=ylabel: label of the y axis
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --cube=file: fill the histograms of all the PDMs and elements in a single pass and save them to file (.npz)
+ - (optional) --no-cache: do not use the result cache
+ - (optional) --clear-cache: empty the result cache before running
+ - (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)
+ - (optional) --pyramid=file: fill the histograms of all the PDMs and elements with one bin per ADC count from minval to maxval and save them to file (.pyr)
  ---------------------------------------------------------------------------------
  Required data format: FITS file
  ---------------------------------------------------------------------------------
  Caveats:
  Each optional parameter requires the previous one.
  E.g. you can assign only the title, but if you want to assign the xlabel you need to assign the title.
+ The --options can be placed anywhere in the command line.
+ If maxevt > 0 at most maxevt rows are read starting from --start.
+ When a histogram cube is plotted its bins are used, nbins, minval, maxval, maxevt and the --options are not applied.
+ The histogram and the statistics of a FITS file are cached ($ASTRI_CACHE_DIR, default ~/.astri_cache), keyed by
+ the path, size and modification time of the file and by the analysis parameters: plotting again the same selection
+ (e.g. with a different title) does not read the file.
+ With --tstart/--tstop only the rows inside the TIME_S window are read: the row range is found with a
+ TIME_S index (ASTRI_timeindex) built at the first query and saved next to the file (filename.tidx.npz).
+ The plot is written to the static page ASTRIQL_histo.html, for a live display of a file being
+ acquired use the BOKEH server application visASTRI_histo_SERVER.py.
+ With --profile the wall time, CPU time and peak memory of the stages (analysis, read, cache, plot) and the
+ rows, pixels and bytes read are printed and written to a JSON file (ASTRI_profile). The plot stage includes
+ the import of BOKEH and the writing of the HTML page.
+ With --pyramid, or when a histogram pyramid (.pyr) is plotted (ASTRI_pyramid), the histogram of the selection at
+ the resolution of one ADC count is written in the page: zooming or panning rebins it in the browser, in nbins bins
+ (at least one ADC count wide) over the visible range, without reading the FITS file again. nbins, minval and maxval
+ of the command line are applied to a pyramid file, maxevt and the --options are not.
  
  ---------------------------------------------------------------------------------
  Example:
@@ -35,6 +63,15 @@
  ---------------------------------------------------------------------------------
  Modification history:
  - 2015/09/10: Creation date.
+ - 2026/10/18: Vectorized selection and histogram (ASTRI_histo).
+ - 2026/10/18: Streaming read by row blocks (ASTRI_reader), --start, --stop and --block options.
+ - 2026/10/18: Histogram cube of the whole camera (ASTRI_cube), --cube option and cube input files.
+ - 2026/10/18: Streaming statistics (ASTRI_stats), no list of the selected values.
+ - 2026/10/18: Persistent result cache (ASTRI_cache), --no-cache, --clear-cache and --cache-size options.
+ - 2026/10/18: TIME_S window (ASTRI_timeindex), --tstart and --tstop options.
+ - 2026/10/18: Columnar store (convASTRI_columnar.py) read when present.
+ - 2026/10/18: Per-stage timing and memory report (ASTRI_profile), --profile option.
+ - 2026/10/18: Histogram pyramid (ASTRI_pyramid), --pyramid option, pyramid input files and rebinning on zoom.
  
 """
 
@@ -42,7 +79,14 @@ import numpy as np
 import sys
 import os
 
-import pyfits
+import ASTRI_cache
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_histo
+import ASTRI_profile
+import ASTRI_pyramid
+import ASTRI_reader
+import ASTRI_stats
 
 # set-up parameters
 ASTRI_nPDM = 37
@@ -55,7 +99,7 @@ xlabel = ''
 ylabel = ''
 
 # Import the input parameters
-arg_list = sys.argv
+arg_list, options = ASTRI_cli.split_options(sys.argv)
 
 if (len(arg_list) == 1):
  	print '-------------------------------------------------'
@@ -65,10 +109,10 @@ if (len(arg_list) == 1):
 	print 'Author: V. Fioretti (INAF/IASF Bologna)'
 	print '----'
 	print 'Usage:'
-	print 'visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel'
+	print 'visASTRI_histo.py filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --cube=file --no-cache --clear-cache --cache-size=MB --tstart=time --tstop=time --profile=file --pyramid=file'
  	print '-------------------------------------------------'
  	print 'Parameters:'
- 	print '- filename: path + file name of the FITS file'
+ 	print '- filename: path + file name of the FITS file, or of a histogram cube (.npz) written with --cube, or of a histogram pyramid (.pyr) written with --pyramid'
  	print '- selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.'
  	print '- param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI'
  	print '- subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).'
@@ -80,6 +124,17 @@ if (len(arg_list) == 1):
  	print ' - (optional) t=title: title of the plot'
  	print ' - (optional) x=xlabel: label of the x axis'
  	print ' - (optional) y=ylabel: label of the y axis'
+ 	print ' - (optional) --start=row: first row (starting from 0) to read'
+ 	print ' - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print ' - (optional) --block=rows: number of rows read at a time'
+ 	print ' - (optional) --cube=file: fill the histograms of all the PDMs and elements in a single pass and save them to file (.npz)'
+ 	print ' - (optional) --no-cache: do not use the result cache'
+ 	print ' - (optional) --clear-cache: empty the result cache before running'
+ 	print ' - (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)'
+ 	print ' - (optional) --tstart=time: first TIME_S to read'
+ 	print ' - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print ' - (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)'
+ 	print ' - (optional) --pyramid=file: fill the histograms of all the PDMs and elements with one bin per ADC count from minval to maxval and save them to file (.pyr)'
  	print '-------------------------------------------------'
  	print 'Example:'
  	print 'python visASTRI_histo.py astri_000_11_111_11111_R_000000_000_0201.lv0 1 HI 0 100 800 1400 0 "t=PDM 01 HG histo" "x=ADC counts" "y=N"'
@@ -87,6 +142,8 @@ if (len(arg_list) == 1):
 
 else:
 
+	profiler = ASTRI_profile.from_options(options, 'visASTRI_histo_BOKEH.py')
+
 	filename = arg_list[1]
 	selPDM = int(arg_list[2])
 	param = arg_list[3]
@@ -95,6 +152,11 @@ else:
 	minval = int(arg_list[6])
 	maxval = int(arg_list[7])
 	maxevt = int(arg_list[8])
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
 	if (len(arg_list) > 9): 
 		temp_string = arg_list[9]
 		if (temp_string[0]=='t'):
@@ -120,166 +182,107 @@ else:
 		if (temp_string[0]=='y'):
 			ylabel = temp_string[2:]
 
-	# read the file
-	hdulist_astri = pyfits.open(filename)
-	events = hdulist_astri[1].data
-	cols_events = hdulist_astri[1].columns
-	names_events = cols_events.names
-
-
-	tot_data_column = []
-	data_column = []
-	#square_data_column = []
-	
-	# if a PDM has been selected:
-	if (selPDM > 0):
-		if (selPDM < 10):
-			sPDM = 'PDM0'+str(selPDM)+param
-		else:
-			sPDM = 'PDM'+str(selPDM)+param
-		data_column_all = events.field(sPDM)
-		if (maxevt > 0):
-			data_column_all = data_column_all[:maxevt]
-			
-		# if on pixel/one temperature sensor is selected
-		if (subfield_id > 0):
-			for evid in xrange(len(data_column_all)):
-				row_data_column = data_column_all[evid]
-				tot_data_column.append(row_data_column[subfield_id-1])
-				if (minval==0):
-					if (row_data_column[subfield_id-1] < maxval):
-						data_column.append(row_data_column[subfield_id-1])
-						#square_data_column.append((row_data_column[subfield_id-1])**2.)
-				else:
-					if ((row_data_column[subfield_id-1] > minval) & (row_data_column[subfield_id-1] < maxval)):
-						data_column.append(row_data_column[subfield_id-1])
-						#square_data_column.append((row_data_column[subfield_id-1])**2.)
-		# else if all the sub-array is taken
-		else:
-			for evid in xrange(len(data_column_all)):
-				if (data_column_all[evid].size > 1):
-					row_data_column = data_column_all[evid]
-					for jcol in xrange(len(row_data_column)):
-						tot_data_column.append(row_data_column[jcol])
-						if (minval==0):
-							if (row_data_column[jcol] < maxval):
-								data_column.append(row_data_column[jcol])
-								#square_data_column.append((row_data_column[jcol])**2.)
-						else:
-							if ((row_data_column[jcol] > minval) & (row_data_column[jcol] < maxval)):
-								data_column.append(row_data_column[jcol])
-								#square_data_column.append((row_data_column[jcol])**2.)		
-				else:
-					row_data_column = data_column_all[evid]
-					tot_data_column.append(row_data_column)
-					if (minval==0):
-						if (row_data_column < maxval):
-							data_column.append(row_data_column)
-							#square_data_column.append((row_data_column[jcol])**2.)
-					else:
-						if ((row_data_column > minval) & (row_data_column < maxval)):
-							data_column.append(row_data_column)
-							#square_data_column.append((row_data_column[jcol])**2.)								
-	# else if all PDM are taken
-	else:
-
-		for jid in xrange(ASTRI_nPDM):
-			single_data_column = []
-			tot_single_data_column = []
-			#single_square_data_column = []
-			if ((jid+1) < 10):
-				sPDM = 'PDM0'+str(jid+1)+param
-			else:
-				sPDM = 'PDM'+str(jid+1)+param
-			
-			single_data_column_all = events.field(sPDM)
-			if (maxevt > 0):
-				single_data_column_all = single_data_column_all[:maxevt]
-
-			if (subfield_id > 0):
-				for evid in xrange(len(single_data_column_all)):
-					row_data_column = single_data_column_all[evid]
-					tot_single_data_column.append(row_data_column[subfield_id-1])
-					if (minval==0):
-						if (row_data_column[subfield_id-1] < maxval):
-							single_data_column.append(row_data_column[subfield_id-1])
-							#single_square_data_column.append((row_data_column[subfield_id-1])**2.)
-					else:
-						if ((row_data_column[subfield_id-1] > minval) & (row_data_column[subfield_id-1] < maxval)):
-							single_data_column.append(row_data_column[subfield_id-1])
-							#single_square_data_column.append((row_data_column[subfield_id-1])**2.)
-												
-				for jev in xrange(len(single_data_column)):
-					data_column.append(single_data_column[jev])
-				for jev in xrange(len(tot_single_data_column)):
-					tot_data_column.append(tot_single_data_column[jev])
-							
+	profiler.begin('analysis')
+	histo_pyramid = None
+	# the input file is a histogram cube: slice it
+	if (ASTRI_cube.is_cube_file(filename)):
+		histo_cube = ASTRI_cube.load_cube(filename)
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+	# single pass over all the PDMs and elements, saved as cube
+	elif ('cube' in options):
+		dl0_astri = ASTRI_reader.open_dl0(filename)
+		histo_cube = ASTRI_cube.build_cube(dl0_astri, param, nbins, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop)
+		histo_cube.save(options['cube'])
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(selPDM, subfield_id)
+	# the histogram pyramid of the input file or filled in a single pass: rebin it with nbins, minval and maxval
+	elif (ASTRI_pyramid.is_pyramid_file(filename) or ('pyramid' in options)):
+		try:
+			if (ASTRI_pyramid.is_pyramid_file(filename)):
+				histo_pyramid = ASTRI_pyramid.load_pyramid(filename)
 			else:
-				for evid in xrange(len(single_data_column_all)):
-					if (single_data_column_all[evid].size > 1):
-						row_data_column = single_data_column_all[evid]
-						for jcol in xrange(len(row_data_column)):
-							tot_single_data_column.append(row_data_column[jcol])
-							if (minval==0):
-								if (row_data_column[jcol] < maxval):
-									single_data_column.append(row_data_column[jcol])
-									#single_square_data_column.append((row_data_column[jcol])**2.)
-							else:
-								if ((row_data_column[jcol] > minval) & (row_data_column[jcol] < maxval)):
-									single_data_column.append(row_data_column[jcol])
-									#single_square_data_column.append((row_data_column[jcol])**2.)
-					else:
-						row_data_column = single_data_column_all[evid]
-						tot_single_data_column.append(row_data_column)
-						if (minval==0):
-							if (row_data_column < maxval):
-								single_data_column.append(row_data_column)
-								#single_square_data_column.append((row_data_column[jcol])**2.)
-						else:
-							if ((row_data_column > minval) & (row_data_column < maxval)):
-								single_data_column.append(row_data_column)
-								#single_square_data_column.append((row_data_column[jcol])**2.)												
-				for jev in xrange(len(single_data_column)):
-					data_column.append(single_data_column[jev])
-				for jev in xrange(len(tot_single_data_column)):	
-					tot_data_column.append(tot_single_data_column[jev])
-
-		data_column = np.array(data_column)
-		tot_data_column = np.array(tot_data_column)
-		#square_data_column = np.array(square_data_column)
-				
-
-
-
-
-	N_counts, bin_array = np.histogram(data_column, bins = nbins, range=(minval, maxval))
-	x_array = np.zeros(len(N_counts))
-	err_x_array = np.zeros(len(N_counts))
+				vmin, vmax = ASTRI_pyramid.value_range(minval, maxval)
+				histo_pyramid = ASTRI_pyramid.build_pyramid(ASTRI_reader.open_dl0(filename), param, vmin, vmax, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop)
+				histo_pyramid.save(options['pyramid'])
+			N_counts, bin_array, N_entries, mean_out, sd_out = histo_pyramid.histogram(selPDM, subfield_id, nbins, minval, maxval)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+	else:
+		# look for the result in the cache
+		result_cache = ASTRI_cache.from_options(options)
+		cache_key = ASTRI_cache.result_key(filename, 'histo', selPDM, param, subfield_id, nbins, minval, maxval, maxevt, start, stop, tstart, tstop)
+		cached = None
+		if (result_cache is not None):
+			profiler.begin('cache')
+			cached = result_cache.get(cache_key)
+			profiler.end('cache')
 
-	for jn in xrange(len(N_counts)):
-			err_x_array[jn] = (bin_array[jn+1] - bin_array[jn])/2.
-			x_array[jn] = bin_array[jn] 
+		if (cached is not None):
+			N_counts = cached['N_counts']
+			bin_array = cached['bin_array']
+			pixel_stats = ASTRI_stats.StatsAccumulator.from_arrays(cached)
+		else:
+			# read the file by row blocks and select the values of the PDM (or all the PDMs if selPDM = 0)
+			N_counts, bin_array, pixel_stats = ASTRI_histo.histo_file(filename, selPDM, param, subfield_id, nbins, minval, maxval, start, stop, maxevt, block_size, nPDM = ASTRI_nPDM, tstart = tstart, tstop = tstop)
+			if (result_cache is not None):
+				cache_arrays = pixel_stats.to_arrays()
+				cache_arrays['N_counts'] = N_counts
+				cache_arrays['bin_array'] = bin_array
+				profiler.begin('cache')
+				result_cache.put(cache_key, cache_arrays)
+				profiler.end('cache')
 
+		# analysis results
+		N_entries, mean_out, sd_out = pixel_stats.total().summary()
+	profiler.end('analysis')
 
+	profiler.begin('plot')
+	x_array, err_x_array = ASTRI_histo.bin_geometry(bin_array)
 
-	# analysis results
-	N_entries = len(tot_data_column)
-	mean_out = np.mean(data_column)
-	#rms_out = np.sqrt((1./N_entries)*np.sum(square_data_column))
-	sd_out = np.std(data_column)
 
 
 	from bokeh.plotting import figure, output_file, show
+	from bokeh.models import ColumnDataSource, CustomJS
 
 	# output to static HTML file
 	output_file("ASTRIQL_histo.html", title=title)
 
 	# create a new plot with a title and axis labels
-	p = figure(title=title, x_axis_label=xlabel, y_axis_label=ylabel)
+	histo_source = ColumnDataSource(data=dict(x=x_array, y=N_counts))
+	if (histo_pyramid is None):
+		p = figure(title=title, x_axis_label=xlabel, y_axis_label=ylabel)
+	else:
+		# fixed x range, changed only by the zoom and pan tools
+		p = figure(title=title, x_axis_label=xlabel, y_axis_label=ylabel, x_range=(bin_array[0], bin_array[-1]))
 
 	# add a line renderer with legend and line thickness
-	p.line(x_array, N_counts, legend='Entries = '+str(N_entries), line_width=2)
-	p.square(x_array, N_counts, legend='Mean = '+str(round(mean_out, 1))+', RMS = '+str(round(sd_out, 1)), fill_color=None, line_color='black')
+	p.line('x', 'y', source=histo_source, legend='Entries = '+str(N_entries), line_width=2)
+	p.square('x', 'y', source=histo_source, legend='Mean = '+str(round(mean_out, 1))+', RMS = '+str(round(sd_out, 1)), fill_color=None, line_color='black')
+
+	if (histo_pyramid is not None):
+		# rebin the counts of each ADC value of the selection over the visible range
+		base_counts = histo_pyramid.selection_counts(selPDM, subfield_id)[0]
+		rebin_zoom = CustomJS(args=dict(source=histo_source, x_range=p.x_range, counts=base_counts.tolist(), vmin=histo_pyramid.vmin, vmax=histo_pyramid.vmax, nbins=nbins), code="""
+			var first = Math.max(Math.ceil(x_range.start), vmin);
+			var last = Math.min(Math.floor(x_range.end), vmax);
+			if (last < first) {
+				return;
+			}
+			var width = Math.max(1, Math.ceil((last - first + 1)/nbins));
+			var x = [];
+			var y = [];
+			for (var edge = first; edge <= last; edge += width) {
+				var total = 0;
+				for (var value = edge; (value < edge + width) && (value <= vmax); value++) {
+					total += counts[value - vmin];
+				}
+				x.push(edge + width/2.);
+				y.push(total);
+			}
+			source.data = {x: x, y: y};
+		""")
+		p.x_range.js_on_change('start', rebin_zoom)
+		p.x_range.js_on_change('end', rebin_zoom)
 	#p = Histogram(ADC_array, N_counts, bins=50, filename="histograms.html", legend=True)
 
 	p.grid.grid_line_alpha=0
@@ -293,3 +296,5 @@ else:
 	#	plt.text(0.6, 0.7, 'RMS = '+str(round(sd_out, 1)), transform=ax.transAxes, fontsize=12, zorder=100)
 	# show the results
 	show(p)
+	profiler.end('plot')
+	profiler.finish()
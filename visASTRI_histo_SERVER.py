@@ -0,0 +1,295 @@
+"""
+ visASTRI_histo_SERVER.py  -  description
+ ---------------------------------------------------------------------------------
+ Live histograms for the ASTRI DL0 data as a BOKEH server application
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ bokeh serve --show visASTRI_histo_SERVER.py --args filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --refresh=seconds
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - filename: path + file name of the FITS file
+ - selPDM: the ID of the PDM shown at start-up. If selPDM = 0 all the PDMs are shown.
+ - param: name of the parameter shown at start-up, using the same convention of the FITS fields. E.g. HI
+ - subfield_id: element (starting from 1) of the sub-array shown at start-up (e.g. 1 to select the pixel 1 for HI of PDM).
+ 				 If subfield_id = 0 all the sub-array is shown
+ - nbins: number of bins for the histogram
+ - minval: minimum value to create the histogram
+ - maxval: maximum value to create the histogram
+ - maxevt: max row (event) to read. If 0 all the events are read.
+ - (optional) t=title: title of the plot
+ - (optional) x=xlabel: label of the x axis
+ - (optional) y=ylabel: label of the y axis
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --refresh=seconds: time between two reads of the new rows of the file (default 2 s)
+ ---------------------------------------------------------------------------------
+ Required data format: FITS file
+ ---------------------------------------------------------------------------------
+ Caveats:
+ The PDM, the parameter, the pixel and the binning are selected with the widgets of the page.
+ For each parameter a histogram cube of the whole camera (ASTRI_cube) is filled with the rows
+ appended to the file since the last refresh (ASTRI_reader.RowFollower), so a selection is a
+ slice of the cube and the file is never read twice, except when the binning is changed.
+ Only the bins whose content changed are sent to the browser (ColumnDataSource.patch), the
+ whole histogram is sent only when the parameter or the binning change.
+ The integer parameters (HI, LO) are filled in a histogram pyramid (ASTRI_pyramid) with one bin per
+ ADC count from minval to maxval: a new binning inside this range, a zoom or a pan are rebinned from
+ the pyramid without reading the file again. The zoomed histogram has nbins bins, of at least one ADC
+ count, over the visible range. A binning outside the range fills the pyramid again from the first row.
+ The cubes are kept per browser session.
+ ---------------------------------------------------------------------------------
+ Example:
+ bokeh serve --show visASTRI_histo_SERVER.py --args astri_000_11_111_11111_R_000000_000_0201.lv0 0 HI 0 100 800 1400 0 "t=Camera HG histo" "x=ADC counts" "y=N" --refresh=1
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Histogram pyramid of the integer parameters (ASTRI_pyramid), rebinning on zoom.
+ - 2026/10/18: A new parameter no longer applies its binning widget by widget.
+
+"""
+
+import numpy as np
+import sys
+
+import ASTRI_cli
+import ASTRI_cube
+import ASTRI_histo
+import ASTRI_pyramid
+import ASTRI_reader
+
+# set-up parameters
+ASTRI_nPDM = 37
+
+title = ''
+xlabel = ''
+ylabel = ''
+
+
+def live_cube(param):
+	"""Return (histo_cube, row_follower) of the parameter param, created at its first selection.
+	histo_cube is a HistoPyramid over the binning range for the integer parameters."""
+	if (param not in live_cubes):
+		pnbins, pminval, pmaxval = binning.get(param, (nbins, minval, maxval))
+		binning[param] = (pnbins, pminval, pmaxval)
+		if (dl0_astri.field_dtype(ASTRI_histo.pdm_field(1, param)).kind in 'iu'):
+			vmin, vmax = ASTRI_pyramid.value_range(pminval, pmaxval)
+			histo_cube = ASTRI_pyramid.new_pyramid(dl0_astri, param, vmin, vmax, nPDM = ASTRI_nPDM)
+		else:
+			histo_cube = ASTRI_cube.new_cube(dl0_astri, param, pnbins, pminval, pmaxval, nPDM = ASTRI_nPDM)
+		live_cubes[param] = (histo_cube, ASTRI_reader.RowFollower(dl0_astri, start, stop, maxevt))
+	return live_cubes[param]
+
+
+def is_pyramid(histo_cube):
+	return isinstance(histo_cube, ASTRI_pyramid.HistoPyramid)
+
+
+def show_range(param):
+	"""Set the x range of the plot to the binning of param, without rebinning"""
+	pnbins, pminval, pmaxval = binning[param]
+	zoom.pop(param, None)
+	setting_range[0] = True
+	p.x_range.start = pminval
+	p.x_range.end = pmaxval
+	setting_range[0] = False
+
+
+def read_new_rows(param):
+	"""Add the rows appended to the file to the cube of param"""
+	histo_cube, row_follower = live_cube(param)
+	if (not row_follower.done()):
+		histo_cube.fill_blocks(row_follower.new_blocks(histo_cube.fields, block_size))
+
+
+def show_selection(new_bins = False):
+	"""Send the histogram of the selected PDM and pixel to the browser.
+	Only the changed bins are patched, unless new_bins is True."""
+	param = select_param.value
+	histo_cube, row_follower = live_cube(param)
+	if (is_pyramid(histo_cube)):
+		pnbins, pminval, pmaxval = zoom.get(param, binning[param])
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(int(select_pdm.value), int(select_pixel.value), pnbins, pminval, pmaxval)
+	else:
+		N_counts, bin_array, N_entries, mean_out, sd_out = histo_cube.histogram(int(select_pdm.value), int(select_pixel.value))
+	shown_counts = np.asarray(histo_source.data['top'])
+	if (new_bins or (len(shown_counts) != len(N_counts))):
+		histo_source.data = dict(left=bin_array[:-1], right=bin_array[1:], top=N_counts.copy())
+	else:
+		changed = np.flatnonzero(N_counts != shown_counts)
+		if (len(changed) > 0):
+			histo_source.patch({'top': [(int(ibin), int(N_counts[ibin])) for ibin in changed]})
+	text_stats.text = 'Entries = '+str(N_entries)+', Mean = '+str(round(mean_out, 1))+', RMS = '+str(round(sd_out, 1))+', Rows = '+str(row_follower.next_row)
+
+
+def on_refresh():
+	read_new_rows(select_param.value)
+	show_selection()
+
+
+def on_selection(attr, old, new):
+	show_selection()
+
+
+def on_param(attr, old, new):
+	histo_cube, row_follower = live_cube(new)
+	pixel_options = [('0', 'All')] + [(str(pixel_id), str(pixel_id)) for pixel_id in range(1, dl0_astri.element_count(ASTRI_histo.pdm_field(1, new))+1)]
+	if (int(select_pixel.value) >= len(pixel_options)):
+		select_pixel.value = '0'
+	select_pixel.options = pixel_options
+	pnbins, pminval, pmaxval = binning[new]
+	# the binning of the new parameter is shown, not applied field by field
+	setting_binning[0] = True
+	input_nbins.value = str(pnbins)
+	input_minval.value = str(pminval)
+	input_maxval.value = str(pmaxval)
+	setting_binning[0] = False
+	read_new_rows(new)
+	show_range(new)
+	show_selection(new_bins = True)
+
+
+def on_binning(attr, old, new):
+	if (setting_binning[0]):
+		return
+	param = select_param.value
+	try:
+		new_binning = (int(input_nbins.value), int(input_minval.value), int(input_maxval.value))
+	except ValueError:
+		return
+	if ((new_binning == binning[param]) or (new_binning[0] <= 0) or (new_binning[2] <= new_binning[1])):
+		return
+	binning[param] = new_binning
+	histo_cube, row_follower = live_cube(param)
+	if ((not is_pyramid(histo_cube)) or (not histo_cube.covers(new_binning[1], new_binning[2]))):
+		# the cube of param is filled again from the first row with the new bins
+		del live_cubes[param]
+		read_new_rows(param)
+	show_range(param)
+	show_selection(new_bins = True)
+
+
+def on_zoom(attr, old, new):
+	"""Rebin the pyramid over the visible x range, in nbins bins of at least one ADC count"""
+	param = select_param.value
+	histo_cube, row_follower = live_cube(param)
+	if (setting_range[0] or (not is_pyramid(histo_cube))):
+		return
+	first = max(int(np.ceil(p.x_range.start)), histo_cube.vmin)
+	last = min(int(np.floor(p.x_range.end)), histo_cube.vmax)
+	if (last <= first):
+		return
+	pnbins = binning[param][0]
+	width = max(1, int(np.ceil((last - first)/float(pnbins))))
+	zoom_nbins = max(1, (last - first)//width)
+	zoom[param] = (zoom_nbins, first, first + zoom_nbins*width)
+	show_selection(new_bins = True)
+
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'visASTRI_histo_SERVER.py'
+	print '----'
+	print 'Live histograms for the ASTRI DL0 data as a BOKEH server application'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'bokeh serve --show visASTRI_histo_SERVER.py --args filename selPDM param subfield_id nbins minval maxval maxevt t=title x=xlabel y=ylabel --start=row --stop=row --block=rows --refresh=seconds'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- filename: path + file name of the FITS file'
+ 	print '- selPDM: the ID of the PDM shown at start-up. If selPDM = 0 all the PDMs are shown.'
+ 	print '- param: name of the parameter shown at start-up, using the same convention of the FITS fields. E.g. HI'
+ 	print '- subfield_id: element (starting from 1) of the sub-array shown at start-up (e.g. 1 to select the pixel 1 for HI of PDM).'
+ 	print '			      If subfield_id = 0 all the sub-array is shown.'
+ 	print '- nbins: number of bins for the histogram'
+ 	print ' - minval: minimum value to create the histogram'
+ 	print ' - maxval: maximum value to create the histogram'
+ 	print ' - maxevt: max row (event) to read. If 0 all the events are read.'
+ 	print ' - (optional) t=title: title of the plot'
+ 	print ' - (optional) x=xlabel: label of the x axis'
+ 	print ' - (optional) y=ylabel: label of the y axis'
+ 	print ' - (optional) --start=row: first row (starting from 0) to read'
+ 	print ' - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print ' - (optional) --block=rows: number of rows read at a time'
+ 	print ' - (optional) --refresh=seconds: time between two reads of the new rows of the file (default 2 s)'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'bokeh serve --show visASTRI_histo_SERVER.py --args astri_000_11_111_11111_R_000000_000_0201.lv0 0 HI 0 100 800 1400 0 "t=Camera HG histo" "x=ADC counts" "y=N" --refresh=1'
+ 	print '-------------------------------------------------'
+
+else:
+
+	filename = arg_list[1]
+	selPDM = int(arg_list[2])
+	param = arg_list[3]
+	subfield_id = int(arg_list[4])
+	nbins = int(arg_list[5])
+	minval = int(arg_list[6])
+	maxval = int(arg_list[7])
+	maxevt = int(arg_list[8])
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	block_size = ASTRI_cli.int_option(options, 'block', ASTRI_reader.DEFAULT_BLOCK_SIZE)
+	refresh_interval = ASTRI_cli.float_option(options, 'refresh', ASTRI_reader.DEFAULT_FOLLOW_INTERVAL)
+	for temp_string in arg_list[9:12]:
+		if (temp_string[0]=='t'):
+			title = temp_string[2:]
+		if (temp_string[0]=='x'):
+			xlabel = temp_string[2:]
+		if (temp_string[0]=='y'):
+			ylabel = temp_string[2:]
+
+	from bokeh.io import curdoc
+	from bokeh.layouts import column, row
+	from bokeh.models import ColumnDataSource, Div, Select, TextInput
+	from bokeh.plotting import figure
+
+	dl0_astri = ASTRI_reader.DL0File(filename)
+	# parameters of the file, from the fields of the first PDM (e.g. HI, LO, T, DT)
+	first_field = ASTRI_histo.pdm_field(1, '')
+	params = [name[len(first_field):] for name in dl0_astri.names if name.startswith(first_field)]
+
+	live_cubes = {}
+	binning = {param: (nbins, minval, maxval)}
+	# binning of the zoomed x range of each parameter, and True while the range (the binning widgets) is set by the application
+	zoom = {}
+	setting_range = [False]
+	setting_binning = [False]
+
+	# widgets
+	select_pdm = Select(title='PDM', value=str(selPDM), options=[('0', 'All')]+[(str(pdm_id), 'PDM'+str(pdm_id).zfill(2)) for pdm_id in range(1, ASTRI_nPDM+1)])
+	select_param = Select(title='Parameter', value=param, options=params)
+	select_pixel = Select(title='Pixel', value=str(subfield_id), options=[str(subfield_id)])
+	input_nbins = TextInput(title='Bins', value=str(nbins))
+	input_minval = TextInput(title='Min', value=str(minval))
+	input_maxval = TextInput(title='Max', value=str(maxval))
+	text_stats = Div(text='')
+
+	# histogram
+	histo_source = ColumnDataSource(data=dict(left=[], right=[], top=[]))
+	p = figure(title=title, x_axis_label=xlabel, y_axis_label=ylabel, sizing_mode='stretch_width', plot_height=500, x_range=(minval, maxval))
+	p.quad(left='left', right='right', top='top', bottom=0, source=histo_source, fill_color='blue', line_color='blue')
+	p.grid.grid_line_alpha=0
+	p.ygrid.band_fill_color="olive"
+	p.ygrid.band_fill_alpha = 0.1
+
+	on_param('value', None, param)
+
+	select_pdm.on_change('value', on_selection)
+	select_pixel.on_change('value', on_selection)
+	select_param.on_change('value', on_param)
+	for binning_input in (input_nbins, input_minval, input_maxval):
+		binning_input.on_change('value', on_binning)
+	p.x_range.on_change('start', on_zoom)
+	p.x_range.on_change('end', on_zoom)
+
+	curdoc().add_root(column(row(select_pdm, select_param, select_pixel, input_nbins, input_minval, input_maxval), text_stats, p, sizing_mode='stretch_width'))
+	curdoc().add_periodic_callback(on_refresh, int(refresh_interval*1000))
+	curdoc().title = 'ASTRI QL histo'
@@ -7,41 +7,128 @@
  email                : fioretti@iasfbo.inaf.it
  ----------------------------------------------
  Usage:
- visASTRI_temporal.py filename selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel
+ visASTRI_temporal.py filename selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel --start=row --stop=row --block=rows --no-cache --clear-cache --cache-size=MB --follow=seconds --tstart=time --tstop=time --points=N --rolling=rows --rms --view=stack|heatmap --offset=value --profile=file --calib=file --readahead=N --where="expression" --max-memory=MB
  ---------------------------------------------------------------------------------
  Parameters:
  - filename: path + file name of the FITS file
- - selPDM: the ID of the PDM to be plotted (> 0).
+ - selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.
  - param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI
  - subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).
+ 				 If subfield_id = 0 all the sub-array is plotted (e.g. the 16 temperature sensors), one channel per element
  - maxevt: max row (event) to read and plot. If 0 all the events are read.
  - xvalue_temp: selected x-axis value (element of the array) for which the y-value content must be plotted.
  - xvalue_graph: selected x-axis value (element of the array) for which the y-value content must be plotted.
  - (optional) t=title: title of the plot
  - (optional) y=ylabel: label of the y axis
+ - (optional) --start=row: first row (starting from 0) to read
+ - (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.
+ - (optional) --block=rows: number of rows read at a time
+ - (optional) --no-cache: do not use the result cache
+ - (optional) --clear-cache: empty the result cache before running
+ - (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)
+ - (optional) --follow=seconds: follow a file still being acquired, reading the new rows every seconds (default 2 s)
+ - (optional) --tstart=time: first TIME_S to read
+ - (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)
+ - (optional) --points=N: maximum number of points plotted for each curve. If not given, twice the width of the plot in pixels.
+ - (optional) --rolling=rows: plot the rolling mean of each channel over the last rows
+ - (optional) --rms: with --rolling, plot the rolling RMS instead of the rolling mean
+ - (optional) --view=stack|heatmap: one curve per channel (stack, default) or a [channels, events] image (heatmap)
+ - (optional) --offset=value: with --view=stack, vertical shift between two consecutive channels
+ - (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)
+ - (optional) --calib=file: subtract the pixel pedestals of the calibration table file (calibASTRI_pedestal.py)
+ - (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)
+ - (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)
+ - (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, long series kept on disk, peak memory printed
 ---------------------------------------------------------------------------------
  Required data format: FITS file
  ---------------------------------------------------------------------------------
  Caveats:
  Each optional parameter requires the previous one.
  E.g. you can assign only the title, but if you want to assign the xlabel you need to assign the title.
+ The --options can be placed anywhere in the command line.
+ If maxevt > 0 at most maxevt rows are read starting from --start. The ROW COUNTER is the row of the file (starting from 1).
+ The decimated plots of a FITS file are cached ($ASTRI_CACHE_DIR, default ~/.astri_cache): the points of the
+ curves (or the averaged heatmap) of all the rows and the annotated values, keyed by the path, size and
+ modification time of the file, by the analysis parameters, --points, --rolling, --rms, --view and the
+ annotated rows. Plotting again the same selection (e.g. with a different title) does not read the file;
+ the size of the entry depends on the channels and --points, not on the rows (some tens of MB for all the HI
+ pixels of the camera). The rows are read when a cached plot is zoomed, to decimate the window again.
+ With --follow only the rows appended since the last update are read, until the plot is closed
+ or the --stop/maxevt row is reached. The cache is not used.
+ With --tstart/--tstop only the rows inside the TIME_S window are read: the row range is found with a
+ TIME_S index (ASTRI_timeindex) built at the first query and saved next to the file (filename.tidx.npz).
+ Long series are decimated (ASTRI_decimate): for each group of consecutive rows only the rows of the
+ minimum and of the maximum are plotted, so the curves keep their extremes with at most --points points.
+ When the x axis is zoomed the rows inside the new window are decimated again, at full resolution
+ if they are fewer than --points. The xvalue_temp and xvalue_graph points are always plotted.
+ All the selected channels (elements of one or all the PDMs) are read in a single pass as a
+ [channels, events] array. The xvalue_temp and xvalue_graph values are annotated for a single channel.
+ With --rolling the plotted and annotated values are the rolling mean (or RMS with --rms) over the last
+ rows, fewer at the beginning of the series. The heatmap averages groups of consecutive events to the
+ pixel budget and assumes increasing TIME_S for its time axis; its colour scale is the range of the values
+ shown (zoomed window).
+ With --profile the wall time, CPU time and peak memory of the stages (analysis, read, cache, decimate, plot)
+ and the rows, pixels and bytes read are printed and written to a JSON file (ASTRI_profile). The report covers
+ the first plot: it is written before the plot window opens, the follow updates are not included.
+ With --calib the HI/LO values are calibrated as they are read, (ADC - pedestal)*gain for each pixel (ASTRI_calib).
+ The cache keys include the id of the table.
+ The row blocks are read by a background thread (ASTRI_readahead) --readahead blocks ahead of the analysis,
+ so that the reading of the file overlaps with the computation; the read, I/O wait and compute times are printed.
+ With --where only the rows selected by the expression are used; the columns of the expression are
+ read in the same pass (ASTRI_expr). The cache keys include the expression.
+ With --max-memory the rows per block are picked from the budget (or --block is checked against it) and the
+ [channels, events] series and their rolling statistics are allocated once for the rows of the range, on disk
+ if they do not fit (ASTRI_memory). The analysis stops with an estimate of the
+ memory needed if the blocks or the rolling statistics of one channel do not fit. The peak memory is printed
+ at the end. With --follow the new rows are still appended in memory.
+ With --follow the series grow in place (ASTRI_temporal.SeriesBuffer): an update copies only the new rows
+ (and the rolling window before them), not the whole series.
  
  ---------------------------------------------------------------------------------
  Example:
  python visASTRI_temporal.py astri_000_13_002_00001_F_000009_000_0202.lv0 1 T 1 100 50 50 "t=PDM1 Temperature" "y=T"
+ python visASTRI_temporal.py astri_000_13_002_00001_F_000009_000_0202.lv0 1 T 0 0 1 1 "t=PDM1 Temperatures" "y=T" --rolling=100
  ---------------------------------------------------------------------------------
  Modification history:
  - 2015/09/10: Creation date.
+ - 2026/10/18: Streaming read by row blocks (ASTRI_reader), --start, --stop and --block options.
+ - 2026/10/18: Persistent result cache (ASTRI_cache), --no-cache, --clear-cache and --cache-size options.
+ - 2026/10/18: Follow mode for growing files (--follow option).
+ - 2026/10/18: Min/max decimation of the curves (ASTRI_decimate), re-computed on zoom, --points option.
+ - 2026/10/18: Multi-channel series (selPDM = 0, subfield_id = 0), rolling statistics, stack and heatmap views.
+ - 2026/10/18: TIME_S window (ASTRI_timeindex), --tstart and --tstop options.
+ - 2026/10/18: Columnar store (convASTRI_columnar.py) read when present.
+ - 2026/10/18: Per-stage timing and memory report (ASTRI_profile), --profile option.
+ - 2026/10/18: Pedestal calibration tables (ASTRI_calib), --calib option.
+ - 2026/10/18: Read-ahead of the row blocks (ASTRI_readahead), --readahead option.
+ - 2026/10/18: Event selection (ASTRI_expr), --where option.
+ - 2026/10/18: pyplot imported only when the plot is drawn.
+ - 2026/10/18: Memory budget (ASTRI_memory), --max-memory option.
+ - 2026/10/18: Series larger than a quarter of the cache not cached (ASTRI_cache).
+ - 2026/10/18: Decimated plot cached instead of the series, rows read again only to zoom.
+ - 2026/10/18: Follow mode series grown in place (ASTRI_temporal.SeriesBuffer).
+ - 2026/10/18: Heatmap colour scale set from the values shown.
+ - 2026/10/18: Error message for an invalid --where expression.
+ - 2026/10/18: Channels counted from the file, also when no row is read.
  
 """
 
 import numpy as np
-import matplotlib.pylab as plt
-import pylab
 import sys
 import os
 
-import pyfits
+import ASTRI_cache
+import ASTRI_calib
+import ASTRI_cli
+import ASTRI_expr
+import ASTRI_decimate
+import ASTRI_histo
+import ASTRI_memory
+import ASTRI_profile
+import ASTRI_readahead
+import ASTRI_reader
+import ASTRI_temporal
+import ASTRI_timeindex
 
 # set-up parameters
 ASTRI_nPDM = 37
@@ -54,7 +141,7 @@ xlabel = ''
 ylabel = ''
 
 # Import the input parameters
-arg_list = sys.argv
+arg_list, options = ASTRI_cli.split_options(sys.argv)
 
 if (len(arg_list) == 1):
  	print '-------------------------------------------------'
@@ -64,18 +151,38 @@ if (len(arg_list) == 1):
 	print 'Author: V. Fioretti (INAF/IASF Bologna)'
 	print '----'
 	print 'Usage:'
-	print 'visASTRI_temporal.py filename selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel'
+	print 'visASTRI_temporal.py filename selPDM param subfield_id maxevt xvalue_temp xvalue_graph t=title y=ylabel --start=row --stop=row --block=rows --no-cache --clear-cache --cache-size=MB --follow=seconds --tstart=time --tstop=time --points=N --rolling=rows --rms --view=stack|heatmap --offset=value --profile=file --calib=file --readahead=N --where="expression" --max-memory=MB'
  	print '-------------------------------------------------'
  	print 'Parameters:'
  	print '- filename: path + file name of the FITS file'
- 	print '- selPDM: the ID of the PDM to be plotted (> 0)'
+ 	print '- selPDM: the ID of the PDM to be plotted. If selPDM = 0 all the PDMs are plotted.'
  	print '- param: name of the parameter to be plotted, using the same convention of the FITS fields. E.g. HI'
  	print '- subfield_id: element (starting from 1) of the sub-array to be plotted (e.g. 1 to select the pixel 1 for HI of PDM).'
+ 	print '			      If subfield_id = 0 all the sub-array is plotted (e.g. the 16 temperature sensors), one channel per element.'
  	print '- maxevt: max row (event) to read and plot. If 0 all the events are read.'
  	print '- xvalue_temp: selected x-axis value (element of the array) for which the y-value content must be plotted.'
  	print '- xvalue_graph: selected x-axis value (element of the array) for which the y-value content must be plotted.'
  	print '- (optional) t=title: title of the plot'
  	print '- (optional) y=ylabel: label of the y axis'
+ 	print '- (optional) --start=row: first row (starting from 0) to read'
+ 	print '- (optional) --stop=row: row (starting from 0) where the reading stops. If 0 the rows are read until the end of the table.'
+ 	print '- (optional) --block=rows: number of rows read at a time'
+ 	print '- (optional) --no-cache: do not use the result cache'
+ 	print '- (optional) --clear-cache: empty the result cache before running'
+ 	print '- (optional) --cache-size=MB: maximum size of the result cache (default 512 MB)'
+ 	print '- (optional) --follow=seconds: follow a file still being acquired, reading the new rows every seconds (default 2 s)'
+ 	print '- (optional) --tstart=time: first TIME_S to read'
+ 	print '- (optional) --tstop=time: TIME_S where the reading stops (rows with tstart <= TIME_S < tstop are read)'
+ 	print '- (optional) --points=N: maximum number of points plotted for each curve. If not given, twice the width of the plot in pixels.'
+ 	print '- (optional) --rolling=rows: plot the rolling mean of each channel over the last rows'
+ 	print '- (optional) --rms: with --rolling, plot the rolling RMS instead of the rolling mean'
+ 	print '- (optional) --view=stack|heatmap: one curve per channel (stack, default) or a [channels, events] image (heatmap)'
+ 	print '- (optional) --offset=value: with --view=stack, vertical shift between two consecutive channels'
+ 	print '- (optional) --profile=file: print the time and memory of each stage and write them to file (default ASTRI_profile.json)'
+ 	print '- (optional) --calib=file: subtract the pixel pedestals of the calibration table file (calibASTRI_pedestal.py)'
+ 	print '- (optional) --readahead=N: number of row blocks read ahead by a background thread (default 2, 0 = no read-ahead)'
+ 	print '- (optional) --where="expression": select the events (rows) with an expression over the columns, e.g. "PDM05HI[12] > 900 and max(PDM05T) < 30" (ASTRI_expr)'
+ 	print '- (optional) --max-memory=MB: memory budget of the analysis: block size picked from it, long series kept on disk, peak memory printed'
  	print '-------------------------------------------------'
  	print 'Example:'
  	print 'python visASTRI_temporal.py astri_000_13_002_00001_F_000009_000_0202.lv0 1 T 1 100 50 50 "t=PDM1 Temperature" y="T"'
@@ -83,6 +190,14 @@ if (len(arg_list) == 1):
 
 else:
 
+	profiler = ASTRI_profile.from_options(options, 'visASTRI_temporal.py')
+	ASTRI_readahead.from_options(options)
+	try:
+		memory_budget = ASTRI_memory.from_options(options)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+
 	filename = arg_list[1]
 	selPDM = int(arg_list[2])
 	param = arg_list[3]
@@ -90,6 +205,12 @@ else:
 	maxevt = int(arg_list[5])
 	xvalue_temp = int(arg_list[6])
 	xvalue_graph = int(arg_list[7])
+	start = ASTRI_cli.int_option(options, 'start', 0)
+	stop = ASTRI_cli.int_option(options, 'stop', 0)
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	block_size = ASTRI_cli.int_option(options, 'block', None)
+	calib_table = ASTRI_calib.from_options(options)
 	if (len(arg_list) > 8): 
 		temp_string = arg_list[8]
 		if (temp_string[0]=='t'):
@@ -105,71 +226,319 @@ else:
 
 
 
-	# read the file
-	hdulist_astri = pyfits.open(filename)
-	events = hdulist_astri[1].data
-	cols_events = hdulist_astri[1].columns
-	names_events = cols_events.names
+	profiler.begin('analysis')
+	# channels: the elements subfield_id (0 = all) of the PDM selPDM (0 = all)
+	fields = ASTRI_histo.pdm_fields(selPDM, param, nPDM = ASTRI_nPDM)
+	# event selection: its columns are read with the channels
+	try:
+		selection = ASTRI_expr.from_options(options, ASTRI_reader.open_dl0(filename))
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+	read_fields = fields + ASTRI_expr.selection_columns(selection)
+	# rows per block and rows of the series within the memory budget
+	dl0_astri = ASTRI_reader.open_dl0(filename)
+	# from the file, not from the rows read (there can be none, e.g. --follow or --where)
+	nchannels = len(fields)*ASTRI_histo.element_count(dl0_astri, fields[0], subfield_id)
+	max_events = None
+	try:
+		if ((memory_budget is not None) and (options.get('view', 'stack') != 'heatmap')):
+			# one curve per channel on each of the two axes
+			memory_budget.reserve(2*nchannels*ASTRI_memory.CURVE_KB*1024, 'plot curves')
+		block_size = ASTRI_memory.block_size(dl0_astri, read_fields, block_size)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+	if (memory_budget is not None):
+		max_events = ASTRI_timeindex.row_count(dl0_astri, tstart, tstop, start, stop, maxevt)
 
-	data_column = []
-	time_column = []
-	row_column = []
-	sTIME = 'TIME_S'
-	
-	# if a PDM has been selected:
-	if (selPDM > 0):
-		if (selPDM < 10):
-			sPDM = 'PDM0'+str(selPDM)+param
-		else:
-			sPDM = 'PDM'+str(selPDM)+param
-		data_column_all = events.field(sPDM)
-		time_column_all = events.field(sTIME)
-		
-		if (maxevt > 0):
-			data_column_all = data_column_all[:maxevt]
-			time_column_all = time_column_all[:maxevt]
-			
-		# if on pixel/one temperature sensor is selected
-		if (subfield_id > 0):
-			for evid in xrange(len(data_column_all)):
-				row_data_column = data_column_all[evid]
-				time_column.append(time_column_all[evid])
-				row_column.append(evid + 1)
-				data_column.append(row_data_column[subfield_id-1])
-
-										
-		# else if all the sub-array is taken
-		else:
-			print 'Error! Subfield_id must be > 0.'
+	def read_series():
+		"""(channel_data, time_column, row_column) of the rows read, all the channels in a single pass"""
+		blocks = ASTRI_timeindex.iter_time_blocks(dl0_astri, read_fields, tstart, tstop, start, stop, maxevt, block_size)
+		blocks = ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(blocks, calib_table), selection)
+		try:
+			return ASTRI_temporal.collect_channels(blocks, fields, subfield_id, max_events, nchannels)
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
 
-	# else if all PDM are taken
+	rolling_window = ASTRI_cli.int_option(options, 'rolling', 0)
+	view = options.get('view', 'stack')
+	# the plot of the cache (decimated curves of the whole series), None when the rows are read
+	cached_plot = None
+	result_cache = None
+
+	# follow a growing file: the new rows are added at each update
+	if ('follow' in options):
+		dl0_astri = ASTRI_reader.DL0File(filename)
+		row_follower = ASTRI_reader.RowFollower(dl0_astri, start, stop, maxevt)
+		channel_data, time_column, row_column = ASTRI_temporal.collect_channels(ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(ASTRI_timeindex.split_time_window(row_follower.new_blocks(read_fields, block_size), tstart, tstop), calib_table), selection), fields, subfield_id, nchannels = nchannels)
 	else:
-		print 'Error! selPDM must be > 0.'
+		# look for the decimated plot in the cache (0 points: the pixel budget of the figure)
+		result_cache = ASTRI_cache.from_options(options)
+		cache_key = ASTRI_cache.result_key(filename, 'temporal plot', selPDM, param, subfield_id, maxevt, start, stop, tstart, tstop, ASTRI_calib.table_id(calib_table),
+			ASTRI_expr.selection_key(selection), ASTRI_cli.int_option(options, 'points', 0), rolling_window, ('rms' in options), view, xvalue_temp, xvalue_graph)
+		if (result_cache is not None):
+			profiler.begin('cache')
+			cached_plot = result_cache.get(cache_key)
+			profiler.end('cache')
+		if (cached_plot is None):
+			channel_data, time_column, row_column = read_series()
+		else:
+			# the rows are read only if the plot is zoomed
+			channel_data = time_column = row_column = plot_data = None
+
+	labels = ASTRI_temporal.channel_labels(fields, nchannels//len(fields), subfield_id)
+	channel_offset = ASTRI_cli.float_option(options, 'offset', 0.)*np.arange(nchannels)
 
-	yvalue_temp = data_column[xvalue_temp-1]	
-	yvalue_graph = data_column[xvalue_graph-1]	
+	def plot_values(first = 0):
+		"""Plotted [channels, events] values from the row first on: the data, or their rolling mean or RMS"""
+		if (rolling_window <= 0):
+			return channel_data[:, first:]
+		mean_data, rms_data = ASTRI_temporal.rolling_stats(channel_data, rolling_window, first)
+		if ('rms' in options):
+			return rms_data
+		return mean_data
 
+	def series_values():
+		"""plot_values of the whole series"""
+		try:
+			return plot_values()
+		except ValueError as error:
+			print 'Error! '+str(error)
+			sys.exit(1)
+
+	if (channel_data is not None):
+		plot_data = series_values()
+	profiler.end('analysis')
+
+	profiler.begin('plot')
+	# the plotting backend is loaded only when a plot is drawn
+	import matplotlib.pyplot as plt
 	fig = plt.figure(1,figsize=[10,6])
 	ax_temp = fig.add_subplot(121)
 	ax_graph = fig.add_subplot(122)
 
+	# decimation of the curves to the pixel budget, the annotated points are kept
+	npoints = ASTRI_cli.int_option(options, 'points', 0)
+	if (npoints <= 0):
+		npoints = 2*int(max(ax_temp.bbox.width, ax_graph.bbox.width))
+	exact_points = [xvalue_temp-1, xvalue_graph-1]
+
+	def channel_envelopes():
+		"""Min/max envelopes of the plotted values of the channels"""
+		envelopes = [ASTRI_decimate.MinMaxEnvelope(npoints) for channel in range(nchannels)]
+		for channel in range(nchannels):
+			envelopes[channel].add(plot_data[channel])
+		return envelopes
+
+	profiler.begin('decimate')
+	envelopes = None
+	if (channel_data is not None):
+		envelopes = channel_envelopes()
+	profiler.end('decimate')
+
+	# rows [first, last) shown on each axis
+	shown_window = {}
+
+	def show_window(ax, first, last):
+		"""Draw the rows [first, last) of the channels on ax, decimated to the pixel budget"""
+		if (shown_window.get(ax) == (first, last)):
+			return
+		shown_window[ax] = (first, last)
+		if (ax is ax_temp):
+			x_column = time_column
+		else:
+			x_column = row_column
+		if (view == 'heatmap'):
+			mean_data, starts = ASTRI_decimate.bucket_means(plot_data[:, first:last], npoints)
+			images[ax].set_data(mean_data)
+			if (last > first):
+				images[ax].set_extent((x_column[first], x_column[last-1], -0.5, nchannels-0.5))
+				# the colour scale (and the colorbar) follow the values of the window
+				images[ax].autoscale()
+			return
+		window_points = [point for point in exact_points if (point >= first) and (point < last)]
+		for channel in range(nchannels):
+			if ((first == 0) and (last == len(row_column))):
+				plot_index = envelopes[channel].index()
+			else:
+				plot_index = first + ASTRI_decimate.envelope_index(plot_data[channel, first:last], npoints)
+			plot_index = ASTRI_decimate.with_points(plot_index, window_points, len(row_column))
+			lines[ax][channel].set_data(x_column[plot_index], plot_data[channel, plot_index] + channel_offset[channel])
+
+	def show_cached(ax):
+		"""Draw the plot of the cache (show_window of all the rows) on ax"""
+		if (ax is ax_temp):
+			x_column = cached_plot['time']
+		else:
+			x_column = cached_plot['row']
+		if (view == 'heatmap'):
+			images[ax].set_data(cached_plot['value'])
+			if (len(x_column) > 0):
+				images[ax].set_extent((x_column[0], x_column[-1], -0.5, nchannels-0.5))
+				images[ax].autoscale()
+			return
+		offsets = cached_plot['offsets']
+		for channel in range(nchannels):
+			curve = slice(offsets[channel], offsets[channel+1])
+			lines[ax][channel].set_data(x_column[curve], cached_plot['value'][curve] + channel_offset[channel])
+
+	def annotated_values():
+		"""TIME_S, row and plotted value of the rows xvalue_temp and xvalue_graph of a single channel (empty if not annotated)"""
+		temp_rows = []
+		graph_rows = []
+		if ((nchannels == 1) and (plot_data.shape[1] >= xvalue_temp)):
+			temp_rows = [xvalue_temp-1]
+		if ((nchannels == 1) and (plot_data.shape[1] >= xvalue_graph)):
+			graph_rows = [xvalue_graph-1]
+		return {'xvalue_temp': time_column[temp_rows], 'yvalue_temp': plot_data[0, temp_rows],
+			'xvalue_graph': row_column[graph_rows], 'yvalue_graph': plot_data[0, graph_rows]}
 
-	ax_temp.plot(time_column, data_column, lw = 2)
-	ax_graph.plot(row_column, data_column, lw = 2)
+	def cached_entry():
+		"""The plot of all the rows for the cache: the decimated points of the curves (offsets: first point of each channel)
+		or the averaged heatmap with its first and last row, and the annotated values"""
+		nevents = len(row_column)
+		if (view == 'heatmap'):
+			mean_data, starts = ASTRI_decimate.bucket_means(plot_data, npoints)
+			plot_index = np.array([0, nevents-1][:min(nevents, 2)], dtype=np.int64)
+			entry = {'value': mean_data, 'time': time_column[plot_index], 'row': row_column[plot_index]}
+		else:
+			curves = [ASTRI_decimate.with_points(envelopes[channel].index(), exact_points, nevents) for channel in range(nchannels)]
+			offsets = np.cumsum([0] + [len(curve) for curve in curves])
+			entry = {'value': np.empty(offsets[-1], dtype=plot_data.dtype), 'time': np.empty(offsets[-1], dtype=time_column.dtype),
+				'row': np.empty(offsets[-1], dtype=row_column.dtype), 'offsets': offsets}
+			# one channel at a time, without an index of all the points
+			for channel, plot_index in enumerate(curves):
+				curve = slice(offsets[channel], offsets[channel+1])
+				entry['value'][curve] = plot_data[channel, plot_index]
+				entry['time'][curve] = time_column[plot_index]
+				entry['row'][curve] = row_column[plot_index]
+		entry.update(annotated_values())
+		return entry
+
+	lines = {ax_temp: [], ax_graph: []}
+	images = {}
+	if (view == 'heatmap'):
+		for ax in (ax_temp, ax_graph):
+			images[ax] = ax.imshow(np.zeros((nchannels, 1)), aspect='auto', origin='lower', interpolation='nearest')
+			ax.set_ylabel('CHANNEL')
+			if (nchannels <= ASTRI_nPDM):
+				ax.set_yticks(range(nchannels))
+				ax.set_yticklabels(labels, fontsize=8)
+		fig.colorbar(images[ax_graph], ax=ax_graph, label=ylabel)
+	else:
+		line_width = 1
+		if (nchannels == 1):
+			line_width = 2
+		for ax in (ax_temp, ax_graph):
+			for channel in range(nchannels):
+				lines[ax].append(ax.plot([], [], lw = line_width, label = labels[channel])[0])
+			ax.set_ylabel(ylabel)
+		if ((nchannels > 1) and (nchannels <= 16)):
+			ax_graph.legend(fontsize='small')
+	for ax in (ax_temp, ax_graph):
+		if (channel_data is None):
+			show_cached(ax)
+		else:
+			show_window(ax, 0, len(row_column))
+		ax.relim()
+		ax.autoscale_view()
 
 	ax_temp.set_xlabel('TIME_S')
-	ax_temp.set_ylabel(ylabel)
 	ax_temp.set_title(title)
 	ax_temp.grid()
 	ax_graph.set_xlabel('ROW COUNTER')
-	ax_graph.set_ylabel(ylabel)
 	ax_graph.set_title(title)
 	ax_graph.grid()
 	
-	ax_temp.text(0.1, 0.9, ylabel+' value ['+str(time_column[xvalue_temp-1])+'] = '+str(yvalue_temp), transform=ax_temp.transAxes, fontsize=12, zorder=100)
-	ax_graph.text(0.1, 0.9, ylabel+' value ['+str(row_column[xvalue_graph-1])+'] = '+str(yvalue_graph), transform=ax_graph.transAxes, fontsize=12, zorder=100)
+	# the annotated values are the plotted ones of a single channel
+	text_temp = ax_temp.text(0.1, 0.9, '', transform=ax_temp.transAxes, fontsize=12, zorder=100)
+	text_graph = ax_graph.text(0.1, 0.9, '', transform=ax_graph.transAxes, fontsize=12, zorder=100)
+	if (channel_data is None):
+		annotated = cached_plot
+	else:
+		annotated = annotated_values()
+	if (len(annotated['yvalue_temp']) > 0):
+		yvalue_temp = annotated['yvalue_temp'][0]
+		text_temp.set_text(ylabel+' value ['+str(annotated['xvalue_temp'][0])+'] = '+str(yvalue_temp))
+	if (len(annotated['yvalue_graph']) > 0):
+		yvalue_graph = annotated['yvalue_graph'][0]
+		text_graph.set_text(ylabel+' value ['+str(annotated['xvalue_graph'][0])+'] = '+str(yvalue_graph))
 
-	
-	plt.show()
+	def decimate_window(ax):
+		"""Decimate again the rows inside the x-axis window of ax (zoom)"""
+		global channel_data, time_column, row_column, plot_data, envelopes
+		if (channel_data is None):
+			if (ax.get_autoscalex_on()):
+				# all the rows: the plot of the cache
+				return
+			# zoom of the plot of the cache: the rows are read now, for the full resolution
+			channel_data, time_column, row_column = read_series()
+			plot_data = series_values()
+			envelopes = channel_envelopes()
+		if (ax is ax_temp):
+			x_column = time_column
+		else:
+			x_column = row_column
+		xmin, xmax = ax.get_xlim()
+		first, last = ASTRI_decimate.window_index(x_column, min(xmin, xmax), max(xmin, xmax))
+		show_window(ax, first, last)
 
+	ax_temp.callbacks.connect('xlim_changed', decimate_window)
+	ax_graph.callbacks.connect('xlim_changed', decimate_window)
 
+	if (profiler.enabled):
+		# render now, so that the drawing time is part of the plot stage
+		fig.canvas.draw()
+	profiler.end('plot')
+	if ((channel_data is not None) and (result_cache is not None)):
+		profiler.begin('cache')
+		result_cache.put(cache_key, cached_entry())
+		profiler.end('cache')
+	ASTRI_readahead.report()
+	ASTRI_memory.report()
+	profiler.finish()
+	
+	if ('follow' in options):
+		# poll the file for new rows until the plot is closed
+		follow_interval = ASTRI_cli.float_option(options, 'follow', ASTRI_reader.DEFAULT_FOLLOW_INTERVAL)
+		plt.show(block=False)
+		# the new rows are written after the ones already read (no copy of the whole series)
+		series_buffer = ASTRI_temporal.SeriesBuffer((channel_data, time_column, row_column))
+		if (rolling_window > 0):
+			plot_buffer = ASTRI_temporal.SeriesBuffer((plot_data,))
+		while (plt.fignum_exists(1) and (not row_follower.done())):
+			plt.pause(follow_interval)
+			new_series = ASTRI_temporal.collect_channels(ASTRI_expr.select_blocks(ASTRI_calib.calibrate_blocks(ASTRI_timeindex.split_time_window(row_follower.new_blocks(read_fields, block_size), tstart, tstop), calib_table), selection), fields, subfield_id, nchannels = nchannels)
+			if (len(new_series[1]) == 0):
+				continue
+			last_row = len(row_column)
+			channel_data, time_column, row_column = series_buffer.append(new_series)
+			new_data = plot_values(last_row)
+			if (rolling_window > 0):
+				plot_data, = plot_buffer.append((new_data,))
+			else:
+				plot_data = channel_data
+			for channel in range(nchannels):
+				envelopes[channel].add(new_data[channel])
+			for ax in (ax_temp, ax_graph):
+				if (ax.get_autoscalex_on()):
+					show_window(ax, 0, len(row_column))
+				else:
+					# zoomed: the window is drawn again at its resolution
+					shown_window.pop(ax, None)
+					decimate_window(ax)
+			if ((nchannels == 1) and (len(row_column) >= xvalue_temp) and (last_row < xvalue_temp)):
+				yvalue_temp = plot_data[0, xvalue_temp-1]	
+				text_temp.set_text(ylabel+' value ['+str(time_column[xvalue_temp-1])+'] = '+str(yvalue_temp))
+			if ((nchannels == 1) and (len(row_column) >= xvalue_graph) and (last_row < xvalue_graph)):
+				yvalue_graph = plot_data[0, xvalue_graph-1]	
+				text_graph.set_text(ylabel+' value ['+str(row_column[xvalue_graph-1])+'] = '+str(yvalue_graph))
+			if (view != 'heatmap'):
+				for ax in (ax_temp, ax_graph):
+					ax.relim()
+					ax.autoscale_view()
+			fig.canvas.draw_idle()
+	
+	plt.show()
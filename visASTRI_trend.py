@@ -0,0 +1,152 @@
+"""
+ visASTRI_trend.py  -  description
+ ---------------------------------------------------------------------------------
+ Plotting the trend of the per-file statistics of the ASTRI DL0 data from the trending database
+ ---------------------------------------------------------------------------------
+ copyright            : (C) 2015 Valentina Fioretti
+ email                : fioretti@iasfbo.inaf.it
+ ----------------------------------------------
+ Usage:
+ visASTRI_trend.py database param pdm element quantity t=title y=ylabel --tstart=time --tstop=time --run=name --bokeh
+ ---------------------------------------------------------------------------------
+ Parameters:
+ - database: SQLite trending database written by ingestASTRI_trend.py
+ - param: name of the parameter, using the same convention of the FITS fields. E.g. HI
+ - pdm: the ID of the PDM. If pdm = 0 the statistics of the whole camera are plotted.
+ - element: element (starting from 1) of the sub-array (e.g. pixel for HI). If element = 0 the statistics of the whole PDM are plotted.
+ - quantity: mean, rms, min, max, entries or out (fraction of the values outside the window)
+ - (optional) t=title: title of the plot
+ - (optional) y=ylabel: title of the y axis
+ - (optional) --tstart=time: first TIME_S of the start of the files
+ - (optional) --tstop=time: TIME_S where the selection of the files stops (files starting at tstart <= TIME_S < tstop are plotted)
+ - (optional) --run=name: plot only the files of the run name
+ - (optional) --bokeh: plot with the BOKEH framework (ASTRIQL_trend.html)
+ ---------------------------------------------------------------------------------
+ Required data format: SQLite database
+ ---------------------------------------------------------------------------------
+ Caveats:
+ One point per file, at the TIME_S of its first row. The mean is plotted with the RMS as error bar.
+ The statistics are read from the database (ASTRI_trend), the FITS files are not read.
+ Files without values in the window are not plotted.
+ ---------------------------------------------------------------------------------
+ Example:
+ python visASTRI_trend.py ASTRI_trend.sqlite HI 1 5 mean "t=PDM01 pixel 5 pedestal" "y=ADC counts"
+ ---------------------------------------------------------------------------------
+ Modification history:
+ - 2026/10/18: Creation date.
+ - 2026/10/18: Error message for a trending database that cannot be opened.
+
+"""
+
+import numpy as np
+import time
+import sys
+
+import ASTRI_cli
+import ASTRI_trend
+
+title = ''
+y_title = ''
+
+# Import the input parameters
+arg_list, options = ASTRI_cli.split_options(sys.argv)
+
+if (len(arg_list) == 1):
+ 	print '-------------------------------------------------'
+	print 'visASTRI_trend.py'
+	print '----'
+	print 'Plotting the trend of the per-file statistics of the ASTRI DL0 data from the trending database'
+	print 'Author: V. Fioretti (INAF/IASF Bologna)'
+	print '----'
+	print 'Usage:'
+	print 'visASTRI_trend.py database param pdm element quantity t=title y=ylabel --tstart=time --tstop=time --run=name --bokeh'
+ 	print '-------------------------------------------------'
+ 	print 'Parameters:'
+ 	print '- database: SQLite trending database written by ingestASTRI_trend.py'
+ 	print '- param: name of the parameter, using the same convention of the FITS fields. E.g. HI'
+ 	print '- pdm: the ID of the PDM. If pdm = 0 the statistics of the whole camera are plotted.'
+ 	print '- element: element (starting from 1) of the sub-array (e.g. pixel for HI). If element = 0 the statistics of the whole PDM are plotted.'
+ 	print '- quantity: mean, rms, min, max, entries or out (fraction of the values outside the window)'
+ 	print '- (optional) t=title: title of the plot'
+ 	print '- (optional) y=ylabel: title of the y axis'
+ 	print '- (optional) --tstart=time: first TIME_S of the start of the files'
+ 	print '- (optional) --tstop=time: TIME_S where the selection of the files stops (files starting at tstart <= TIME_S < tstop are plotted)'
+ 	print '- (optional) --run=name: plot only the files of the run name'
+ 	print '- (optional) --bokeh: plot with the BOKEH framework (ASTRIQL_trend.html)'
+ 	print '-------------------------------------------------'
+ 	print 'Example:'
+ 	print 'python visASTRI_trend.py ASTRI_trend.sqlite HI 1 5 mean "t=PDM01 pixel 5 pedestal" "y=ADC counts"'
+ 	print '-------------------------------------------------'
+
+else:
+
+	db_path = arg_list[1]
+	param = arg_list[2]
+	pdm = int(arg_list[3])
+	element = int(arg_list[4])
+	quantity = arg_list[5]
+	for temp_string in arg_list[6:]:
+		if (temp_string[0]=='t'):
+			title = temp_string[2:]
+		if (temp_string[0]=='y'):
+			y_title = temp_string[2:]
+	if (y_title == ''):
+		y_title = quantity
+	tstart = ASTRI_cli.float_option(options, 'tstart', None)
+	tstop = ASTRI_cli.float_option(options, 'tstop', None)
+	run = options.get('run', None)
+	if (quantity not in ASTRI_trend.QUANTITIES):
+		print 'Error! Unknown quantity '+quantity+' (quantities: '+', '.join(ASTRI_trend.QUANTITIES)+')'
+		sys.exit(1)
+
+	time_start = time.time()
+	try:
+		trend_db = ASTRI_trend.open_db(db_path, create = False)
+	except ValueError as error:
+		print 'Error! '+str(error)
+		sys.exit(1)
+	times, values, errors, runs = ASTRI_trend.trend(trend_db, param, pdm, element, quantity, tstart, tstop, run)
+	trend_db.close()
+	print str(len(times))+' files read from '+db_path+' in '+str(round((time.time() - time_start)*1000., 1))+' ms'
+
+	good = np.isfinite(values)
+	times, values, errors = times[good], values[good], errors[good]
+	runs = [run_name for run_name, is_good in zip(runs, good) if is_good]
+	if (len(times) == 0):
+		print 'Error! No statistics of '+param+' PDM '+str(pdm)+' element '+str(element)+' in '+db_path
+		sys.exit(1)
+
+	if ('bokeh' in options):
+
+		from bokeh.plotting import figure, output_file, show
+		from bokeh.models import ColumnDataSource, HoverTool
+
+		# output to static HTML file
+		output_file("ASTRIQL_trend.html", title=title)
+
+		trend_source = ColumnDataSource(data=dict(x=times, y=values, lower=values - errors, upper=values + errors, run=runs))
+		p = figure(title=title, x_axis_label='TIME_S', y_axis_label=y_title, plot_width=900, plot_height=500)
+		if (quantity == 'mean'):
+			p.segment('x', 'lower', 'x', 'upper', source=trend_source, color='blue')
+		p.circle('x', 'y', source=trend_source, size=5, color='blue')
+		p.add_tools(HoverTool(tooltips=[('TIME_S', '@x{0.000}'), (quantity, '@y'), ('run', '@run')]))
+
+		# show the results
+		show(p)
+
+	else:
+
+		import matplotlib.pylab as plt
+
+		fig = plt.figure(1,figsize=[10,7])
+		ax = fig.add_subplot(111)
+		if (quantity == 'mean'):
+			ax.errorbar(times, values, yerr=errors, fmt='o', color='blue', ms=4, capsize=0)
+		else:
+			ax.plot(times, values, 'o', color='blue', ms=4)
+		ax.set_xlabel('TIME_S')
+		ax.set_ylabel(y_title)
+		ax.set_title(title)
+		ax.grid()
+
+		plt.show()